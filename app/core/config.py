@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -16,7 +17,97 @@ class Settings(BaseSettings):
     DEFAULT_SMTP_PORT: int = 587
     DEFAULT_FROM_EMAIL: str = "tianmu@company.com"
 
+    # 人脸识别工作进程池（与OCR分开配置）
+    FACE_WORKERS: int = 0  # 0 表示按CPU核心数自动选择
+    FACE_WARMUP_ON_STARTUP: bool = True  # 启动后在后台预热人脸工作进程（HOG检测、关键点、编码模型）
+    FACE_QUEUE_SIZE: int = 8  # 排队请求上限，超出后返回503
+    FACE_RETRY_AFTER_SECONDS: int = 1
+    FACE_BATCH_MAX_ITEMS: int = 500  # 批量注册单次最多人数
+    FACE_BATCH_MAX_UPLOAD_MB: float = 200  # 批量注册zip压缩包大小上限
+    FACE_BATCH_MAX_UNCOMPRESSED_MB: float = 1024  # 批量注册zip解压后总大小上限（防止压缩炸弹）
+    FACE_DETECT_SCALE: int = 2  # 级联检测缩小倍数（1/2/4/8，1 表示不缩小解码，仍按最小人脸尺寸过滤）
+    FACE_MIN_FACE_SIZE: int = 80  # 最小人脸边长（原图像素），更小的人脸不参与识别
+    FACE_QUALITY_GATE: bool = True  # 提取编码前先检查模糊度/亮度/人脸大小
+    FACE_MIN_BLUR_VARIANCE: float = 40.0  # 缩小后图像的拉普拉斯方差下限
+    FACE_MIN_BRIGHTNESS: float = 40.0  # 平均亮度下限（0~255）
+    FACE_MAX_BRIGHTNESS: float = 225.0  # 平均亮度上限（过曝/逆光）
+    FACE_STREAM_CONSECUTIVE: int = 3  # 视频流验证：连续多少帧结论一致才给出结果
+    FACE_STREAM_CHANGE_THRESHOLD: float = 2.0  # 缩略图平均灰度差低于该值视为画面未变化，跳过
+    FACE_STREAM_IDLE_SECONDS: float = 30  # 连接空闲超时
+    FACE_ENCODING_DTYPE: str = "float16"  # 接口返回的人脸编码存储类型（float16 / float32）
+    FACE_GALLERY_DIR: str = "Data/face_gallery"  # 服务端人脸库（float32矩阵 + 用户名索引）
+    FACE_MAX_TEMPLATES: int = 5  # 每人最多保存的人脸模板数
+    FACE_TEMPLATE_EVICTION: str = "oldest"  # 模板超出上限时的淘汰策略：oldest / redundant
+    FACE_MATCH_AGGREGATE: str = "min"  # 多模板距离汇总方式：min / mean / topk
+    FACE_MATCH_TOP_K: int = 2  # topk 汇总时取最近的模板数
+    FACE_AUTO_ADD_TEMPLATE: bool = False  # 高置信度验证通过后自动追加模板
+    FACE_AUTO_ADD_MAX_DISTANCE: float = 0.35  # 自动追加要求的最大汇总距离（高置信度）
+    FACE_AUTO_ADD_MIN_NOVELTY: float = 0.12  # 与已有模板的最小距离低于该值时不追加（避免重复）
+    FACE_ANN_MIN_GALLERY: int = 5000  # 人脸库行数达到该值后1:N检索改用IVF近似索引
+    FACE_IVF_NPROBE: int = 8  # IVF检索时探查的簇数量（越大越准、越慢）
+    FACE_IDENTIFY_TOP_K: int = 5  # 1:N识别默认返回的候选数
+
+    # 上传大小上限（MB），超过返回413
+    OCR_MAX_UPLOAD_MB: float = 20
+    OCR_DOCUMENT_MAX_UPLOAD_MB: float = 100
+    FACE_MAX_UPLOAD_MB: float = 10
+
+    # OCR工作进程池配置
+    OCR_WORKERS: int = 0  # 0 表示按CPU核心数自动选择
+    OCR_QUEUE_SIZE: int = 16  # 排队请求上限，超出后返回503
+    OCR_RETRY_AFTER_SECONDS: int = 2
+    OCR_WARMUP_ON_STARTUP: bool = True  # 启动后在后台预热，False则由首个请求触发
+    OCR_READY_TIMEOUT_SECONDS: float = 10.0  # 预热未完成时请求最多等待的时间
+    OCR_BATCH_MAX_FILES: int = 50  # /ocr/batch 单次最多图片数
+    OCR_MODEL_VERSION: str = "PP-OCRv5"
+
+    # OCR推理后端：paddle / onnx（ONNX Runtime运行导出的PP-OCR模型）
+    OCR_BACKEND: str = "paddle"
+    OCR_ONNX_MODEL_DIR: str = "models/ppocr_onnx"
+    OCR_ONNX_INT8: bool = False  # 使用int8量化模型 det_int8.onnx / rec_int8.onnx
+    OCR_ONNX_THREADS: int = 0  # 0 表示由ONNX Runtime自动决定
+
+    # OCR推理CPU调优（显式配置优先于 Data/ocr_tuning.json 中的调优结果）
+    OCR_CPU_THREADS: int = 0  # 每个工作进程的推理线程数，0 表示使用调优结果或引擎默认值
+    OCR_ENABLE_MKLDNN: Optional[bool] = None  # None 表示使用调优结果或引擎默认值
+    OCR_TUNING_PROFILE_PATH: str = "Data/ocr_tuning.json"
+    OCR_TUNING_SAMPLES: str = "WorkCondition1.png"  # 逗号分隔的图片路径或目录
+
+    # OCR检测前预处理（0 表示不按该条件缩放）
+    OCR_PREPROCESS_MAX_LONG_EDGE: int = 2560
+    OCR_PREPROCESS_TARGET_DPI: int = 0
+    OCR_PREPROCESS_GRAYSCALE: bool = False
+    OCR_PREPROCESS_CROP_BORDERS: bool = False
+
+    # OCR微批调度（并发单图请求合并为一次predict）
+    OCR_MICRO_BATCH_ENABLED: bool = True
+    OCR_BATCH_WINDOW_MS: int = 10
+    OCR_BATCH_MAX_SIZE: int = 8
+    OCR_BATCH_QUEUE_DEPTH: int = 64
+
+    # 版式模板（只识别登记区域）
+    OCR_TEMPLATE_PATH: str = "Data/ocr_templates.json"
+    OCR_REC_MODEL_NAME: str = "PP-OCRv5_server_rec"
+
+    # 多页文档OCR（PDF/TIFF）
+    OCR_DOCUMENT_DPI: int = 200
+    OCR_DOCUMENT_MAX_PAGES: int = 200
+    OCR_DOCUMENT_PAGES_IN_FLIGHT: int = 0  # 0 表示与OCR工作进程数相同
+
+    # OCR结果缓存（内存LRU + SQLite持久层）
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_MEMORY_ENTRIES: int = 256
+    OCR_CACHE_DISK_MAX_ENTRIES: int = 20000
+    OCR_CACHE_DB_PATH: str = "Data/ocr_cache.db"
+
     class Config:
         env_file = ".env"
 
 settings = Settings()
+
+# PaddleOCR引擎参数（工作进程建模与缓存键共用）
+OCR_ENGINE_OPTIONS = {
+    "use_doc_orientation_classify": False,
+    "use_doc_unwarping": False,
+    "use_textline_orientation": False
+}
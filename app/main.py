@@ -12,10 +12,10 @@ sys.path.insert(0, str(project_root))
 import warnings
 warnings.filterwarnings("ignore", message="No ccache found")
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, UploadFile, File, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.exceptions import HTTPException
 from fastapi.templating import Jinja2Templates
 import logging
@@ -315,26 +315,110 @@ async def industrial_console():
 
 # ========== 工况识别集成接口 ==========
 @app.post("/api/ocr-to-workload", summary="OCR到工况识别", tags=["工业接口"])
-async def ocr_to_workload_recognition(request: Request):
-    """OCR识别后直接进行工况识别的集成接口"""
-    try:
-        from fastapi import UploadFile, File, Form
-        import tempfile
-        import os
-        
-        # 这里应该接收文件上传，简化为演示
-        return JSONResponse(content={
-            "message": "OCR到工况识别集成接口",
-            "description": "上传图片 -> OCR识别 -> 工况识别 -> 返回JSON结果",
-            "available": workload_router is not None and ocr_router is not None,
-            "endpoints": {
-                "step1": "/ocr/table - OCR识别",
-                "step2": "/workload/recognize/ocr - 工况识别"
-            }
-        })
-    except Exception as e:
-        logger.error(f"OCR到工况识别失败: {e}")
-        raise HTTPException(500, f"集成接口失败: {str(e)}")
+async def ocr_to_workload_recognition(
+    request: Request,
+    file: UploadFile = File(...),
+    language: str = Form("zh"),
+    template: str = Form(None),
+    stream: bool = Query(False, description="按阶段以NDJSON推送进度")
+):
+    """上传图片 -> OCR识别 -> 工况识别，一次请求完成；stream=true 时逐阶段推送"""
+    if not (ocr_router and workload_router):
+        raise HTTPException(503, "OCR或工况识别服务未加载")
+
+    from app.services.ocr_pool import ocr_pool, OCRNotReadyError
+    from app.services.ocr_templates import template_registry
+    from app.services.process_pool import PoolBusyError
+    from app.services.ocr_document import format_event
+    from app.services.workload_recognition_service import get_workload_service
+    from app.core.config import settings
+    from app.utils.upload import read_upload, IMAGE_FORMATS, FORMAT_SUFFIXES
+
+    content, fmt = await read_upload(file, settings.OCR_MAX_UPLOAD_MB, IMAGE_FORMATS)
+    logger.info(f"[OCR->工况] 接收请求: {file.filename}, 大小: {len(content)} 字节")
+
+    async def run_ocr() -> Dict[str, Any]:
+        """有模板时走模板识别（未匹配会回退整页），否则整页结构化识别"""
+        if template or template_registry.list():
+            result = await ocr_pool.extract_with_template(content, template)
+        else:
+            result = await ocr_pool.extract(content, FORMAT_SUFFIXES[fmt], structured=True)
+        if result.get("error"):
+            raise HTTPException(400, result["error"])
+        return result
+
+    def build_params(ocr_result: Dict[str, Any]):
+        """返回 (参数字典, 置信度)；没有结构化结果时按文字行解析，置信度为None（不跳过LLM）"""
+        if ocr_result.get("fields"):
+            return ocr_result["fields"], ocr_result.get("confidence")
+        return service.parse_ocr_text(ocr_result.get("text", "")), None
+
+    service = get_workload_service()
+
+    if not stream:
+        try:
+            ocr_result = await run_ocr()
+        except LookupError as e:
+            raise HTTPException(404, str(e))
+        except (PoolBusyError, OCRNotReadyError) as e:
+            raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+
+        ocr_params, confidence = build_params(ocr_result)
+        try:
+            result = await service.recognize_from_ocr(ocr_params, language, param_confidence=confidence)
+        except Exception as e:
+            logger.error(f"[OCR->工况] 工况识别失败: {e}")
+            raise HTTPException(500, f"OCR工况识别失败: {str(e)}")
+
+        logger.info(f"[OCR->工况] 完成，测试类型: {result.test_type}, 阶段数: {result.total_phases}")
+        return {
+            "ocr": {
+                "template": ocr_result.get("template"),
+                "text": ocr_result.get("text", ""),
+                "parameters": ocr_params,
+                "confidence": confidence
+            },
+            "workload": result.dict()
+        }
+
+    async def event_stream():
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def on_progress(stage: str, data: Dict[str, Any]):
+            await events.put({"event": stage, **data})
+
+        async def pipeline():
+            try:
+                ocr_result = await run_ocr()
+                ocr_params, confidence = build_params(ocr_result)
+                await events.put({
+                    "event": "ocr",
+                    "template": ocr_result.get("template"),
+                    "text": ocr_result.get("text", ""),
+                    "parameters": ocr_params,
+                    "confidence": confidence
+                })
+                result = await service.recognize_from_ocr(
+                    ocr_params, language, progress_callback=on_progress, param_confidence=confidence
+                )
+                await events.put({"event": "result", "done": True, "workload": result.dict()})
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"[OCR->工况] 流式处理失败: {detail}")
+                await events.put({"event": "error", "done": True, "error": detail})
+
+        task = asyncio.create_task(pipeline())
+        try:
+            while True:
+                event = await events.get()
+                yield format_event(event, "ndjson")
+                if event.get("done"):
+                    break
+        finally:
+            # 客户端断开时停止后续LLM调用
+            task.cancel()
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
 
 # ========== 其他路由保持不变 ==========
 @app.get("/api/public-stats", summary="生产统计数据", tags=["监控系统"])
@@ -431,8 +515,8 @@ async def industrial_health_check():
         components = {
             "AGI_CORE": "OPERATIONAL",
             "ADMIN_PANEL": "OPERATIONAL" if admin_router else "NOT_LOADED",
-            "OCR_ENGINE": "OPERATIONAL" if ocr_router else "NOT_LOADED", 
-            "BIOMETRIC_SECURITY": "OPERATIONAL" if face_router else "NOT_LOADED",
+            "OCR_ENGINE": get_ocr_component_status(), 
+            "BIOMETRIC_SECURITY": get_face_component_status(),
             "USAGE_TRACKER": "OPERATIONAL" if usage_tracker else "NOT_LOADED",
             "APPROVAL_SYSTEM": "OPERATIONAL" if approval_router else "NOT_LOADED",
             "WORKLOAD_RECOGNITION": "OPERATIONAL" if workload_router else "NOT_LOADED",
@@ -458,6 +542,8 @@ async def industrial_health_check():
         return {
             "status": system_status,
             "components": components,
+            "ocr_readiness": get_ocr_readiness(),
+            "face_readiness": get_face_readiness(),
             "system_info": {
                 "platform": f"{platform.system()} {platform.release()}",
                 "python_version": platform.python_version(),
@@ -517,6 +603,40 @@ async def get_approval_stats():
             "timestamp": datetime.now().isoformat()
         }
 
+def get_ocr_readiness() -> Dict[str, Any]:
+    """OCR引擎预热状态（不触发推理）"""
+    if not ocr_router:
+        return {"ready": False, "state": "not_loaded"}
+    from app.services.ocr_pool import ocr_pool
+    return ocr_pool.get_readiness()
+
+def get_ocr_component_status() -> str:
+    """OCR组件状态：预热中为WARMING_UP，完成后为OPERATIONAL"""
+    readiness = get_ocr_readiness()
+    return {
+        "ready": "OPERATIONAL",
+        "warming": "WARMING_UP",
+        "not_started": "STANDBY",
+        "failed": "ERROR"
+    }.get(readiness["state"], "NOT_LOADED")
+
+def get_face_readiness() -> Dict[str, Any]:
+    """人脸工作进程预热状态与进程池统计（不触发检测）"""
+    if not face_router:
+        return {"ready": False, "state": "not_loaded"}
+    from app.services.face_pool import face_pool
+    return face_pool.get_readiness()
+
+def get_face_component_status() -> str:
+    """生物识别组件状态：预热中为WARMING_UP，完成后为OPERATIONAL"""
+    readiness = get_face_readiness()
+    return {
+        "ready": "OPERATIONAL",
+        "warming": "WARMING_UP",
+        "not_started": "STANDBY",
+        "failed": "ERROR"
+    }.get(readiness["state"], "NOT_LOADED")
+
 def get_current_shift() -> str:
     """获取当前班次"""
     hour = datetime.now().hour
@@ -570,6 +690,32 @@ async def startup_industrial_system():
             except Exception as e:
                 logger.warning(f"[STARTUP] ⚠️ 工况识别系统初始化失败: {e}")
         
+        # 后台预热OCR工作进程池，不阻塞其他路由
+        if ocr_router:
+            try:
+                from app.core.config import settings
+                from app.services.ocr_pool import ocr_pool
+                if settings.OCR_WARMUP_ON_STARTUP:
+                    ocr_pool.start_background()
+                    logger.info("[STARTUP] ⏳ OCR引擎正在后台预热，就绪状态见 /ocr/ready")
+                else:
+                    logger.info("[STARTUP] ⏸️ OCR引擎将在首次请求时加载")
+            except Exception as e:
+                logger.warning(f"[STARTUP] ⚠️ OCR进程池预热启动失败: {e}")
+        
+        # 后台预热人脸工作进程池（dlib模型加载与首次推理）
+        if face_router:
+            try:
+                from app.core.config import settings
+                from app.services.face_pool import face_pool
+                if settings.FACE_WARMUP_ON_STARTUP:
+                    face_pool.start_background()
+                    logger.info("[STARTUP] ⏳ 人脸识别模型正在后台预热，就绪状态见 /face/test")
+                else:
+                    logger.info("[STARTUP] ⏸️ 人脸识别模型将在首次请求时加载")
+            except Exception as e:
+                logger.warning(f"[STARTUP] ⚠️ 人脸进程池预热启动失败: {e}")
+        
         # 检查系统资源
         cpu_count = psutil.cpu_count()
         memory_gb = psutil.virtual_memory().total / (1024**3)
@@ -651,6 +797,22 @@ async def shutdown_industrial_system():
         except Exception as e:
             logger.warning(f"[SHUTDOWN] ⚠️ 清理PDF文件失败: {e}")
     
+    if ocr_router:
+        try:
+            from app.services.ocr_pool import ocr_pool
+            ocr_pool.shutdown()
+            logger.info("[SHUTDOWN] 🧹 OCR进程池已关闭")
+        except Exception as e:
+            logger.warning(f"[SHUTDOWN] ⚠️ 关闭OCR进程池失败: {e}")
+    
+    if face_router:
+        try:
+            from app.services.face_pool import face_pool
+            face_pool.shutdown()
+            logger.info("[SHUTDOWN] 🧹 人脸进程池已关闭")
+        except Exception as e:
+            logger.warning(f"[SHUTDOWN] ⚠️ 关闭人脸进程池失败: {e}")
+    
     logger.info("[SHUTDOWN] 💾 保存系统状态...")
     logger.info("[SHUTDOWN] ✅ 系统已安全关闭")
 
@@ -707,6 +869,10 @@ async def industrial_server_error_handler(request, exc):
 # ========== 开发调试 ==========
 if __name__ == "__main__":
     import uvicorn
+    import multiprocessing
+    
+    # 打包为exe后，OCR工作进程需要此调用
+    multiprocessing.freeze_support()
     
     # 获取网络信息
     local_ips = get_all_local_ips()
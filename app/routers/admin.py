@@ -87,6 +87,7 @@ import platform
 
 # 导入真实的使用追踪系统
 from app.services.usage_tracker import usage_tracker, ServiceType
+from app.schemas.ocr import OCRTemplate
 
 # ========== 配置区域 ==========
 SECRET_KEY = "tianmu_secret_key_2025"
@@ -778,7 +779,10 @@ async def dashboard_page():
                 'face_recognition': '人脸识别',
                 'face_register': '人脸注册',
                 'face_verify': '人脸验证',
-                'face_detect': '人脸检测'
+                'face_detect': '人脸检测',
+                'face_identify': '人脸识别(1:N)',
+                'face_register_batch': '人脸批量注册',
+                'face_verify_stream': '人脸视频流验证'
             };
             return names[service] || service;
         }
@@ -1349,4 +1353,114 @@ async def health_check(current_user: str = Depends(verify_token)):
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "user": current_user
-    }
\ No newline at end of file
+    }
+
+@router.delete("/api/ocr-cache", summary="清空OCR结果缓存")
+async def purge_ocr_cache(current_user: str = Depends(verify_token)):
+    """清空OCR结果缓存（内存与磁盘两级）"""
+    import asyncio
+    from app.services.ocr_cache import ocr_cache
+    
+    cleared = await asyncio.to_thread(ocr_cache.clear)
+    return {
+        "success": True,
+        **cleared,
+        "stats": ocr_cache.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.post("/api/ocr-templates", summary="登记OCR版式模板")
+async def register_ocr_template(template: OCRTemplate, current_user: str = Depends(verify_token)):
+    """新增或覆盖版式模板（同名覆盖）"""
+    from app.services.ocr_templates import template_registry
+    
+    saved = template_registry.register(template)
+    return {
+        "success": True,
+        "template": saved,
+        "version": template_registry.version,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.delete("/api/ocr-templates/{name}", summary="删除OCR版式模板")
+async def delete_ocr_template(name: str, current_user: str = Depends(verify_token)):
+    """删除版式模板"""
+    from app.services.ocr_templates import template_registry
+    
+    if not template_registry.delete(name):
+        raise HTTPException(status_code=404, detail=f"模板不存在: {name}")
+    return {
+        "success": True,
+        "name": name,
+        "version": template_registry.version,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/api/ocr-tuning", summary="OCR调优配置")
+async def get_ocr_tuning(current_user: str = Depends(verify_token)):
+    """当前生效的OCR引擎参数与已保存的调优结果"""
+    from app.services.ocr_pool import ocr_pool
+    from app.services.ocr_tuning import load_tuning_profile
+    
+    return {
+        "active": ocr_pool.engine_settings,
+        "profile": load_tuning_profile(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.post("/api/ocr-tuning", summary="启动OCR调优", status_code=202)
+async def run_ocr_tuning(rounds: int = 3, current_user: str = Depends(verify_token)):
+    """
+    在后台实测线程数×进程数×MKL-DNN组合并保存最佳配置，重启后生效。
+    立即返回，进度通过 /api/ocr-tuning/status 查询；调优与线上OCR争用CPU，建议离线用命令行运行：
+    python -m app.services.ocr_tuning
+    """
+    from app.services.ocr_tuning import tuning_job
+    
+    if not tuning_job.start(rounds=rounds):
+        raise HTTPException(status_code=409, detail="已有调优任务在运行")
+    return {
+        "success": True,
+        "job": tuning_job.get_status(),
+        "message": "调优已在后台启动，完成后结果保存，重启服务后生效",
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/api/ocr-tuning/status", summary="OCR调优进度")
+async def get_ocr_tuning_status(current_user: str = Depends(verify_token)):
+    """后台调优任务的状态与结果"""
+    from app.services.ocr_tuning import tuning_job
+    
+    return {
+        "job": tuning_job.get_status(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/api/face-gallery", summary="服务端人脸库")
+async def list_face_gallery(current_user: str = Depends(verify_token)):
+    """已登记人脸的用户列表（含每人模板数）与存储统计"""
+    from app.services.face_gallery import face_gallery
+    
+    usernames = face_gallery.usernames()
+    return {
+        "usernames": usernames,
+        "templates": {username: face_gallery.template_count(username) for username in usernames},
+        "stats": face_gallery.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.delete("/api/face-gallery/{username}", summary="删除登记人脸")
+async def delete_face_enrollment(username: str, current_user: str = Depends(verify_token)):
+    """从服务端人脸库删除用户"""
+    import asyncio
+    from app.services.face_gallery import face_gallery
+    
+    # 写入需持有跨进程文件锁并刷盘，放到线程中执行
+    if not await asyncio.to_thread(face_gallery.remove, username):
+        raise HTTPException(status_code=404, detail=f"用户未登记: {username}")
+    return {
+        "success": True,
+        "username": username,
+        "stats": face_gallery.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
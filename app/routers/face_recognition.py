@@ -1,82 +1,98 @@
 # app/routers/face_recognition.py - 带统计追踪的人脸识别路由
-from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Request
-from fastapi.responses import JSONResponse
-import face_recognition
+from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Request, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 import numpy as np
-import cv2
 import json
-import base64
+import asyncio
 import logging
-from typing import List, Dict, Any
-from datetime import datetime
+import importlib.util
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from app.schemas.face_recognition import (
-    FaceRecognitionRequest, 
     FaceRecognitionResponse,
-    FaceEncodingRequest,
-    FaceEncodingResponse
+    FaceEncodingResponse,
+    FaceMatch,
+    FaceIdentifyResponse,
+    FaceBatchResponse
 )
-from app.services.usage_tracker import track_usage_simple, ServiceType
+from app.services.usage_tracker import track_usage_simple, ServiceType, usage_tracker
+from app.core.config import settings
+from app.utils.upload import read_upload, sniff_format, inspect_upload, detach_upload
+from app.utils.face_codec import encoding_to_str, encoding_from_str, FaceCodecError
+from app.services.face_pool import face_pool
+from app.services.face_worker import QUALITY_MESSAGES
+from app.services.face_gallery import face_gallery, aggregate_distances
+from app.services.face_batch import BatchItem, read_archive_items, enroll_batch
+from app.services.face_stream import FaceStreamSession, frame_thumbnail
+from app.services.process_pool import PoolBusyError
+
+# dlib 只在人脸工作进程中导入；主进程（以及 spawn 出的各工作进程重新导入本模块时）
+# 只检查依赖是否已安装，不加载模型
+if importlib.util.find_spec("face_recognition") is None:
+    raise ImportError("未安装 face_recognition")
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-def load_image_from_upload(file: UploadFile) -> np.ndarray:
-    """从上传的文件加载图像"""
-    try:
-        # 读取文件内容
-        contents = file.file.read()
-        
-        # 将字节转换为numpy数组
-        nparr = np.frombuffer(contents, np.uint8)
-        
-        # 解码图像
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise ValueError("无法解码图像")
-            
-        # 转换为RGB格式（face_recognition需要RGB格式）
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
-        return image_rgb
-    except Exception as e:
-        logger.error(f"[FACE] 加载图像失败: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"图像加载失败: {str(e)}")
+# OpenCV可解码的图片格式（按文件头判断）
+FACE_IMAGE_FORMATS = frozenset({"png", "jpeg", "bmp", "webp", "tiff"})
 
-def encode_face_encoding(encoding: np.ndarray) -> str:
-    """将人脸编码转换为可存储的字符串格式"""
-    return base64.b64encode(encoding.tobytes()).decode('utf-8')
+# 工业级认证阈值（更严格）
+RECOGNITION_THRESHOLD = 0.6  # 距离阈值
+MIN_CONFIDENCE = 65.0  # 最小置信度（提高到65%）
 
-def decode_face_encoding(encoding_str: str) -> np.ndarray:
-    """将字符串格式的人脸编码转换回numpy数组"""
+def distance_to_confidence(distance: float) -> float:
+    """距离转换为相似度百分比（距离越小，相似度越高）"""
+    return max(0, (1 - distance) * 100)
+
+def is_accepted(distance: float) -> bool:
+    return distance < RECOGNITION_THRESHOLD and distance_to_confidence(distance) >= MIN_CONFIDENCE
+
+async def analyze_upload(file: UploadFile, encode: bool = True) -> Dict[str, Any]:
+    """
+    分块读取上传图像（超过大小上限返回413），在人脸进程池中完成解码、检测与编码。
+    进程池排队已满时返回503。
+    """
+    contents, _ = await read_upload(file, settings.FACE_MAX_UPLOAD_MB, FACE_IMAGE_FORMATS)
     try:
-        bytes_data = base64.b64decode(encoding_str.encode('utf-8'))
-        return np.frombuffer(bytes_data, dtype=np.float64)
-    except Exception as e:
-        logger.error(f"[FACE] 解码人脸编码失败: {str(e)}")
-        raise ValueError(f"无效的人脸编码格式: {str(e)}")
+        result = await face_pool.analyze(contents, encode)
+    except PoolBusyError as e:
+        logger.warning(f"[FACE] 暂时无法处理: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    if result["error"]:
+        logger.error(f"[FACE] 加载图像失败: {result['error']}")
+        raise HTTPException(status_code=400, detail=f"图像加载失败: {result['error']}")
+    return result
+
+def quality_rejection(analysis: Dict[str, Any], service_type: ServiceType) -> Optional[str]:
+    """质量检查未通过时按原因计数，并返回给操作员的提示信息"""
+    reason = analysis.get("rejected")
+    if not reason:
+        return None
+    usage_tracker.record_rejection(service_type, reason)
+    logger.warning(f"[FACE] 图像质量不合格: {reason}, {analysis.get('quality')}")
+    return QUALITY_MESSAGES.get(reason, "图像质量不合格，请重新拍摄")
 
 @router.post("/register", response_model=FaceEncodingResponse)
 @track_usage_simple(ServiceType.FACE_REGISTER)
 async def register_face(
     request: Request,
     file: UploadFile = File(...),
-    username: str = Form(...)
+    username: str = Form(...),
+    append: bool = Form(False)
 ):
-    """人脸注册 - 工业级生物识别注册"""
+    """人脸注册 - 工业级生物识别注册；append=true 时追加为该用户的新模板（默认覆盖）"""
     logger.info(f"[FACE] 开始为操作员 {username} 注册生物识别信息")
     
     try:
-        # 验证文件类型
-        if not file.content_type.startswith('image/'):
-            logger.warning(f"[FACE] 无效文件类型: {file.content_type}")
-            raise HTTPException(status_code=400, detail="只支持图像文件")
+        # 解码、检测人脸位置并提取编码（在人脸进程池中执行）
+        analysis = await analyze_upload(file)
+        face_locations = analysis["locations"]
         
-        # 加载图像
-        image = load_image_from_upload(file)
-        
-        # 检测人脸位置
-        face_locations = face_recognition.face_locations(image)
+        rejection = quality_rejection(analysis, ServiceType.FACE_REGISTER)
+        if rejection:
+            return FaceEncodingResponse(success=False, message=rejection, username=username)
         
         if len(face_locations) == 0:
             logger.warning(f"[FACE] 未检测到人脸: {username}")
@@ -94,10 +110,7 @@ async def register_face(
                 username=username
             )
         
-        # 提取人脸编码
-        face_encodings = face_recognition.face_encodings(image, face_locations)
-        
-        if len(face_encodings) == 0:
+        if analysis["encoding"] is None:
             logger.warning(f"[FACE] 无法提取人脸特征: {username}")
             return FaceEncodingResponse(
                 success=False,
@@ -105,15 +118,22 @@ async def register_face(
                 username=username
             )
         
-        # 编码人脸特征
-        face_encoding = face_encodings[0]
-        encoded_face = encode_face_encoding(face_encoding)
+        # 编码人脸特征，同时保存到服务端人脸库（验证时无需再上传编码）
+        # 写入需持有跨进程文件锁并刷盘，放到线程中执行
+        face_encoding = analysis["encoding"]
+        encoded_face = encoding_to_str(face_encoding)
+        if append:
+            templates = await asyncio.to_thread(face_gallery.add_template, username, face_encoding)
+            message = f"生物识别模板已追加，当前共 {templates} 个模板"
+        else:
+            await asyncio.to_thread(face_gallery.add, username, face_encoding)
+            message = "生物识别注册成功"
         
         logger.info(f"[FACE] 操作员 {username} 生物识别注册成功")
         
         return FaceEncodingResponse(
             success=True,
-            message="生物识别注册成功",
+            message=message,
             username=username,
             face_encoding=encoded_face
         )
@@ -124,28 +144,159 @@ async def register_face(
         logger.error(f"[FACE] 生物识别注册失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"生物识别注册失败: {str(e)}")
 
+def upload_loader(upload: UploadFile) -> Callable[[], Awaitable[bytes]]:
+    """按需读取单个上传图片；过大或格式不符记为该人的错误"""
+    async def load() -> bytes:
+        try:
+            content, _ = await read_upload(upload, settings.FACE_MAX_UPLOAD_MB, FACE_IMAGE_FORMATS)
+        except HTTPException as e:
+            raise ValueError(e.detail)
+        return content
+    return load
+
+async def collect_batch_items(
+    files: Optional[List[UploadFile]],
+    usernames: Optional[List[str]],
+    archive: Optional[UploadFile]
+) -> Tuple[List[BatchItem], Callable[[], Awaitable[None]]]:
+    """
+    整理批量注册条目，不读取图片内容：上传文件与zip成员都在取得并行名额后才读入内存。
+    上传文件由本函数接管（流式响应期间仍需读取），返回条目与释放这些文件的协程函数。
+    """
+    files = files or []
+    if usernames and len(usernames) != len(files):
+        raise HTTPException(status_code=400, detail="usernames 数量与 files 不一致")
+    if len(files) > settings.FACE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"批量注册人数超过上限 {settings.FACE_BATCH_MAX_ITEMS}")
+
+    uploads = [detach_upload(file) for file in files]
+    zip_upload = detach_upload(archive) if archive is not None else None
+    zip_archive = None
+
+    async def close():
+        if zip_archive is not None:
+            zip_archive.close()
+        for upload in uploads + ([zip_upload] if zip_upload is not None else []):
+            await upload.close()
+
+    try:
+        items: List[BatchItem] = []
+        if zip_upload is not None:
+            await inspect_upload(zip_upload, settings.FACE_BATCH_MAX_UPLOAD_MB, {"zip"})
+            try:
+                zip_archive, archive_items = await asyncio.to_thread(read_archive_items, zip_upload.file)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            items.extend(archive_items)
+
+        for i, upload in enumerate(uploads):
+            username = usernames[i] if usernames else Path(upload.filename or f"upload_{i}").stem
+            items.append((username, upload_loader(upload)))
+
+        if not items:
+            raise HTTPException(status_code=400, detail="没有可注册的图片")
+        if len(items) > settings.FACE_BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"批量注册人数超过上限 {settings.FACE_BATCH_MAX_ITEMS}")
+    except BaseException:
+        await close()
+        raise
+    return items, close
+
+@router.post("/register-batch", response_model=FaceBatchResponse)
+@track_usage_simple(ServiceType.FACE_REGISTER_BATCH)
+async def register_faces_batch(
+    request: Request,
+    files: List[UploadFile] = File(None),
+    usernames: List[str] = Form(None),
+    archive: UploadFile = File(None),
+    replace: bool = Form(False),
+    stream: bool = Query(False, description="逐人以NDJSON推送进度")
+):
+    """
+    批量人脸注册 - 多个图片文件（usernames 与 files 一一对应，省略时取文件名），
+    或一个zip压缩包（文件名或子目录名为用户名）。全部完成后一次写入人脸库。
+    已注册的操作员默认追加为新模板（超过上限按淘汰策略移除），replace=true 时覆盖其全部模板。
+    """
+    items, close_uploads = await collect_batch_items(files, usernames, archive)
+    logger.info(f"[FACE] 开始批量注册 {len(items)} 名操作员")
+
+    if stream:
+        async def event_stream():
+            try:
+                async for event in enroll_batch(items, replace):
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+            except Exception as e:
+                logger.error(f"[FACE] 批量注册失败: {str(e)}")
+                yield json.dumps({"event": "error", "done": True, "error": str(e)}, ensure_ascii=False) + "\n"
+            finally:
+                await close_uploads()
+
+        return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+    try:
+        summary = {}
+        async for event in enroll_batch(items, replace):
+            if event.get("done"):
+                summary = event
+    except Exception as e:
+        logger.error(f"[FACE] 批量注册失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量注册失败: {str(e)}")
+    finally:
+        await close_uploads()
+
+    return FaceBatchResponse(
+        success=summary["registered"] > 0,
+        message=f"批量注册完成: 成功 {summary['registered']}/{summary['total']}",
+        total=summary["total"],
+        registered=summary["registered"],
+        failed=summary["failed"],
+        results=summary["results"],
+        elapsed=summary["elapsed"]
+    )
+
 @router.post("/verify", response_model=FaceRecognitionResponse)
 @track_usage_simple(ServiceType.FACE_VERIFY)
 async def verify_face(
     request: Request,
     file: UploadFile = File(...),
     username: str = Form(...),
-    stored_encoding: str = Form(...)
+    stored_encoding: Optional[str] = Form(None)
 ):
-    """人脸验证 - 工业级身份认证"""
+    """人脸验证 - 工业级身份认证；未提供 stored_encoding 时使用服务端人脸库"""
     logger.info(f"[FACE] 开始验证操作员 {username} 的身份")
     
     try:
-        # 验证文件类型
-        if not file.content_type.startswith('image/'):
-            logger.warning(f"[FACE] 无效文件类型: {file.content_type}")
-            raise HTTPException(status_code=400, detail="只支持图像文件")
-        
-        # 加载当前图像
-        current_image = load_image_from_upload(file)
-        
-        # 检测当前图像中的人脸
-        current_face_locations = face_recognition.face_locations(current_image)
+        # 先取比对编码，未注册的用户不必做检测
+        if stored_encoding:
+            try:
+                # 兼容旧版 float64 base64 与 JSON 列表
+                stored_face_encodings = encoding_from_str(stored_encoding).reshape(1, -1)
+            except FaceCodecError as e:
+                logger.error(f"[FACE] 无效的存储编码: {username}, {e}")
+                return FaceRecognitionResponse(
+                    success=False,
+                    message="存储的生物识别数据无效，请重新注册",
+                    username=username,
+                    confidence=0.0
+                )
+        else:
+            stored_face_encodings = None
+            if username not in face_gallery:
+                logger.warning(f"[FACE] 验证失败 - 操作员未注册: {username}")
+                return FaceRecognitionResponse(
+                    success=False,
+                    message="该操作员尚未注册生物识别信息",
+                    username=username,
+                    confidence=0.0
+                )
+        
+        # 解码、检测当前图像中的人脸并提取编码（在人脸进程池中执行）
+        analysis = await analyze_upload(file)
+        current_face_locations = analysis["locations"]
+        
+        rejection = quality_rejection(analysis, ServiceType.FACE_VERIFY)
+        if rejection:
+            return FaceRecognitionResponse(success=False, message=rejection, username=username, confidence=0.0)
         
         if len(current_face_locations) == 0:
             logger.warning(f"[FACE] 验证失败 - 未检测到人脸: {username}")
@@ -165,10 +316,7 @@ async def verify_face(
                 confidence=0.0
             )
         
-        # 提取当前人脸编码
-        current_face_encodings = face_recognition.face_encodings(current_image, current_face_locations)
-        
-        if len(current_face_encodings) == 0:
+        if analysis["encoding"] is None:
             logger.warning(f"[FACE] 验证失败 - 无法提取人脸特征: {username}")
             return FaceRecognitionResponse(
                 success=False,
@@ -177,41 +325,46 @@ async def verify_face(
                 confidence=0.0
             )
         
-        # 解码存储的人脸编码
-        try:
-            stored_face_encoding = decode_face_encoding(stored_encoding)
-        except ValueError as e:
-            logger.error(f"[FACE] 无效的存储编码: {username}")
-            return FaceRecognitionResponse(
-                success=False,
-                message="存储的生物识别数据无效，请重新注册",
-                username=username,
-                confidence=0.0
-            )
-        
         # 比较人脸
-        current_encoding = current_face_encodings[0]
+        current_encoding = analysis["encoding"]
         
-        # 计算人脸距离（越小越相似）
-        face_distances = face_recognition.face_distance([stored_face_encoding], current_encoding)
-        face_distance = face_distances[0]
+        # 一次计算到该用户全部模板的距离（越小越相似），再按配置汇总
+        if stored_face_encodings is not None:
+            face_distances = np.linalg.norm(stored_face_encodings - current_encoding, axis=1)
+        else:
+            face_distances = await asyncio.to_thread(face_gallery.distances, username, current_encoding)
+            if face_distances is None:
+                logger.warning(f"[FACE] 验证失败 - 操作员已被删除: {username}")
+                return FaceRecognitionResponse(
+                    success=False,
+                    message="该操作员尚未注册生物识别信息",
+                    username=username,
+                    confidence=0.0
+                )
+        face_distance = aggregate_distances(face_distances, settings.FACE_MATCH_AGGREGATE, settings.FACE_MATCH_TOP_K)
         
         # 转换为相似度百分比（距离越小，相似度越高）
-        confidence = max(0, (1 - face_distance) * 100)
-        
-        # 工业级认证阈值（更严格）
-        RECOGNITION_THRESHOLD = 0.6  # 距离阈值
-        MIN_CONFIDENCE = 65.0  # 最小置信度（提高到65%）
-        
-        is_match = face_distance < RECOGNITION_THRESHOLD and confidence >= MIN_CONFIDENCE
+        confidence = distance_to_confidence(face_distance)
+        is_match = is_accepted(face_distance)
         
         if is_match:
+            # 高置信度且与已有模板差异足够时追加为新模板（适应光照、眼镜等变化）
+            template_added = (
+                settings.FACE_AUTO_ADD_TEMPLATE
+                and not stored_encoding
+                and face_distance <= settings.FACE_AUTO_ADD_MAX_DISTANCE
+                and float(face_distances.min()) >= settings.FACE_AUTO_ADD_MIN_NOVELTY
+            )
+            if template_added:
+                await asyncio.to_thread(face_gallery.add_template, username, current_encoding)
+            
             logger.info(f"[FACE] 操作员 {username} 身份验证成功，置信度: {confidence:.2f}%")
             return FaceRecognitionResponse(
                 success=True,
                 message=f"身份验证成功，访问权限已授予 - 置信度: {confidence:.1f}%",
                 username=username,
-                confidence=confidence
+                confidence=confidence,
+                template_added=template_added
             )
         else:
             logger.warning(f"[FACE] 操作员 {username} 身份验证失败，置信度: {confidence:.2f}%")
@@ -228,6 +381,202 @@ async def verify_face(
         logger.error(f"[FACE] 身份验证失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"身份验证失败: {str(e)}")
 
+async def close_stream(websocket: WebSocket, message: str, code: int = 1008):
+    await websocket.send_json({"event": "error", "message": message})
+    await websocket.close(code=code)
+
+@router.websocket("/verify-stream")
+async def verify_face_stream(websocket: WebSocket):
+    """
+    视频流人脸验证 - 首条消息为JSON {"username", "stored_encoding"(可选), "frames"(可选)}，
+    之后每条二进制消息为一帧JPEG/PNG。每处理一帧推送 {"event": "frame", ...}，
+    连续N帧结论一致时推送 {"event": "decision", ...}，之后可继续验证下一人。
+    """
+    await websocket.accept()
+    client_ip = websocket.client.host if websocket.client else "unknown"
+    try:
+        config = await asyncio.wait_for(websocket.receive_json(), settings.FACE_STREAM_IDLE_SECONDS)
+        username = str(config.get("username") or "")
+        required_frames = int(config.get("frames") or settings.FACE_STREAM_CONSECUTIVE)
+    except (asyncio.TimeoutError, ValueError, KeyError, TypeError, AttributeError):
+        await close_stream(websocket, "首条消息应为JSON配置: {\"username\": ...}")
+        return
+    except WebSocketDisconnect:
+        return
+
+    if not username:
+        await close_stream(websocket, "缺少 username")
+        return
+
+    # 比对编码只在建立连接时取一次
+    if config.get("stored_encoding"):
+        try:
+            stored_encodings = encoding_from_str(config["stored_encoding"])
+        except FaceCodecError as e:
+            await close_stream(websocket, f"存储的生物识别数据无效: {e}")
+            return
+    else:
+        stored_encodings = await asyncio.to_thread(face_gallery.get, username)
+        if stored_encodings is None:
+            await close_stream(websocket, "该操作员尚未注册生物识别信息")
+            return
+
+    session = FaceStreamSession(
+        username,
+        stored_encodings,
+        required_frames,
+        is_accepted,
+        settings.FACE_STREAM_CHANGE_THRESHOLD
+    )
+    max_bytes = int(settings.FACE_MAX_UPLOAD_MB * 1024 * 1024)
+    tasks = set()
+    logger.info(f"[FACE] 视频流验证开始: {username}, 需连续 {session.required_frames} 帧一致")
+    await websocket.send_json({"event": "ready", "username": username, "required_frames": session.required_frames})
+
+    async def send_result(result: dict):
+        """推送单帧结论，连续帧数达到要求时再推送验证结果"""
+        if result["distance"] is not None:
+            result["confidence"] = distance_to_confidence(result["distance"])
+        elif result["status"] in QUALITY_MESSAGES:
+            usage_tracker.record_rejection(ServiceType.FACE_VERIFY_STREAM, result["status"])
+            result["message"] = QUALITY_MESSAGES[result["status"]]
+        await websocket.send_json(result)
+
+        decision = session.decision()
+        if decision:
+            decision["confidence"] = distance_to_confidence(decision["distance"])
+            logger.info(f"[FACE] 视频流验证结果: {username}, 通过: {decision['success']}, "
+                        f"置信度: {decision['confidence']:.2f}%, 统计: {decision['stats']}")
+            await websocket.send_json(decision)
+            await usage_tracker.create_record(
+                service_type=ServiceType.FACE_VERIFY_STREAM,
+                client_ip=client_ip,
+                processing_time=decision["elapsed"],
+                success=decision["success"],
+                response_data={"frames": decision["frames"], **decision["stats"]}
+            )
+
+    async def handle_frame(content: bytes, thumbnail):
+        try:
+            await send_result(await session.process(content, thumbnail))
+        except PoolBusyError:
+            session.stats["skipped_busy"] += 1
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"[FACE] 视频流帧处理失败: {str(e)}")
+        finally:
+            session.busy = False
+
+    try:
+        while True:
+            message = await asyncio.wait_for(websocket.receive(), settings.FACE_STREAM_IDLE_SECONDS)
+            if message["type"] == "websocket.disconnect":
+                break
+            content = message.get("bytes")
+            if not content:
+                continue
+            session.stats["received"] += 1
+
+            if len(content) > max_bytes or sniff_format(content[:16]) not in FACE_IMAGE_FORMATS:
+                await websocket.send_json({"event": "error", "message": "帧格式不支持或超过大小上限"})
+                continue
+            # 上一帧仍在处理时直接丢弃
+            if session.busy:
+                session.stats["skipped_busy"] += 1
+                continue
+            thumbnail = await asyncio.to_thread(frame_thumbnail, content)
+            # 画面未变化时不再送检，按上一处理帧的结论计入连续帧数
+            if session.is_unchanged(thumbnail):
+                result = session.repeat_last()
+                if result:
+                    await send_result(result)
+                continue
+
+            session.busy = True
+            task = asyncio.create_task(handle_frame(content, thumbnail))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except asyncio.TimeoutError:
+        await close_stream(websocket, "连接空闲超时", code=1000)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        logger.info(f"[FACE] 视频流验证结束: {username}, 统计: {session.stats}")
+
+@router.post("/identify", response_model=FaceIdentifyResponse)
+@track_usage_simple(ServiceType.FACE_IDENTIFY)
+async def identify_face(
+    request: Request,
+    file: UploadFile = File(...),
+    top_k: int = Form(None)
+):
+    """人脸1:N识别 - 在服务端人脸库中查找最相似的操作员，无需提供用户名"""
+    top_k = max(1, top_k or settings.FACE_IDENTIFY_TOP_K)
+    logger.info("[FACE] 开始1:N身份识别")
+    
+    try:
+        analysis = await analyze_upload(file)
+        face_count = len(analysis["locations"])
+
+        rejection = quality_rejection(analysis, ServiceType.FACE_IDENTIFY)
+        if rejection:
+            return FaceIdentifyResponse(success=False, message=rejection)
+
+        if face_count == 0:
+            logger.warning("[FACE] 识别失败 - 未检测到人脸")
+            return FaceIdentifyResponse(success=False, message="未检测到人脸，请正对摄像头")
+
+        if face_count > 1:
+            logger.warning("[FACE] 识别失败 - 检测到多张人脸")
+            return FaceIdentifyResponse(success=False, message="检测到多张人脸，请确保只有一人在摄像头前")
+
+        if analysis["encoding"] is None:
+            logger.warning("[FACE] 识别失败 - 无法提取人脸特征")
+            return FaceIdentifyResponse(success=False, message="无法提取人脸特征，请调整光线和角度")
+        
+        # 向量化检索放到线程中执行，避免大库时阻塞事件循环
+        results = await asyncio.to_thread(face_gallery.search, analysis["encoding"], top_k)
+        matches = [
+            FaceMatch(
+                username=item["username"],
+                distance=item["distance"],
+                confidence=distance_to_confidence(item["distance"])
+            )
+            for item in results
+        ]
+        
+        if not matches:
+            logger.warning("[FACE] 识别失败 - 人脸库为空")
+            return FaceIdentifyResponse(success=False, message="人脸库中没有已注册的操作员")
+        
+        best = matches[0]
+        if is_accepted(best.distance):
+            logger.info(f"[FACE] 识别为操作员 {best.username}，置信度: {best.confidence:.2f}%")
+            return FaceIdentifyResponse(
+                success=True,
+                message=f"识别成功: {best.username} - 置信度: {best.confidence:.1f}%",
+                username=best.username,
+                confidence=best.confidence,
+                matches=matches
+            )
+        
+        logger.warning(f"[FACE] 未识别出已注册操作员，最高置信度: {best.confidence:.2f}%")
+        return FaceIdentifyResponse(
+            success=False,
+            message=f"未识别出已注册操作员 - 最高置信度: {best.confidence:.1f}%",
+            confidence=best.confidence,
+            matches=matches
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[FACE] 身份识别失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"身份识别失败: {str(e)}")
+
 @router.post("/detect", response_model=FaceEncodingResponse)
 @track_usage_simple(ServiceType.FACE_DETECT)
 async def detect_face(
@@ -239,15 +588,9 @@ async def detect_face(
     logger.info(f"[FACE] 开始人脸检测: {username}")
     
     try:
-        # 验证文件类型
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="只支持图像文件")
-        
-        # 加载图像
-        image = load_image_from_upload(file)
-        
-        # 检测人脸
-        face_locations = face_recognition.face_locations(image)
+        # 检测人脸（在人脸进程池中执行，不提取编码）
+        analysis = await analyze_upload(file, encode=False)
+        face_locations = analysis["locations"]
         face_count = len(face_locations)
         
         logger.info(f"[FACE] 检测到 {face_count} 张人脸")
@@ -267,66 +610,28 @@ async def detect_face(
 
 @router.get("/test", tags=["Face Recognition"])
 async def test_face_recognition():
-    """测试生物识别系统状态"""
-    try:
-        # 检查face_recognition库是否正常
-        test_image = np.zeros((100, 100, 3), dtype=np.uint8)
-        face_recognition.face_locations(test_image)
-        
-        return {
-            "status": "OPERATIONAL",
-            "service": "Biometric Security System",
-            "version": "2.0.0",
-            "security_level": "INDUSTRIAL_GRADE",
-            "features": [
-                "操作员身份验证",
-                "危险区域准入控制", 
-                "设备操作权限管理",
-                "安全事件实时告警"
-            ],
-            "available_endpoints": [
-                "/face/register - 生物识别注册",
-                "/face/verify - 身份验证", 
-                "/face/detect - 人脸检测",
-                "/face/test - 系统测试"
-            ]
-        }
-    except Exception as e:
-        logger.error(f"[FACE] 生物识别系统测试失败: {str(e)}")
-    raise HTTPException(status_code=500, detail=f"系统异常: {str(e)}")
-
-@router.post("/detect", response_model=FaceEncodingResponse)
-async def detect_face_redirect(
-    request: Request,
-    file: UploadFile = File(...),
-    username: str = Form(...)
-):
-    """
-    兼容性端点 - 重定向到 register 端点
-    """
-    logger.warning("使用了已弃用的 /face/detect 端点，请使用 /face/register")
-    return await register_face(request, file, username)
-
-@router.get("/test", tags=["Face Recognition"])
-async def test_face_recognition():
-    """测试人脸识别服务是否正常工作"""
-    try:
-        # 检查face_recognition库是否正常
-        test_image = np.zeros((100, 100, 3), dtype=np.uint8)
-        face_recognition.face_locations(test_image)
-        
-        return {
-            "status": "success",
-            "message": "人脸识别服务正常",
-            "library_version": face_recognition.__version__ if hasattr(face_recognition, '__version__') else "unknown",
-            "available_endpoints": [
-                "/face/register - 注册人脸",
-                "/face/verify - 验证人脸", 
-                "/face/recognize - (已弃用) 重定向到 verify",
-                "/face/detect - (已弃用) 重定向到 register",
-                "/face/test - 服务测试"
-            ]
-        }
-    except Exception as e:
-        logger.error(f"人脸识别服务测试失败: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"服务异常: {str(e)}")
\ No newline at end of file
+    """生物识别系统状态 - 读取预热与进程池的缓存状态，不执行检测"""
+    readiness = face_pool.get_readiness()
+    return {
+        "status": "OPERATIONAL" if readiness["ready"] else readiness["state"].upper(),
+        "service": "Biometric Security System",
+        "version": "2.0.0",
+        "security_level": "INDUSTRIAL_GRADE",
+        "features": [
+            "操作员身份验证",
+            "危险区域准入控制", 
+            "设备操作权限管理",
+            "安全事件实时告警"
+        ],
+        "readiness": readiness,
+        "gallery": face_gallery.get_stats(),
+        "available_endpoints": [
+            "/face/register - 生物识别注册",
+            "/face/register-batch - 批量注册（多文件或zip，可流式进度）",
+            "/face/verify - 身份验证", 
+            "/face/identify - 1:N身份识别",
+            "/face/verify-stream - 视频流身份验证（WebSocket）",
+            "/face/detect - 人脸检测",
+            "/face/test - 系统状态"
+        ]
+    }
@@ -2,11 +2,17 @@
 # app/routers/ocr.py
 # ===========================================
 import os
-import tempfile
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request
-from fastapi.responses import JSONResponse
-from app.services.ocr_service import extract_parameters
-from app.schemas.ocr import OCRResponse
+from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.config import settings
+from app.services.ocr_pool import ocr_pool, OCRNotReadyError
+from app.services.ocr_cache import ocr_cache
+from app.services.process_pool import PoolBusyError
+from app.services.ocr_document import detect_document_kind, open_document, stream_document_ocr, PDF_SUPPORTED
+from app.services.ocr_templates import template_registry
+from app.utils.upload import read_upload, inspect_upload, detach_upload, IMAGE_FORMATS, FORMAT_SUFFIXES
+from app.schemas.ocr import OCRResponse, OCRBatchItem, OCRBatchResponse, OCRTemplateResponse
 # from app.services.usage_tracker import track_usage_simple  # 如果有使用追踪功能
 from datetime import datetime
 import logging
@@ -16,37 +22,179 @@ router = APIRouter()
 
 @router.post("/table", response_model=OCRResponse)
 # @track_usage_simple("ocr")  # 如果需要使用追踪，取消注释
-async def table_ocr(request: Request, file: UploadFile = File(...)):
+async def table_ocr(
+    request: Request,
+    file: UploadFile = File(...),
+    structured: bool = Query(False, description="同时返回按位置配对的 参数名->值 及置信度")
+):
     """OCR文字识别 - 提取图片中所有文字内容"""
     logger.info(f"[OCR] 接收OCR请求: {file.filename}, 大小: {file.size if hasattr(file, 'size') else 'unknown'}")
     
-    # 只支持常见图片格式
-    ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in (".png", ".jpg", ".jpeg", ".bmp"):
-        logger.warning(f"[OCR] 不支持的文件格式: {ext}")
-        raise HTTPException(400, "不支持的文件格式，请使用PNG、JPG、JPEG或BMP格式")
-
-    # 存为临时文件
-    with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp:
-        content = await file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+    # 只支持常见图片格式（按文件头判断）
+    content, fmt = await read_upload(file, settings.OCR_MAX_UPLOAD_MB, IMAGE_FORMATS)
 
     try:
-        logger.info(f"[OCR] 开始处理文件: {tmp_path}")
-        text_result = extract_parameters(tmp_path)  # 现在返回的是连接的文字字符串
+        logger.info(f"[OCR] 提交到OCR进程池: {file.filename}")
+        result = await ocr_pool.extract(content, FORMAT_SUFFIXES[fmt], structured)  # 推理在工作进程中执行，不阻塞事件循环
+        if result.get("error"):
+            raise HTTPException(400, result["error"])
+        text_result = result["text"]
         logger.info(f"[OCR] 识别完成，提取文字长度: {len(text_result)} 字符")
         
-        return JSONResponse(content={"text": text_result})  # 返回 text 字段而不是 parameters
+        response = {"text": text_result, "preprocess": result.get("preprocess")}
+        if structured:
+            response["fields"] = result.get("fields", {})
+            response["confidence"] = result.get("confidence", {})
+            response["lines"] = result.get("lines", [])
+        return JSONResponse(content=response)
         
+    except (PoolBusyError, OCRNotReadyError) as e:
+        logger.warning(f"[OCR] 暂时无法处理: {e}")
+        raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.warning(f"[OCR] 图像无法读取: {e}")
+        raise HTTPException(400, f"图像无法读取: {str(e)}")
     except Exception as e:
         logger.error(f"[OCR] 处理失败: {str(e)}")
         raise HTTPException(500, f"OCR处理失败: {str(e)}")
-    finally:
-        # 清理临时文件
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
-            logger.debug(f"[OCR] 清理临时文件: {tmp_path}")
+
+@router.post("/batch", response_model=OCRBatchResponse)
+async def batch_ocr(request: Request, files: List[UploadFile] = File(...)):
+    """批量OCR识别 - 一次上传多张图片，合并为一次批量推理，按上传顺序返回"""
+    logger.info(f"[OCR] 接收批量OCR请求: {len(files)} 张图片")
+    
+    if len(files) > settings.OCR_BATCH_MAX_FILES:
+        raise HTTPException(400, f"单次最多上传 {settings.OCR_BATCH_MAX_FILES} 张图片")
+
+    items: List[OCRBatchItem] = []
+    contents = []
+    positions = []
+    for index, file in enumerate(files):
+        filename = file.filename or f"image_{index}"
+        try:
+            content, _ = await read_upload(file, settings.OCR_MAX_UPLOAD_MB, IMAGE_FORMATS)
+        except HTTPException as e:
+            # 超过大小上限、格式不符等只记为该张图片的错误，不影响同批其他图片
+            items.append(OCRBatchItem(index=index, filename=filename, success=False, error=e.detail))
+            continue
+        items.append(OCRBatchItem(index=index, filename=filename, success=False))
+        contents.append(content)
+        positions.append(index)
+
+    if contents:
+        try:
+            results = await ocr_pool.extract_batch(contents)
+        except (PoolBusyError, OCRNotReadyError) as e:
+            logger.warning(f"[OCR] 暂时无法处理: {e}")
+            raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+        except Exception as e:
+            logger.error(f"[OCR] 批量处理失败: {str(e)}")
+            raise HTTPException(500, f"OCR批量处理失败: {str(e)}")
+
+        for index, result in zip(positions, results):
+            item = items[index]
+            item.error = result.get("error")
+            item.success = item.error is None
+            item.text = result.get("text", "")
+            item.preprocess = result.get("preprocess")
+
+    succeeded = sum(1 for item in items if item.success)
+    logger.info(f"[OCR] 批量识别完成: 成功 {succeeded}/{len(items)}")
+    return OCRBatchResponse(
+        total=len(items),
+        succeeded=succeeded,
+        failed=len(items) - succeeded,
+        results=items
+    )
+
+@router.post("/template", response_model=OCRTemplateResponse)
+async def template_ocr(
+    request: Request,
+    file: UploadFile = File(...),
+    template: str = Form(None)
+):
+    """版式模板识别 - 匹配已登记版式时只识别字段区域，未匹配时回退整页识别"""
+    logger.info(f"[OCR] 接收模板OCR请求: {file.filename}, 指定模板: {template or '自动匹配'}")
+    
+    content, _ = await read_upload(file, settings.OCR_MAX_UPLOAD_MB, IMAGE_FORMATS)
+
+    try:
+        result = await ocr_pool.extract_with_template(content, template)
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    except (PoolBusyError, OCRNotReadyError) as e:
+        logger.warning(f"[OCR] 暂时无法处理: {e}")
+        raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error(f"[OCR] 模板识别失败: {str(e)}")
+        raise HTTPException(500, f"OCR处理失败: {str(e)}")
+
+    if result.get("error"):
+        raise HTTPException(400, result["error"])
+    logger.info(f"[OCR] 模板识别完成: 模板 {result.get('template') or '未匹配'}, 字段 {len(result.get('fields', {}))} 个")
+    return OCRTemplateResponse(**result)
+
+@router.get("/templates", tags=["OCR"])
+async def list_templates():
+    """已登记的版式模板"""
+    templates = template_registry.list()
+    return {"count": len(templates), "version": template_registry.version, "templates": templates}
+
+@router.post("/document")
+async def document_ocr(
+    request: Request,
+    file: UploadFile = File(...),
+    stream_format: str = Query("ndjson", pattern="^(ndjson|sse)$")
+):
+    """多页文档OCR - 支持PDF/TIFF，逐页并行识别，每页完成即以NDJSON或SSE推送"""
+    logger.info(f"[OCR] 接收文档OCR请求: {file.filename}")
+    
+    # 文档不读入内存：接管上传的临时文件交给栅格化器按页读取，流式响应结束时由栅格化器关闭
+    upload = detach_upload(file)
+    try:
+        await inspect_upload(upload, settings.OCR_DOCUMENT_MAX_UPLOAD_MB)
+        head = await upload.read(16)
+        await upload.seek(0)
+        ext = os.path.splitext(file.filename or "")[1].lower()
+        kind = detect_document_kind(head, ext)
+        if kind is None:
+            raise HTTPException(400, "不支持的文档格式，请使用PDF或TIFF格式")
+        if kind == "pdf" and not PDF_SUPPORTED:
+            raise HTTPException(400, "服务器未安装PyMuPDF，暂不支持PDF文档")
+
+        try:
+            await ocr_pool.wait_ready()
+        except OCRNotReadyError as e:
+            raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+    except BaseException:
+        await upload.close()
+        raise
+
+    try:
+        rasterizer = await open_document(upload.file, kind)
+    except Exception as e:
+        logger.warning(f"[OCR] 文档解析失败: {e}")
+        raise HTTPException(400, f"文档解析失败: {str(e)}")
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_document_ocr(rasterizer, file.filename or "document", stream_format),
+        media_type=media_type
+    )
+
+@router.get("/ready", tags=["OCR"])
+async def ocr_readiness():
+    """OCR引擎就绪检查 - 预热完成返回200，否则返回503"""
+    readiness = ocr_pool.get_readiness()
+    if readiness["ready"]:
+        return readiness
+    return JSONResponse(
+        status_code=503,
+        content=readiness,
+        headers={"Retry-After": str(settings.OCR_RETRY_AFTER_SECONDS)}
+    )
 
 @router.get("/test", tags=["OCR"])
 async def test_ocr_service():
@@ -56,11 +204,32 @@ async def test_ocr_service():
         "service": "OCR Text Recognition Engine",
         "version": "2.0.0",
         "supported_formats": ["PNG", "JPG", "JPEG", "BMP"],
+        "document_formats": ["TIFF"] + (["PDF"] if PDF_SUPPORTED else []),
         "features": [
             "全文字识别",
             "多格式图片支持", 
             "中英文混合识别",
             "文字内容提取"
         ],
-        "output_format": "分号分隔的连续文字"
-    }
\ No newline at end of file
+        "output_format": "分号分隔的连续文字",
+        "endpoints": [
+            "/ocr/table - 单张图片识别",
+            "/ocr/batch - 多张图片批量识别",
+            "/ocr/document - 多页PDF/TIFF逐页流式识别",
+            "/ocr/template - 按版式模板只识别字段区域",
+            "/ocr/templates - 已登记的版式模板",
+            "/ocr/ready - 引擎就绪检查"
+        ],
+        "readiness": ocr_pool.get_readiness(),
+        "preprocess": {
+            "max_long_edge": settings.OCR_PREPROCESS_MAX_LONG_EDGE,
+            "target_dpi": settings.OCR_PREPROCESS_TARGET_DPI,
+            "grayscale": settings.OCR_PREPROCESS_GRAYSCALE,
+            "crop_borders": settings.OCR_PREPROCESS_CROP_BORDERS
+        },
+        "worker_pool": ocr_pool.get_stats(),
+        "engine": {"backend": settings.OCR_BACKEND, **ocr_pool.engine_settings},
+        "micro_batcher": ocr_pool.get_batcher_stats(),
+        "single_flight": ocr_pool.get_single_flight_stats(),
+        "result_cache": ocr_cache.get_stats()
+    }
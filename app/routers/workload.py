@@ -31,6 +31,7 @@ class WorkloadOCRRequest(BaseModel):
     """OCR输入请求"""
     ocr_parameters: Dict[str, str]
     language: str = "zh"
+    confidence: Optional[Dict[str, float]] = None  # /ocr/table?structured=true 返回的置信度，全部达标时跳过LLM参数提取
 
 class LLMSwitchRequest(BaseModel):
     """LLM切换请求"""
@@ -61,7 +62,9 @@ async def recognize_from_ocr(request: WorkloadOCRRequest):
     
     try:
         service = get_workload_service()
-        result = await service.recognize_from_ocr(request.ocr_parameters, request.language)
+        result = await service.recognize_from_ocr(
+            request.ocr_parameters, request.language, param_confidence=request.confidence
+        )
         
         logger.info(f"[工况识别] OCR识别完成，测试类型: {result.test_type}, 阶段数: {result.total_phases}")
         return result
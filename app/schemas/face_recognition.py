@@ -1,12 +1,12 @@
 # app/schemas/face_recognition.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class FaceRecognitionRequest(BaseModel):
     """人脸识别请求"""
     username: str
-    stored_encoding: str
+    stored_encoding: Optional[str] = None  # 不提供时使用服务端人脸库
     
 class FaceRecognitionResponse(BaseModel):
     """人脸识别响应"""
@@ -14,6 +14,50 @@ class FaceRecognitionResponse(BaseModel):
     message: str
     username: str
     confidence: float
+    template_added: bool = False  # 本次验证是否自动追加了新模板
+    timestamp: Optional[datetime] = None
+    
+    def __init__(self, **data):
+        if 'timestamp' not in data:
+            data['timestamp'] = datetime.now()
+        super().__init__(**data)
+
+class FaceMatch(BaseModel):
+    """1:N识别候选"""
+    username: str
+    distance: float
+    confidence: float
+
+class FaceIdentifyResponse(BaseModel):
+    """人脸1:N识别响应"""
+    success: bool
+    message: str
+    username: Optional[str] = None  # 通过阈值的最佳匹配
+    confidence: float = 0.0
+    matches: List[FaceMatch] = []
+    timestamp: Optional[datetime] = None
+    
+    def __init__(self, **data):
+        if 'timestamp' not in data:
+            data['timestamp'] = datetime.now()
+        super().__init__(**data)
+
+class FaceBatchItem(BaseModel):
+    """批量注册中单人的结果"""
+    index: int
+    username: str
+    status: str  # registered / no_face / multiple_faces / no_encoding / invalid_image / duplicate / error，或质量拒绝原因（blurry / too_dark / too_bright / face_too_small）
+    message: str
+
+class FaceBatchResponse(BaseModel):
+    """批量人脸注册响应"""
+    success: bool
+    message: str
+    total: int
+    registered: int
+    failed: int
+    results: List[FaceBatchItem] = []
+    elapsed: float = 0.0
     timestamp: Optional[datetime] = None
     
     def __init__(self, **data):
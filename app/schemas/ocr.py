@@ -1,5 +1,48 @@
 # app/schemas/ocr.py
 from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
 
 class OCRResponse(BaseModel):
-    text: str  # 将 parameters 改为 text，存储用分号连接的全部文字
\ No newline at end of file
+    text: str  # 将 parameters 改为 text，存储用分号连接的全部文字
+    preprocess: Optional[Dict[str, Any]] = None  # 预处理缩放比例与裁剪偏移，用于坐标映射回原图
+    fields: Optional[Dict[str, str]] = None  # 结构化模式：参数名 -> 值
+    confidence: Optional[Dict[str, float]] = None  # 结构化模式：每个参数的置信度
+    lines: Optional[List[Dict[str, Any]]] = None  # 结构化模式：逐行文字、置信度与原图坐标框
+
+class OCRBatchItem(BaseModel):
+    """批量识别中单张图片的结果"""
+    index: int
+    filename: str
+    success: bool
+    text: str = ""
+    preprocess: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class OCRBatchResponse(BaseModel):
+    """批量识别响应，results 与上传顺序一致"""
+    total: int
+    succeeded: int
+    failed: int
+    results: List[OCRBatchItem]
+
+class OCRTemplateAnchor(BaseModel):
+    """锚点：模板中固定出现的文字及其位置，用于确认版式"""
+    text: str
+    box: List[int]  # [x1, y1, x2, y2]，模板图片坐标
+
+class OCRTemplate(BaseModel):
+    """版式模板：登记字段框，匹配后只识别这些区域"""
+    name: str
+    width: int
+    height: int
+    size_tolerance: float = 0.25  # 尺寸相对偏差上限
+    aspect_tolerance: float = 0.03  # 宽高比相对偏差上限
+    anchors: List[OCRTemplateAnchor] = []
+    fields: Dict[str, List[int]]  # 字段名 -> [x1, y1, x2, y2]
+
+class OCRTemplateResponse(BaseModel):
+    """模板识别响应，fields 可直接作为工况识别的 ocr_parameters"""
+    template: Optional[str] = None
+    fields: Dict[str, str] = {}
+    confidence: Dict[str, float] = {}
+    text: str = ""
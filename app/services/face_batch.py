@@ -0,0 +1,166 @@
+# app/services/face_batch.py - 批量人脸注册
+"""
+换班时一次登记几十到上百名操作员：
+- 图片按需读取：每人的图片（上传文件或zip成员）在取得并行名额后才读入内存，用完即释放；
+- 解码、检测与编码分散到人脸进程池的各工作进程，同时在途的任务数不超过工作进程数，
+  不占满排队名额，门禁验证请求仍可正常排队；
+- 全部编码完成后一次性写入人脸库（一次flush、一次索引落盘），已登记用户默认追加模板，replace 时覆盖；
+- 每完成一人产出一条进度事件，最后一条为 {"done": true, ...} 汇总。
+"""
+import time
+import asyncio
+import logging
+import zipfile
+from pathlib import PurePosixPath
+from typing import IO, Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from app.core.config import settings
+from app.services.face_pool import face_pool
+from app.services.face_worker import QUALITY_MESSAGES
+from app.services.face_gallery import face_gallery
+from app.services.process_pool import PoolBusyError
+from app.services.usage_tracker import usage_tracker, ServiceType
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+BUSY_RETRIES = 10  # 进程池被其他请求占满时的重试次数
+
+# (用户名, 读取图片字节的协程函数)；读取失败时抛出 ValueError，记为该人的错误
+BatchItem = Tuple[str, Callable[[], Awaitable[bytes]]]
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    max_bytes = int(settings.FACE_MAX_UPLOAD_MB * 1024 * 1024)
+    if info.file_size > max_bytes:
+        raise ValueError(f"文件过大，上限 {settings.FACE_MAX_UPLOAD_MB:g}MB")
+    # ZipExtFile 最多解压出 file_size 字节，声明的大小即实际内存上限
+    return archive.read(info)
+
+def read_archive_items(fileobj: IO[bytes]) -> Tuple[zipfile.ZipFile, List[BatchItem]]:
+    """
+    解析zip压缩包目录（不解压）：文件名（不含扩展名）为用户名，或以子目录名为用户名（目录下取第一张图片）。
+    解压后总大小超过 FACE_BATCH_MAX_UNCOMPRESSED_MB 时整包拒绝（防止压缩炸弹）；
+    单个文件超过 FACE_MAX_UPLOAD_MB 时记为该人的错误。
+    返回打开的压缩包（由调用方在全部读取完成后关闭）与按需读取的条目。
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise ValueError("无效的zip压缩包")
+
+    members: List[Tuple[str, zipfile.ZipInfo]] = []
+    seen = set()
+    for info in sorted(archive.infolist(), key=lambda i: i.filename):
+        path = PurePosixPath(info.filename)
+        if info.is_dir() or path.suffix.lower() not in ARCHIVE_IMAGE_SUFFIXES:
+            continue
+        if any(part.startswith((".", "__MACOSX")) for part in path.parts):
+            continue
+        username = path.parent.name if len(path.parts) > 1 else path.stem
+        if username in seen:
+            continue
+        seen.add(username)
+        members.append((username, info))
+
+    max_total = int(settings.FACE_BATCH_MAX_UNCOMPRESSED_MB * 1024 * 1024)
+    if sum(info.file_size for _, info in members) > max_total:
+        archive.close()
+        raise ValueError(f"压缩包解压后超过上限 {settings.FACE_BATCH_MAX_UNCOMPRESSED_MB:g}MB")
+
+    def loader(info: zipfile.ZipInfo) -> Callable[[], Awaitable[bytes]]:
+        return lambda: asyncio.to_thread(_read_member, archive, info)
+
+    return archive, [(username, loader(info)) for username, info in members]
+
+def _classify(analysis: Dict[str, Any]) -> Tuple[str, str]:
+    """检测结果 -> (状态, 说明)"""
+    if analysis["error"]:
+        return "invalid_image", f"图像加载失败: {analysis['error']}"
+    if analysis["rejected"]:
+        usage_tracker.record_rejection(ServiceType.FACE_REGISTER_BATCH, analysis["rejected"])
+        return analysis["rejected"], QUALITY_MESSAGES.get(analysis["rejected"], "图像质量不合格")
+    face_count = len(analysis["locations"])
+    if face_count == 0:
+        return "no_face", "未检测到人脸"
+    if face_count > 1:
+        return "multiple_faces", f"检测到 {face_count} 张人脸"
+    if analysis["encoding"] is None:
+        return "no_encoding", "无法提取人脸特征"
+    return "registered", "生物识别注册成功"
+
+async def _analyze_with_retry(content: bytes) -> Dict[str, Any]:
+    """进程池被其他请求占满时稍后重试，批量任务不向调用方返回503"""
+    for attempt in range(BUSY_RETRIES):
+        try:
+            return await face_pool.analyze(content)
+        except PoolBusyError as e:
+            if attempt == BUSY_RETRIES - 1:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+async def enroll_batch(items: List[BatchItem], replace: bool = False) -> AsyncIterator[Dict[str, Any]]:
+    """逐人产出进度事件；全部完成后把成功的编码一次写入人脸库（replace 为True时覆盖已有模板）"""
+    start_time = time.perf_counter()
+    total = len(items)
+    logger.info(f"[FACE-BATCH] 开始批量注册: {total} 人, 并行 {face_pool.pool.workers}")
+    yield {"event": "start", "total": total}
+
+    slots = asyncio.Semaphore(face_pool.pool.workers)
+    results: asyncio.Queue = asyncio.Queue()
+    tasks = []
+
+    async def enroll_one(index: int, username: str, load: Callable[[], Awaitable[bytes]], duplicate: bool):
+        encoding = None
+        try:
+            if duplicate:
+                status, message = "duplicate", "同一批次中用户名重复"
+            else:
+                analysis = await _analyze_with_retry(await load())
+                status, message = _classify(analysis)
+                encoding = analysis["encoding"] if status == "registered" else None
+        except Exception as e:
+            logger.warning(f"[FACE-BATCH] {username} 处理失败: {e}")
+            status, message = "error", str(e)
+        finally:
+            slots.release()
+        await results.put(({"index": index, "username": username, "status": status, "message": message}, encoding))
+
+    async def schedule():
+        seen = set()
+        for index, (username, load) in enumerate(items):
+            # 取得名额后才读取图片，同一时刻内存中最多 workers 张
+            await slots.acquire()
+            tasks.append(asyncio.create_task(enroll_one(index, username, load, username in seen)))
+            seen.add(username)
+
+    scheduler = asyncio.create_task(schedule())
+    encodings = []
+    item_results = []
+    try:
+        for done in range(1, total + 1):
+            item, encoding = await results.get()
+            if encoding is not None:
+                encodings.append((item["username"], encoding))
+            item_results.append(item)
+            yield {"event": "item", "completed": done, "total": total, **item}
+
+        # 一次事务写入人脸库
+        if encodings:
+            await asyncio.to_thread(face_gallery.add_many, encodings, replace)
+
+        registered = len(encodings)
+        logger.info(f"[FACE-BATCH] 批量注册完成: 成功 {registered}/{total}")
+        yield {
+            "event": "done",
+            "done": True,
+            "total": total,
+            "registered": registered,
+            "failed": total - registered,
+            "results": sorted(item_results, key=lambda r: r["index"]),
+            "elapsed": round(time.perf_counter() - start_time, 2)
+        }
+    finally:
+        # 客户端断开时取消尚未完成的任务
+        scheduler.cancel()
+        for task in tasks:
+            task.cancel()
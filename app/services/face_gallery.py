@@ -0,0 +1,447 @@
+# app/services/face_gallery.py - 服务端人脸库
+"""
+注册的人脸编码保存在服务端，验证时只需用户名和图片。
+
+存储格式（Data/face_gallery/）：
+    encodings.f32  连续的 float32 矩阵 (容量, 128)，以 np.memmap 打开，启动时不整体读入内存，
+                   多个进程打开同一文件时共享操作系统页缓存
+    index.json     用户名 -> 行号列表、空闲行、已用行数、每行最后写入的版本号（原子替换写入）
+    gallery.lock   跨进程写锁
+容量不足时按倍数扩展文件；删除用户后其行号回收复用。
+
+多进程（多个 uvicorn worker）共用同一目录：写操作持有 gallery.lock 文件锁，
+并在修改前同步其他进程写入的索引；读操作发现 index.json 变化（mtime/大小/inode）时同步。
+同步是增量的：每次写操作递增版本号并记在所改的行上，只重新读取版本号变化的行，
+IVF 索引就地增删这些行，不因其他进程的一次登记而整体重建。
+
+每人可保存多个模板（不同光照、是否戴眼镜），上限 FACE_MAX_TEMPLATES，超出时按 FACE_TEMPLATE_EVICTION 淘汰：
+    oldest     淘汰最早的模板（首张注册模板始终保留）
+    redundant  淘汰与其余模板最相似（信息最少）的模板
+验证时对该用户全部模板一次性计算距离，按 min / mean / topk 汇总。
+
+1:N 检索在整个矩阵上做一次向量化距离计算（||a-b||² = ||a||² - 2a·b + ||b||²，
+行平方范数预先缓存）；规模超过 FACE_ANN_MIN_GALLERY 后改用 IVF 近似索引。
+"""
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.face_index import IVFIndex
+from app.utils.face_codec import to_array
+
+logger = logging.getLogger(__name__)
+
+ENCODING_DIM = 128
+INITIAL_CAPACITY = 1024
+AGGREGATE_METHODS = ("min", "mean", "topk")
+
+def aggregate_distances(distances: np.ndarray, method: str = "min", k: int = 2) -> float:
+    """多模板距离汇总：min 最近模板；mean 全部平均；topk 最近 k 个的平均"""
+    distances = np.asarray(distances, dtype=np.float64).reshape(-1)
+    if method == "mean":
+        return float(distances.mean())
+    if method == "topk" and len(distances) > 1:
+        k = min(max(1, k), len(distances))
+        return float(np.partition(distances, k - 1)[:k].mean())
+    return float(distances.min())
+
+class FaceGallery:
+    """memmap 人脸编码库"""
+
+    def __init__(self, directory: str, dim: int = ENCODING_DIM):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.matrix_path = self.directory / "encodings.f32"
+        self.index_path = self.directory / "index.json"
+        self.lock_path = self.directory / "gallery.lock"
+        self._lock = threading.RLock()
+        self._signature: Optional[Tuple[int, int, int]] = None  # 已加载的 index.json 状态
+        self._matrix: Optional[np.memmap] = None
+        self._users: Dict[str, List[int]] = {}
+        self._free: List[int] = []
+        self._rows = 0
+        self._capacity = 0
+        self._generation = 0  # 写操作版本号，每次写操作递增
+        self._stamps: List[int] = []  # 行号 -> 最后写入该行的版本号
+        self._owners: Dict[int, str] = {}  # 行号 -> 用户名
+        self._sq_norms = np.zeros(0, dtype=np.float32)  # 行平方范数，空闲行为inf
+        self._index: Optional[IVFIndex] = None
+        self._load()
+
+    # ========== 文件读写 ==========
+    def _index_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_index(self) -> Dict[str, Any]:
+        """读取 index.json 到内存状态，返回原始内容"""
+        index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        self._users = {name: list(rows) for name, rows in index.get("users", {}).items()}
+        self._free = list(index.get("free", []))
+        self._rows = int(index.get("rows", 0))
+        self._generation = int(index.get("generation", 0))
+        self._stamps = list(index.get("stamps") or [0] * self._rows)
+        self._owners = {row: name for name, rows in self._users.items() for row in rows}
+        return index
+
+    def _map_matrix(self):
+        """按当前文件大小重新映射矩阵（其他进程可能已扩容）"""
+        self._capacity = self.matrix_path.stat().st_size // (self.dim * 4)
+        self._matrix = None
+        if self._capacity > 0:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+",
+                                     shape=(self._capacity, self.dim))
+
+    def _load(self):
+        """完整加载：启动时，或无法增量同步时"""
+        signature = self._index_signature()
+        try:
+            if signature is not None and self.matrix_path.exists():
+                self._read_index()
+                self._map_matrix()
+                self._sq_norms = np.full(self._capacity, np.inf, dtype=np.float32)
+                if self._owners:
+                    rows = np.fromiter(self._owners, dtype=np.int64)
+                    self._sq_norms[rows] = np.einsum("ij,ij->i", self._matrix[rows], self._matrix[rows])
+                self._index = None
+                logger.info(f"[FACE-GALLERY] 加载人脸库: {len(self._users)} 人, {self._rows} 行")
+            elif self._users:
+                # 索引文件被删除：视为空库
+                self._users, self._free, self._rows, self._owners = {}, [], 0, {}
+                self._generation, self._stamps = 0, []
+                self._sq_norms[:] = np.inf
+                self._index = None
+            self._signature = signature
+        except Exception as e:
+            logger.error(f"[FACE-GALLERY] 加载人脸库失败: {e}")
+            self._users, self._free, self._rows, self._stamps = {}, [], 0, []
+
+    def _sync(self):
+        """增量同步其他进程的写入：只重新读取版本号变化的行，IVF 索引就地更新"""
+        signature = self._index_signature()
+        if signature is None or self._matrix is None or not self.matrix_path.exists():
+            self._load()
+            return
+        old_stamps = np.asarray(self._stamps, dtype=np.int64)
+        try:
+            index = self._read_index()
+        except Exception as e:
+            logger.warning(f"[FACE-GALLERY] 增量同步失败，完整重新加载: {e}")
+            self._load()
+            return
+        if "stamps" not in index:
+            # 旧格式索引没有行版本号，无法判断哪些行变化
+            self._load()
+            return
+
+        capacity = self.matrix_path.stat().st_size // (self.dim * 4)
+        if capacity != self._capacity:
+            self._map_matrix()
+            sq_norms = np.full(self._capacity, np.inf, dtype=np.float32)
+            kept = min(len(sq_norms), len(self._sq_norms))
+            sq_norms[:kept] = self._sq_norms[:kept]
+            self._sq_norms = sq_norms
+
+        new_stamps = np.asarray(self._stamps, dtype=np.int64)
+        common = min(len(old_stamps), len(new_stamps))
+        changed = np.flatnonzero(old_stamps[:common] != new_stamps[:common]).tolist()
+        changed.extend(range(common, max(len(old_stamps), len(new_stamps))))
+        for row in changed:
+            if row in self._owners:
+                vector = np.array(self._matrix[row])
+                self._sq_norms[row] = float(vector @ vector)
+                if self._index is not None:
+                    self._index.add(row, vector)
+            else:
+                if row < len(self._sq_norms):
+                    self._sq_norms[row] = np.inf
+                if self._index is not None:
+                    self._index.remove(row)
+        self._signature = signature
+        logger.info(f"[FACE-GALLERY] 同步其他进程的写入: {len(changed)} 行变化")
+
+    def _refresh(self):
+        """其他进程改写过 index.json 时增量同步（调用方持有 self._lock）"""
+        if self._index_signature() != self._signature:
+            self._sync()
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程写锁（Windows 使用 msvcrt，其他平台使用 fcntl）"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+b") as f:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def _reading(self):
+        with self._lock:
+            self._refresh()
+            yield
+
+    @contextmanager
+    def _writing(self):
+        """写操作：线程锁 + 文件锁，修改前先同步其他进程的写入"""
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._generation += 1
+            yield
+
+    def _ensure_capacity(self, rows: int):
+        """容量不足时扩展矩阵文件并重新映射"""
+        if self._matrix is not None and rows <= self._capacity:
+            return
+        new_capacity = max(INITIAL_CAPACITY, self._capacity)
+        while new_capacity < rows:
+            new_capacity *= 2
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+",
+                                 shape=(new_capacity, self.dim))
+        sq_norms = np.full(new_capacity, np.inf, dtype=np.float32)
+        sq_norms[:len(self._sq_norms)] = self._sq_norms
+        self._sq_norms = sq_norms
+        self._capacity = new_capacity
+        logger.info(f"[FACE-GALLERY] 人脸库容量扩展到 {new_capacity} 行")
+
+    def _save_index(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({
+            "dim": self.dim,
+            "rows": self._rows,
+            "free": self._free,
+            "users": self._users,
+            "generation": self._generation,
+            "stamps": self._stamps
+        }, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.index_path)
+        self._signature = self._index_signature()
+
+    def _allocate_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+        self._ensure_capacity(self._rows + 1)
+        self._rows += 1
+        self._stamps.append(self._generation)
+        return self._rows - 1
+
+    def _release_rows(self, rows: List[int]):
+        for row in rows:
+            self._matrix[row] = 0
+            self._sq_norms[row] = np.inf
+            self._stamps[row] = self._generation
+            self._owners.pop(row, None)
+            if self._index is not None:
+                self._index.remove(row)
+            self._free.append(row)
+
+    def _write_row(self, row: int, username: str, vector: np.ndarray):
+        self._matrix[row] = vector
+        self._sq_norms[row] = float(vector @ vector)
+        self._stamps[row] = self._generation
+        self._owners[row] = username
+        if self._index is not None:
+            self._index.add(row, vector)
+
+    def _replace_user(self, username: str, vector: np.ndarray) -> int:
+        self._release_rows(self._users.pop(username, []))
+        row = self._allocate_row()
+        self._write_row(row, username, vector)
+        self._users[username] = [row]
+        return row
+
+    def _evict_template(self, username: str):
+        """模板数达到上限时淘汰一个（首张注册模板不参与 oldest 淘汰）"""
+        rows = self._users[username]
+        if settings.FACE_TEMPLATE_EVICTION == "redundant" and len(rows) > 2:
+            vectors = np.array(self._matrix[rows])
+            distances = np.linalg.norm(vectors[:, None, :] - vectors[None, :, :], axis=2)
+            np.fill_diagonal(distances, np.inf)
+            victim = int(distances.min(axis=1).argmin())
+        else:
+            victim = 1 if len(rows) > 1 else 0
+        self._release_rows([rows.pop(victim)])
+
+    def _append_template(self, username: str, vector: np.ndarray):
+        """追加模板（未登记时新建），达到上限时先按淘汰策略移除"""
+        if username not in self._users:
+            self._replace_user(username, vector)
+            return
+        while len(self._users[username]) >= max(1, settings.FACE_MAX_TEMPLATES):
+            self._evict_template(username)
+        row = self._allocate_row()
+        self._write_row(row, username, vector)
+        self._users[username].append(row)
+
+    # ========== 对外接口 ==========
+    def add(self, username: str, encoding: np.ndarray) -> int:
+        """登记（覆盖）用户的人脸编码，返回行号"""
+        vector = to_array(encoding).reshape(self.dim)
+        with self._writing():
+            row = self._replace_user(username, vector)
+            self._matrix.flush()
+            self._save_index()
+        logger.info(f"[FACE-GALLERY] 已登记 {username} (行 {row})")
+        return row
+
+    def add_template(self, username: str, encoding: np.ndarray) -> int:
+        """为用户追加一个模板（未登记时等同 add），超过上限时按淘汰策略移除一个，返回当前模板数"""
+        vector = to_array(encoding).reshape(self.dim)
+        with self._writing():
+            self._append_template(username, vector)
+            self._matrix.flush()
+            self._save_index()
+            count = len(self._users[username])
+        logger.info(f"[FACE-GALLERY] {username} 新增模板，共 {count} 个")
+        return count
+
+    def add_many(self, items: List[Tuple[str, np.ndarray]], replace: bool = False) -> int:
+        """
+        批量登记（一次flush、一次索引落盘），返回登记人数。
+        默认与 add_template 相同：为已登记用户追加模板并按淘汰策略控制数量；
+        replace=True 时覆盖用户已有的全部模板。
+        """
+        vectors = [(username, to_array(encoding).reshape(self.dim))
+                   for username, encoding in items]
+        with self._writing():
+            for username, vector in vectors:
+                if replace:
+                    self._replace_user(username, vector)
+                else:
+                    self._append_template(username, vector)
+            self._matrix.flush()
+            self._save_index()
+        logger.info(f"[FACE-GALLERY] 批量登记 {len(vectors)} 人（{'覆盖' if replace else '追加'}）")
+        return len(vectors)
+
+    def get(self, username: str) -> Optional[np.ndarray]:
+        """用户的人脸编码 (n, 128)，未登记返回None"""
+        with self._reading():
+            rows = self._users.get(username)
+            if not rows:
+                return None
+            return np.array(self._matrix[rows])
+
+    def distances(self, username: str, encoding: np.ndarray) -> Optional[np.ndarray]:
+        """到该用户全部模板的欧氏距离（一次向量化计算），未登记返回None"""
+        query = to_array(encoding).reshape(self.dim)
+        with self._reading():
+            rows = self._users.get(username)
+            if not rows:
+                return None
+            sq = self._sq_norms[rows] - 2.0 * (self._matrix[rows] @ query) + float(query @ query)
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def template_count(self, username: str) -> int:
+        with self._reading():
+            return len(self._users.get(username, []))
+
+    def remove(self, username: str) -> bool:
+        with self._writing():
+            rows = self._users.pop(username, None)
+            if rows is None:
+                return False
+            self._release_rows(rows)
+            self._matrix.flush()
+            self._save_index()
+        logger.info(f"[FACE-GALLERY] 已删除 {username}")
+        return True
+
+    def search(self, encoding: np.ndarray, k: int = 5) -> List[Dict[str, Any]]:
+        """1:N检索，返回距离最近的 k 个用户 [{"username", "distance"}, ...]（每人取最近的一行）"""
+        query = to_array(encoding).reshape(self.dim)
+        with self._reading():
+            if not self._owners:
+                return []
+            if len(self._owners) >= settings.FACE_ANN_MIN_GALLERY:
+                if self._index is None or self._index.needs_retrain():
+                    self._train_index()
+                rows = self._index.candidates(query)
+                sq = self._sq_norms[rows] - 2.0 * (self._matrix[rows] @ query)
+            else:
+                rows = None
+                sq = self._sq_norms[:self._rows] - 2.0 * (self._matrix[:self._rows] @ query)
+
+            if len(sq) == 0:
+                return []
+            sq = sq + float(query @ query)
+            limit = min(len(sq), max(k * 8, 32))
+            top = np.argpartition(sq, limit - 1)[:limit]
+            top = top[np.argsort(sq[top])]
+
+            matches: List[Dict[str, Any]] = []
+            seen = set()
+            for i in top.tolist():
+                if not np.isfinite(sq[i]):
+                    break
+                row = int(rows[i]) if rows is not None else i
+                username = self._owners.get(row)
+                if username is None or username in seen:
+                    continue
+                seen.add(username)
+                matches.append({"username": username, "distance": float(np.sqrt(max(0.0, sq[i])))})
+                if len(matches) >= k:
+                    break
+            return matches
+
+    def _train_index(self):
+        rows = np.fromiter(self._owners, dtype=np.int64)
+        index = IVFIndex(nprobe=settings.FACE_IVF_NPROBE)
+        index.train(np.array(self._matrix[rows]), rows)
+        self._index = index
+
+    def __contains__(self, username: str) -> bool:
+        with self._reading():
+            return username in self._users
+
+    def usernames(self) -> List[str]:
+        with self._reading():
+            return sorted(self._users)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._reading():
+            return self._stats()
+
+    def _stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._users),
+            "rows": self._rows - len(self._free),
+            "max_templates": settings.FACE_MAX_TEMPLATES,
+            "capacity": self._capacity,
+            "search": "ivf" if len(self._owners) >= settings.FACE_ANN_MIN_GALLERY else "exact",
+            "ivf_lists": len(self._index.centroids) if self._index is not None else 0,
+            "storage": str(self.matrix_path)
+        }
+
+# 全局人脸库实例
+face_gallery = FaceGallery(settings.FACE_GALLERY_DIR)
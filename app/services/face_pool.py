@@ -0,0 +1,128 @@
+# app/services/face_pool.py - 人脸识别工作进程池
+"""
+dlib 的HOG检测在1080p图像上需要数百毫秒，放在事件循环里会阻塞整个服务。
+人脸任务使用独立于OCR的有界进程池，门禁验证之间只在进程池中排队。
+未在启动时预热（FACE_WARMUP_ON_STARTUP=false）或工作进程异常退出导致进程池重建后，
+首个请求会在后台重新预热，就绪状态以实际预热完成的工作进程数为准。
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.process_pool import BoundedProcessPool
+from app.services.face_worker import init_face_worker, analyze_face
+
+logger = logging.getLogger(__name__)
+
+def _resolve_face_workers() -> int:
+    """FACE_WORKERS为0时按核心数自动选择（HOG检测为单线程）"""
+    if settings.FACE_WORKERS > 0:
+        return settings.FACE_WORKERS
+    return max(1, min(4, (os.cpu_count() or 1) // 4))
+
+def _quality_thresholds() -> Optional[Dict[str, float]]:
+    """质量门限配置，关闭时返回None"""
+    if not settings.FACE_QUALITY_GATE:
+        return None
+    return {
+        "min_blur": settings.FACE_MIN_BLUR_VARIANCE,
+        "min_brightness": settings.FACE_MIN_BRIGHTNESS,
+        "max_brightness": settings.FACE_MAX_BRIGHTNESS
+    }
+
+class FaceWorkerPool:
+    """人脸进程池封装"""
+
+    def __init__(self):
+        self.pool = BoundedProcessPool(
+            name="人脸识别",
+            workers=_resolve_face_workers(),
+            queue_size=settings.FACE_QUEUE_SIZE,
+            initializer=init_face_worker,
+            retry_after=settings.FACE_RETRY_AFTER_SECONDS
+        )
+        # 预热状态: not_started / warming / ready / failed（对外以 state 属性为准）
+        self._state = "not_started"
+        self.warmup_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def start_background(self):
+        """在后台拉起全部工作进程并完成模型预热，立即返回"""
+        if self._warmup_task is not None and self.state in ("warming", "ready"):
+            return
+        self._state = "warming"
+        self._warmup_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        start_time = time.perf_counter()
+        try:
+            warm = await self.pool.warm_up()
+            self.warmup_seconds = round(time.perf_counter() - start_time, 2)
+            self._state = "ready"
+            self.last_error = None
+            logger.info(f"[FACE] 进程池预热完成，就绪工作进程: {warm}/{self.pool.workers}，耗时 {self.warmup_seconds}s")
+        except Exception as e:
+            self._state = "failed"
+            self.last_error = str(e)
+            self.pool.shutdown()
+            logger.error(f"[FACE] 进程池预热失败: {e}")
+
+    @property
+    def state(self) -> str:
+        """预热完成后进程池因工作进程异常退出而重建时，就绪进程数归零，回到 not_started"""
+        if self._state == "ready" and self.pool.warm_workers == 0:
+            return "not_started"
+        return self._state
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    def get_readiness(self) -> Dict[str, Any]:
+        """预热状态与进程池统计（只读缓存状态，不触发检测）"""
+        worker_warmup = [info.get("warmup_seconds") for info in self.pool.get_worker_info().values()]
+        return {
+            "ready": self.is_ready,
+            "state": self.state,
+            "workers": self.pool.workers,
+            "warm_workers": self.pool.warm_workers,
+            "warmup_seconds": self.warmup_seconds,
+            "worker_warmup_seconds": [s for s in worker_warmup if s is not None],
+            "error": self.last_error,
+            "executor": self.pool.get_stats()
+        }
+
+    async def analyze(
+        self,
+        content: bytes,
+        encode: bool = True,
+        track: Optional[Tuple[int, int, int, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        在工作进程中解码、检测（并编码），排队已满时抛出 PoolBusyError。
+        需要编码时先做质量检查，不合格的帧返回 rejected 原因；track 为上一帧人脸框。
+        """
+        # 未预热（按需启动或进程池重建后）时在后台预热，使就绪状态反映实际工作进程
+        if self.state == "not_started":
+            self.start_background()
+        return await self.pool.run(
+            analyze_face, content, encode,
+            settings.FACE_DETECT_SCALE, settings.FACE_MIN_FACE_SIZE,
+            _quality_thresholds() if encode else None,
+            track
+        )
+
+    def shutdown(self):
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        self.pool.shutdown()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.pool.get_stats()
+
+# 全局人脸进程池实例
+face_pool = FaceWorkerPool()
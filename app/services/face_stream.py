@@ -0,0 +1,141 @@
+# app/services/face_stream.py - WebSocket 视频流人脸验证的连接状态
+"""
+门禁终端通过 WebSocket 连续发送 JPEG 帧，每个连接一个 FaceStreamSession：
+- 比对编码只在建立连接时取一次（人脸库或客户端提供的编码）；
+- 上一帧的人脸框作为跟踪区域，工作进程只在其附近检测，跟踪丢失才检测整幅图像；
+- 上一帧仍在处理时到达的帧直接丢弃；与上一处理帧几乎相同的帧不再送检，
+  按上一处理帧的结论计入连续帧数（人站着不动也能得到验证结果）；
+- 连续 N 帧结论一致（均匹配或均不匹配）才给出验证结果。
+"""
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.face_pool import face_pool
+from app.services.face_gallery import aggregate_distances
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (32, 24)  # 变化检测缩略图尺寸
+
+def frame_thumbnail(content: bytes) -> Optional[np.ndarray]:
+    """缩小8倍灰度解码后再缩到 32x24（JPEG在DCT阶段缩小，耗时约1ms）"""
+    image = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        return None
+    return cv2.resize(image, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+class FaceStreamSession:
+    """单个 WebSocket 连接的验证状态"""
+
+    def __init__(
+        self,
+        username: str,
+        stored_encodings: np.ndarray,
+        required_frames: int,
+        accept: Callable[[float], bool],
+        change_threshold: float
+    ):
+        self.username = username
+        self.stored_encodings = np.asarray(stored_encodings, dtype=np.float64).reshape(-1, 128)
+        self.required_frames = max(1, required_frames)
+        self.accept = accept
+        self.change_threshold = change_threshold
+        self.busy = False
+        self.track: Optional[Tuple[int, int, int, int]] = None
+        self._thumbnail: Optional[np.ndarray] = None
+        self._streak_outcome: Optional[bool] = None
+        self._streak: list = []
+        self._last: Optional[Tuple[str, float, bool]] = None  # 上一处理帧的 (状态, 距离, 是否匹配)
+        self.started = time.perf_counter()
+        self.stats = {"received": 0, "processed": 0, "tracked": 0, "skipped_busy": 0, "skipped_unchanged": 0,
+                      "repeated": 0}
+
+    def is_unchanged(self, thumbnail: Optional[np.ndarray]) -> bool:
+        """与上一处理帧的缩略图平均灰度差低于阈值视为未变化"""
+        if thumbnail is None or self._thumbnail is None:
+            return False
+        return float(np.abs(thumbnail - self._thumbnail).mean()) < self.change_threshold
+
+    def repeat_last(self) -> Optional[Dict[str, Any]]:
+        """
+        未变化的帧按上一处理帧的结论计入连续帧数，返回本帧结论；
+        上一帧没有可比对的人脸（或刚给出过验证结果）时返回None，该帧直接丢弃
+        """
+        self.stats["skipped_unchanged"] += 1
+        if self._last is None:
+            return None
+        status, distance, matched = self._last
+        self.stats["repeated"] += 1
+        result = self._frame_result(status, distance=distance, matched=matched)
+        result["repeated"] = True
+        return result
+
+    async def process(self, content: bytes, thumbnail: Optional[np.ndarray]) -> Dict[str, Any]:
+        """在人脸进程池中检测（沿用跟踪框）并比对，返回本帧结论"""
+        self._thumbnail = thumbnail
+        analysis = await face_pool.analyze(content, True, self.track)
+        self.stats["processed"] += 1
+        if analysis.get("tracked"):
+            self.stats["tracked"] += 1
+
+        if analysis["error"]:
+            return self._frame_result("invalid_image", message=analysis["error"])
+        if analysis["rejected"]:
+            self.track = None
+            return self._frame_result(analysis["rejected"])
+
+        locations = analysis["locations"]
+        if len(locations) != 1 or analysis["encoding"] is None:
+            self.track = None
+            status = "no_face" if not locations else "multiple_faces" if len(locations) > 1 else "no_encoding"
+            return self._frame_result(status)
+
+        self.track = tuple(locations[0])
+        distances = np.linalg.norm(self.stored_encodings - analysis["encoding"], axis=1)
+        distance = aggregate_distances(distances, settings.FACE_MATCH_AGGREGATE, settings.FACE_MATCH_TOP_K)
+        matched = self.accept(distance)
+        return self._frame_result("match" if matched else "no_match", distance=distance, matched=matched)
+
+    def _frame_result(self, status: str, distance: Optional[float] = None,
+                      matched: Optional[bool] = None, message: Optional[str] = None) -> Dict[str, Any]:
+        """更新连续一致计数；没有可比对人脸的帧中断连续计数"""
+        if matched is None:
+            self._last = None
+            self._streak_outcome, self._streak = None, []
+        elif matched == self._streak_outcome:
+            self._last = (status, distance, matched)
+            self._streak.append(distance)
+        else:
+            self._last = (status, distance, matched)
+            self._streak_outcome, self._streak = matched, [distance]
+        return {
+            "event": "frame",
+            "status": status,
+            "distance": round(distance, 4) if distance is not None else None,
+            "streak": len(self._streak),
+            "message": message
+        }
+
+    def decision(self) -> Optional[Dict[str, Any]]:
+        """连续 required_frames 帧一致时返回验证结果，并重置状态等待下一次验证"""
+        if len(self._streak) < self.required_frames:
+            return None
+        distance = float(np.mean(self._streak))
+        result = {
+            "event": "decision",
+            "success": bool(self._streak_outcome),
+            "username": self.username,
+            "distance": round(distance, 4),
+            "frames": len(self._streak),
+            "elapsed": round(time.perf_counter() - self.started, 2),
+            "stats": dict(self.stats)
+        }
+        # 画面不变时不重复给出结果，等画面变化后重新处理
+        self._streak_outcome, self._streak, self._last = None, [], None
+        self.started = time.perf_counter()
+        return result
@@ -0,0 +1,215 @@
+# app/services/face_worker.py - 人脸工作进程侧函数
+"""
+解码、HOG检测与128维编码都在人脸进程池的工作进程中执行，
+事件循环只负责收发字节与结果。本模块的函数在子进程中运行。
+
+级联检测：先以 IMREAD_REDUCED_COLOR_* 缩小解码（JPEG在DCT阶段直接缩小，几乎不花解码时间），
+在小图上做HOG检测，再把人脸框放大回原图坐标，只在原图的人脸区域上提取编码。
+
+质量门限：在缩小后的图像上先测模糊度（拉普拉斯方差）与平均亮度，检测后再看人脸大小，
+不合格的帧直接返回拒绝原因，不再花时间提取编码。
+
+视频流跟踪：传入上一帧的人脸框时只在其附近区域检测，区域内找不到唯一人脸再检测整幅图像。
+"""
+import os
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.process_pool import set_worker_info
+
+logger = logging.getLogger(__name__)
+
+# cv2 支持的缩小解码倍数
+REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+HOG_WINDOW = 80  # dlib HOG检测器的最小检测窗口（像素）
+MIN_DETECT_SIDE = 240  # 缩小后短边低于该值时退回原图检测
+ENCODE_MARGIN = 0.5  # 提取编码时人脸框外扩比例（关键点可能落在框外）
+TRACK_MARGIN = 0.75  # 跟踪检测区域相对上一帧人脸框的外扩比例
+
+Location = Tuple[int, int, int, int]  # (top, right, bottom, left)
+
+# 质量拒绝原因 -> 提示信息
+QUALITY_MESSAGES = {
+    "blurry": "图像模糊，请保持静止并擦拭摄像头镜头",
+    "too_dark": "光线过暗，请补光或靠近光源",
+    "too_bright": "光线过亮或逆光，请调整站位",
+    "face_too_small": "人脸过小，请靠近摄像头",
+}
+
+def init_face_worker():
+    """
+    工作进程初始化：导入face_recognition（加载dlib模型），
+    再用合成图像跑一遍解码、HOG检测、关键点与编码，首个真实请求不再承担初始化开销。
+    """
+    start_time = time.perf_counter()
+    import face_recognition
+
+    image = np.full((160, 160, 3), 128, dtype=np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image)
+    if ok:
+        decode_rgb(encoded.tobytes(), 2)
+    face_recognition.face_locations(image)
+    face_recognition.face_encodings(image, [(40, 120, 120, 40)])
+
+    warmup_seconds = round(time.perf_counter() - start_time, 2)
+    set_worker_info(warmup_seconds=warmup_seconds)
+    logger.info(f"[FACE] 工作进程 {os.getpid()} 模型已加载并预热，耗时 {warmup_seconds}s")
+
+def decode_rgb(content: bytes, scale: int = 1) -> Optional[np.ndarray]:
+    """解码为RGB数组（face_recognition需要RGB格式），scale>1时缩小解码；失败返回None"""
+    flag = REDUCED_DECODE_FLAGS.get(scale, cv2.IMREAD_COLOR)
+    image = cv2.imdecode(np.frombuffer(content, np.uint8), flag)
+    if image is None:
+        return None
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def measure_quality(image: np.ndarray) -> Dict[str, float]:
+    """模糊度（拉普拉斯方差，越大越清晰）与平均亮度（0~255）"""
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    return {
+        "blur": round(float(cv2.Laplacian(gray, cv2.CV_64F).var()), 1),
+        "brightness": round(float(gray.mean()), 1)
+    }
+
+def _check_quality(quality: Dict[str, float], thresholds: Dict[str, float]) -> Optional[str]:
+    if quality["brightness"] < thresholds.get("min_brightness", 0):
+        return "too_dark"
+    if quality["brightness"] > thresholds.get("max_brightness", 255):
+        return "too_bright"
+    if quality["blur"] < thresholds.get("min_blur", 0):
+        return "blurry"
+    return None
+
+def _detect(image: np.ndarray, scale: int, min_face_size: int) -> Tuple[List[Location], int]:
+    """
+    HOG检测；小图上的最小人脸仍小于检测窗口时上采样一次。
+    返回 (不小于 min_face_size 的人脸, 检测到的人脸总数)
+    """
+    import face_recognition
+
+    upsample = 0 if min_face_size / scale >= HOG_WINDOW else 1
+    locations = face_recognition.face_locations(image, number_of_times_to_upsample=upsample)
+    min_side = min_face_size / scale
+    kept = [
+        tuple(location) for location in locations
+        if min(location[2] - location[0], location[1] - location[3]) >= min_side
+    ]
+    return kept, len(locations)
+
+def _scale_locations(locations: List[Location], sy: float, sx: float, shape) -> List[Location]:
+    height, width = shape[:2]
+    return [
+        (max(0, int(top * sy)), min(width, int(round(right * sx))),
+         min(height, int(round(bottom * sy))), max(0, int(left * sx)))
+        for top, right, bottom, left in locations
+    ]
+
+def _detect_in_roi(image: np.ndarray, track: Location, scale: int, min_face_size: int) -> Tuple[List[Location], int]:
+    """在上一帧人脸框（原图坐标）附近检测，返回整幅小图坐标"""
+    top, right, bottom, left = (value / scale for value in track)
+    margin_y, margin_x = (bottom - top) * TRACK_MARGIN, (right - left) * TRACK_MARGIN
+    y0, x0 = max(0, int(top - margin_y)), max(0, int(left - margin_x))
+    y1, x1 = min(image.shape[0], int(bottom + margin_y)), min(image.shape[1], int(right + margin_x))
+    if y1 - y0 < HOG_WINDOW // 2 or x1 - x0 < HOG_WINDOW // 2:
+        return [], 0
+    roi = np.ascontiguousarray(image[y0:y1, x0:x1])
+    locations, detected = _detect(roi, scale, min_face_size)
+    return [(t + y0, r + x0, b + y0, l + x0) for t, r, b, l in locations], detected
+
+def _encode_crop(image: np.ndarray, location: Location) -> Optional[np.ndarray]:
+    """只在人脸框（外扩 ENCODE_MARGIN）范围内计算关键点与编码"""
+    import face_recognition
+
+    top, right, bottom, left = location
+    margin_y = int((bottom - top) * ENCODE_MARGIN)
+    margin_x = int((right - left) * ENCODE_MARGIN)
+    y0, x0 = max(0, top - margin_y), max(0, left - margin_x)
+    y1, x1 = min(image.shape[0], bottom + margin_y), min(image.shape[1], right + margin_x)
+    crop = np.ascontiguousarray(image[y0:y1, x0:x1])
+    encodings = face_recognition.face_encodings(crop, [(top - y0, right - x0, bottom - y0, left - x0)])
+    return encodings[0] if encodings else None
+
+def analyze_face(
+    content: bytes,
+    encode: bool = True,
+    scale: int = 1,
+    min_face_size: int = 0,
+    quality_thresholds: Optional[Dict[str, float]] = None,
+    track: Optional[Location] = None
+) -> Dict[str, Any]:
+    """
+    检测人脸位置；encode 为True且恰好一张人脸时同时提取编码。
+    scale>1 时使用级联检测（缩小解码检测 + 原图区域编码）；min_face_size 为原图像素。
+    提供 quality_thresholds 时先做质量检查，不合格直接返回拒绝原因（rejected）。
+    提供 track（上一帧人脸框，原图坐标）时先在其附近检测，tracked 表示是否沿用了跟踪区域。
+    返回 {"error", "rejected", "quality", "tracked", "locations": [(top, right, bottom, left), ...], "encoding": ndarray或None}
+    """
+    import face_recognition
+
+    if scale not in REDUCED_DECODE_FLAGS:
+        scale = 1
+
+    small = decode_rgb(content, scale)
+    if small is None:
+        return {"error": "无法解码图像", "rejected": None, "quality": None, "locations": [], "encoding": None}
+
+    if scale > 1 and min(small.shape[:2]) < MIN_DETECT_SIDE:
+        # 图像本身较小，缩小后反而检测不到人脸，退回原图
+        small, scale = decode_rgb(content), 1
+
+    quality = None
+    if quality_thresholds:
+        quality = measure_quality(small)
+        rejected = _check_quality(quality, quality_thresholds)
+        if rejected:
+            return {"error": None, "rejected": rejected, "quality": quality, "locations": [], "encoding": None}
+
+    tracked = False
+    if track is not None:
+        locations, detected = _detect_in_roi(small, track, scale, min_face_size)
+        tracked = len(locations) == 1
+    if not tracked:
+        # 跟踪丢失（或未提供跟踪框）时检测整幅图像
+        locations, detected = _detect(small, scale, min_face_size)
+    if quality_thresholds and detected and not locations:
+        # 检测到了人脸但都小于最小人脸尺寸
+        return {"error": None, "rejected": "face_too_small", "quality": quality, "locations": [], "encoding": None}
+
+    if scale == 1:
+        full = small
+    elif encode and len(locations) == 1:
+        full = decode_rgb(content)
+    else:
+        full = None
+
+    if scale > 1:
+        # 缩小解码的尺寸为向上取整，有原图时按实际比例换算
+        if full is not None:
+            sy, sx, shape = full.shape[0] / small.shape[0], full.shape[1] / small.shape[1], full.shape
+        else:
+            sy, sx, shape = scale, scale, (small.shape[0] * scale, small.shape[1] * scale)
+        locations = _scale_locations(locations, sy, sx, shape)
+
+    encoding = None
+    if encode and len(locations) == 1:
+        if scale > 1:
+            encoding = _encode_crop(full, locations[0])
+        else:
+            encodings = face_recognition.face_encodings(full, locations)
+            encoding = encodings[0] if encodings else None
+    return {
+        "error": None,
+        "rejected": None,
+        "quality": quality,
+        "tracked": tracked,
+        "locations": [tuple(location) for location in locations],
+        "encoding": encoding
+    }
@@ -0,0 +1,138 @@
+# app/services/ocr_batcher.py - OCR微批调度器
+"""
+把同一时间段内到达的多个单图请求合并为一次 predict 调用。
+
+调度规则：
+- 同时在途的批次数不超过工作进程数，进程全忙时新请求在队列中积累，
+  下一批直接取满，负载越高批次越大；
+- 有空闲进程时，取到第一张图后最多再等待 window_ms 收集同批请求，
+  或者凑满 max_batch_size 立即发出。
+"""
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.services.process_pool import PoolBusyError
+
+logger = logging.getLogger(__name__)
+
+BatchRunner = Callable[[List[bytes]], Awaitable[List[Dict[str, Any]]]]
+
+class OCRMicroBatcher:
+    """自适应微批调度器"""
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        max_concurrent_batches: int,
+        window_ms: int,
+        max_batch_size: int,
+        max_queue_depth: int,
+        retry_after: int = 2
+    ):
+        self._run_batch = run_batch
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self.window_ms = max(0, window_ms)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_queue_depth = max(1, max_queue_depth)
+        self.retry_after = retry_after
+
+        # 与事件循环绑定的对象延迟到首次使用时创建
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+
+        self._submitted = 0
+        self._rejected = 0
+        self._batches = 0
+        self._batched_items = 0
+        self._largest_batch = 0
+        self._total_wait = 0.0
+
+    def _ensure_started(self):
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._collector = asyncio.create_task(self._collect_loop())
+            logger.info(
+                f"[OCR-BATCH] 微批调度器已启动: 窗口 {self.window_ms}ms, "
+                f"批大小 {self.max_batch_size}, 队列上限 {self.max_queue_depth}"
+            )
+
+    async def submit(self, content: bytes) -> Dict[str, Any]:
+        """提交单张图片，等待所在批次完成后返回该图片的结果"""
+        self._ensure_started()
+        if self._queue.qsize() >= self.max_queue_depth:
+            self._rejected += 1
+            raise PoolBusyError("OCR批处理队列", self.retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((content, future, time.perf_counter()))
+        self._submitted += 1
+        return await future
+
+    async def _collect_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # 先占用一个批次名额，进程全忙时请求留在队列中继续积累
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+
+            deadline = loop.time() + self.window_ms / 1000
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            asyncio.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple[bytes, asyncio.Future, float]]):
+        dispatched_at = time.perf_counter()
+        self._batches += 1
+        self._batched_items += len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+        self._total_wait += sum(dispatched_at - queued_at for _, _, queued_at in batch)
+
+        try:
+            results = await self._run_batch([content for content, _, _ in batch])
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            for _, future, _ in batch[len(results):]:
+                if not future.done():
+                    future.set_exception(RuntimeError("批量识别结果数量不足"))
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """微批调度统计"""
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "max_queue_depth": self.max_queue_depth,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "submitted": self._submitted,
+            "rejected": self._rejected,
+            "batches": self._batches,
+            "avg_batch_size": round(self._batched_items / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "avg_wait_ms": round(self._total_wait / self._batched_items * 1000, 2) if self._batched_items else 0.0
+        }
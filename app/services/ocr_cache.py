@@ -0,0 +1,241 @@
+# app/services/ocr_cache.py - OCR结果缓存（内存LRU + SQLite持久层）
+"""
+同一张参数单反复上传时直接返回已有识别结果。
+缓存键 = SHA-256(配置指纹 + 图片字节)，模型或引擎参数变化后旧结果自然失效。
+
+SQLite 持久层不在事件循环上执行：读取通过 asyncio.to_thread，写入交给单独的写线程排队执行；
+命中时的 last_used 更新先记在内存中，攒够一批（或随下一次写入）再一次提交。
+"""
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings, OCR_ENGINE_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+TOUCH_BATCH = 64  # 攒够多少条命中时间更新后提交一次
+
+def ocr_config_fingerprint() -> str:
+    """影响识别结果的全部配置，任一项变化都会改变缓存键"""
+    return json.dumps({
+        "model": settings.OCR_MODEL_VERSION,
+        "backend": [settings.OCR_BACKEND, settings.OCR_ONNX_INT8],
+        "engine": OCR_ENGINE_OPTIONS,
+        "preprocess": [
+            settings.OCR_PREPROCESS_MAX_LONG_EDGE,
+            settings.OCR_PREPROCESS_TARGET_DPI,
+            settings.OCR_PREPROCESS_GRAYSCALE,
+            settings.OCR_PREPROCESS_CROP_BORDERS
+        ]
+    }, sort_keys=True)
+
+class OCRResultCache:
+    """两级OCR结果缓存"""
+
+    def __init__(
+        self,
+        memory_entries: int,
+        db_path: str,
+        disk_max_entries: int,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.memory_entries = max(1, memory_entries)
+        self.disk_max_entries = max(0, disk_max_entries)
+        self.db_path = Path(db_path)
+        self._namespace = hashlib.sha256(ocr_config_fingerprint().encode("utf-8")).digest()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()  # 内存层
+        self._db_lock = threading.Lock()  # SQLite连接
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+        self._touches: Dict[str, float] = {}  # 待提交的 last_used 更新
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-cache-writer")
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ========== SQLite持久层 ==========
+    def _get_conn(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self.disk_max_entries > 0:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                    " key TEXT PRIMARY KEY,"
+                    " payload TEXT NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " last_used REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache(last_used)")
+                self._conn.commit()
+            except Exception as e:
+                logger.error(f"[OCR-CACHE] 打开缓存数据库失败，仅使用内存缓存: {e}")
+                self.disk_max_entries = 0
+                self._conn = None
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """在线程中执行：只做SELECT，命中时间记入待提交队列"""
+        with self._db_lock:
+            conn = self._get_conn()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("SELECT payload FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            except Exception as e:
+                logger.warning(f"[OCR-CACHE] 读取缓存失败: {e}")
+                return None
+        if row is None:
+            return None
+        with self._lock:
+            self._touches[key] = time.time()
+            if len(self._touches) >= TOUCH_BATCH:
+                self._writer.submit(self._flush_touches)
+        return json.loads(row[0])
+
+    def _take_touches(self) -> list:
+        with self._lock:
+            touches, self._touches = self._touches, {}
+        return [(used, key) for key, used in touches.items()]
+
+    def _flush_touches(self):
+        """写线程：批量提交 last_used 更新"""
+        touches = self._take_touches()
+        if not touches:
+            return
+        with self._db_lock:
+            conn = self._get_conn()
+            if conn is None:
+                return
+            try:
+                conn.executemany("UPDATE ocr_cache SET last_used = ? WHERE key = ?", touches)
+                conn.commit()
+            except Exception as e:
+                logger.warning(f"[OCR-CACHE] 更新使用时间失败: {e}")
+
+    def _disk_put(self, key: str, payload: Dict[str, Any]):
+        """写线程：写入一条记录，同时提交积攒的 last_used 更新"""
+        touches = self._take_touches()
+        with self._db_lock:
+            conn = self._get_conn()
+            if conn is None:
+                return
+            try:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO ocr_cache (key, payload, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(payload, ensure_ascii=False), now, now)
+                )
+                if touches:
+                    conn.executemany("UPDATE ocr_cache SET last_used = ? WHERE key = ?", touches)
+                self._disk_writes += 1
+                # 每100次写入清理一次最久未使用的记录
+                if self._disk_writes % 100 == 0:
+                    conn.execute(
+                        "DELETE FROM ocr_cache WHERE key IN ("
+                        " SELECT key FROM ocr_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                        (self.disk_max_entries,)
+                    )
+                conn.commit()
+            except Exception as e:
+                logger.warning(f"[OCR-CACHE] 写入缓存失败: {e}")
+
+    # ========== 对外接口 ==========
+    def make_key(self, content: bytes, variant: str = "") -> str:
+        """内容寻址缓存键；variant 区分同一图片的不同识别方式"""
+        digest = hashlib.sha256(self._namespace)
+        digest.update(variant.encode("utf-8"))
+        digest.update(content)
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存，未命中返回None；内存层未命中时在线程中查SQLite，不阻塞事件循环"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(payload)
+
+        payload = None
+        if self.disk_max_entries > 0:
+            payload = await asyncio.to_thread(self._disk_get, key)
+
+        with self._lock:
+            if payload is not None:
+                self._remember(key, payload)
+                self.disk_hits += 1
+                return dict(payload)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, payload: Dict[str, Any]):
+        """写入缓存；空结果或带错误的结果不缓存。SQLite写入交给写线程，立即返回"""
+        if not self.enabled or payload.get("error") or not payload.get("text"):
+            return
+        with self._lock:
+            self._remember(key, payload)
+        if self.disk_max_entries > 0:
+            self._writer.submit(self._disk_put, key, payload)
+
+    def _remember(self, key: str, payload: Dict[str, Any]):
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> Dict[str, int]:
+        """清空两级缓存，返回清理数量"""
+        with self._lock:
+            memory_cleared = len(self._memory)
+            self._memory.clear()
+            self._touches.clear()
+        disk_cleared = 0
+        with self._db_lock:
+            conn = self._get_conn()
+            if conn is not None:
+                try:
+                    disk_cleared = conn.execute("DELETE FROM ocr_cache").rowcount
+                    conn.commit()
+                except Exception as e:
+                    logger.error(f"[OCR-CACHE] 清空缓存数据库失败: {e}")
+        logger.info(f"[OCR-CACHE] 缓存已清空: 内存 {memory_cleared} 条, 磁盘 {disk_cleared} 条")
+        return {"memory_cleared": memory_cleared, "disk_cleared": disk_cleared}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "memory_capacity": self.memory_entries,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+# 全局OCR缓存实例
+ocr_cache = OCRResultCache(
+    memory_entries=settings.OCR_CACHE_MEMORY_ENTRIES,
+    db_path=settings.OCR_CACHE_DB_PATH,
+    disk_max_entries=settings.OCR_CACHE_DISK_MAX_ENTRIES,
+    enabled=settings.OCR_CACHE_ENABLED
+)
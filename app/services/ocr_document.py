@@ -0,0 +1,206 @@
+# app/services/ocr_document.py - 多页PDF/TIFF文档OCR
+"""
+文档逐页栅格化后交给OCR进程池并行识别，每页完成即推送结果。
+同时在途的页数有上限，内存占用取决于在途页数而不是文档页数。
+文档本身也不整体读入内存：TIFF直接从上传的临时文件按页读取，PDF转存到磁盘临时文件后按路径打开。
+进程池被其他请求占满时按 Retry-After 等待后重试该页，不直接记为失败。
+"""
+import io
+import os
+import time
+import json
+import shutil
+import asyncio
+import logging
+import tempfile
+import threading
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional
+
+from app.core.config import settings
+from app.services.process_pool import PoolBusyError
+
+logger = logging.getLogger(__name__)
+
+BUSY_RETRIES = 10  # 进程池被其他请求占满时每页的重试次数
+
+try:
+    import fitz  # PyMuPDF，PDF栅格化（可选依赖）
+    PDF_SUPPORTED = True
+except ImportError:
+    fitz = None
+    PDF_SUPPORTED = False
+    logger.warning("⚠️ 未安装PyMuPDF，PDF文档OCR不可用（pip install pymupdf）")
+
+DOCUMENT_EXTS = {".pdf": "pdf", ".tif": "tiff", ".tiff": "tiff"}
+
+def detect_document_kind(head: bytes, ext: str = "") -> Optional[str]:
+    """根据文件头判断文档类型，文件头无法识别时参考扩展名"""
+    if head[:5] == b"%PDF-":
+        return "pdf"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    return DOCUMENT_EXTS.get(ext.lower())
+
+class DocumentRasterizer:
+    """按需把单页渲染为PNG字节，不一次性展开整份文档；接管 source 文件对象，close 时一并关闭"""
+
+    def __init__(self, source: BinaryIO, kind: str, dpi: int):
+        self.kind = kind
+        self.dpi = dpi
+        self._source = source
+        self._tmp_path: Optional[str] = None
+        # PyMuPDF / PIL 的文档对象都不是线程安全的，渲染串行执行
+        self._lock = threading.Lock()
+
+        try:
+            if kind == "pdf":
+                if not PDF_SUPPORTED:
+                    raise RuntimeError("服务器未安装PyMuPDF，无法处理PDF文档")
+                # MuPDF 从内存打开需要完整字节，改为分块转存到磁盘后按路径打开
+                source.seek(0)
+                with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+                    self._tmp_path = tmp.name
+                    shutil.copyfileobj(source, tmp)
+                self._doc = fitz.open(self._tmp_path, filetype="pdf")
+                self.page_count = self._doc.page_count
+            elif kind == "tiff":
+                from PIL import Image
+                source.seek(0)
+                self._doc = Image.open(source)
+                self.page_count = getattr(self._doc, "n_frames", 1)
+            else:
+                raise ValueError(f"不支持的文档类型: {kind}")
+        except Exception:
+            self._cleanup()
+            raise
+
+    def render(self, index: int) -> bytes:
+        """渲染第 index 页（从0开始）为PNG"""
+        with self._lock:
+            if self.kind == "pdf":
+                pixmap = self._doc.load_page(index).get_pixmap(dpi=self.dpi)
+                return pixmap.tobytes("png")
+
+            self._doc.seek(index)
+            frame = self._doc.convert("RGB")
+            buffer = io.BytesIO()
+            # 低压缩级别：PNG只是进程间传输格式，编码速度优先
+            frame.save(buffer, format="PNG", compress_level=1)
+            return buffer.getvalue()
+
+    def close(self):
+        with self._lock:
+            try:
+                self._doc.close()
+            except Exception:
+                pass
+            self._cleanup()
+
+    def _cleanup(self):
+        """关闭上传文件并删除PDF转存的临时文件"""
+        try:
+            self._source.close()
+        except Exception:
+            pass
+        if self._tmp_path and os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+        self._tmp_path = None
+
+def format_event(payload: Dict[str, Any], stream_format: str) -> str:
+    """序列化为NDJSON行或SSE事件"""
+    data = json.dumps(payload, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"data: {data}\n\n"
+    return data + "\n"
+
+async def open_document(source: BinaryIO, kind: str) -> DocumentRasterizer:
+    """在线程中打开文档（只解析结构，不渲染页面）"""
+    return await asyncio.to_thread(DocumentRasterizer, source, kind, settings.OCR_DOCUMENT_DPI)
+
+async def _extract_page(image: bytes) -> Dict[str, Any]:
+    """进程池排队已满时等待 retry_after 秒后重试，超过重试次数才记为失败"""
+    from app.services.ocr_pool import ocr_pool
+
+    for attempt in range(BUSY_RETRIES):
+        try:
+            return await ocr_pool.extract(image, ".png")
+        except PoolBusyError as e:
+            if attempt == BUSY_RETRIES - 1:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+async def stream_document_ocr(
+    rasterizer: DocumentRasterizer,
+    filename: str,
+    stream_format: str = "ndjson"
+) -> AsyncIterator[str]:
+    """
+    逐页识别文档并按完成顺序产出结果（每条带页码）。
+    最后一条为 {"done": true, ...} 汇总。
+    """
+    from app.services.ocr_pool import ocr_pool
+
+    kind = rasterizer.kind
+    start_time = time.perf_counter()
+    total_pages = min(rasterizer.page_count, settings.OCR_DOCUMENT_MAX_PAGES)
+    in_flight = settings.OCR_DOCUMENT_PAGES_IN_FLIGHT or ocr_pool.pool.workers
+    logger.info(f"[OCR-DOC] 开始识别文档 {filename}: {rasterizer.page_count} 页, 处理 {total_pages} 页, 并行 {in_flight} 页")
+
+    yield format_event({
+        "event": "start",
+        "filename": filename,
+        "document_type": kind,
+        "page_count": rasterizer.page_count,
+        "pages_to_process": total_pages
+    }, stream_format)
+
+    slots = asyncio.Semaphore(in_flight)
+    results: asyncio.Queue = asyncio.Queue()
+    tasks = []
+
+    async def ocr_page(index: int):
+        try:
+            image = await asyncio.to_thread(rasterizer.render, index)
+            result = await _extract_page(image)
+            del image
+            # 页面无法解码等情况由工作进程以 "error" 返回，同样记为该页失败
+            error = result.get("error") or None
+            if error:
+                logger.warning(f"[OCR-DOC] 第 {index + 1} 页识别失败: {error}")
+            await results.put({"event": "page", "page": index + 1, "text": result.get("text", ""), "error": error})
+        except Exception as e:
+            logger.warning(f"[OCR-DOC] 第 {index + 1} 页识别失败: {e}")
+            await results.put({"event": "page", "page": index + 1, "text": "", "error": str(e)})
+        finally:
+            slots.release()
+
+    async def schedule_pages():
+        for index in range(total_pages):
+            await slots.acquire()
+            tasks.append(asyncio.create_task(ocr_page(index)))
+
+    scheduler = asyncio.create_task(schedule_pages())
+    failed = 0
+    try:
+        for _ in range(total_pages):
+            page_result = await results.get()
+            if page_result["error"]:
+                failed += 1
+            page_result["total_pages"] = total_pages
+            yield format_event(page_result, stream_format)
+
+        yield format_event({
+            "event": "done",
+            "done": True,
+            "pages": total_pages,
+            "failed": failed,
+            "truncated": rasterizer.page_count > total_pages,
+            "elapsed": round(time.perf_counter() - start_time, 2)
+        }, stream_format)
+        logger.info(f"[OCR-DOC] 文档 {filename} 识别完成，失败 {failed} 页")
+    finally:
+        # 客户端断开时取消尚未完成的页面
+        scheduler.cancel()
+        for task in tasks:
+            task.cancel()
+        rasterizer.close()
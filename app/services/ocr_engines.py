@@ -0,0 +1,285 @@
+# app/services/ocr_engines.py - 可切换的OCR推理后端
+"""
+OCR引擎抽象，通过 OCR_BACKEND 选择实现：
+    paddle - PaddleOCR 流水线（默认）
+    onnx   - ONNX Runtime 运行导出的 PP-OCR 检测/识别模型，OCR_ONNX_INT8 启用int8量化模型
+
+各引擎的 predict 返回与 PaddleOCR 3.x 相同结构的结果（rec_texts / rec_scores / rec_polys），
+上层的文本整理逻辑不区分后端。本模块只在OCR工作进程中导入。
+
+int8模型可由FP32模型动态量化生成：
+    python -m app.services.ocr_engines quantize [--model-dir models/ppocr_onnx]
+"""
+import math
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from app.core.config import settings, OCR_ENGINE_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+ImageInput = Union[str, np.ndarray]
+
+class OCREngine:
+    """OCR引擎接口"""
+
+    name = "base"
+
+    def predict(self, input: Union[ImageInput, List[ImageInput]]) -> List[Dict[str, Any]]:
+        """检测+识别，每张图片返回一个含 rec_texts / rec_scores / rec_polys 的结果"""
+        raise NotImplementedError
+
+    def recognize(self, crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """只识别已裁剪的文字区域，返回 [(文字, 置信度), ...]"""
+        raise NotImplementedError
+
+# ========== PaddleOCR ==========
+class PaddleEngine(OCREngine):
+    """PaddleOCR 流水线"""
+
+    name = "paddle"
+
+    def __init__(self, **options):
+        from paddleocr import PaddleOCR
+
+        self._ocr = PaddleOCR(**{**OCR_ENGINE_OPTIONS, **options})
+        self._recognizer = None
+        self._recognizer_unavailable = False
+
+    def predict(self, input):
+        return list(self._ocr.predict(input=input))
+
+    def ocr(self, image_input, **kwargs):
+        """旧版PaddleOCR接口（兼容路径）"""
+        return self._ocr.ocr(image_input, **kwargs)
+
+    def recognize(self, crops):
+        if self._recognizer is None and not self._recognizer_unavailable:
+            try:
+                from paddleocr import TextRecognition
+                self._recognizer = TextRecognition(model_name=settings.OCR_REC_MODEL_NAME)
+            except Exception as e:
+                self._recognizer_unavailable = True
+                logger.warning(f"[OCR] 文字识别模型不可用，模板识别将使用完整流水线: {e}")
+        if self._recognizer is None:
+            raise NotImplementedError("文字识别模型不可用")
+        return [
+            (str(res["rec_text"]), float(res["rec_score"]))
+            for res in self._recognizer.predict(input=crops, batch_size=len(crops))
+        ]
+
+# ========== ONNX Runtime ==========
+class OnnxEngine(OCREngine):
+    """
+    ONNX Runtime 运行 PP-OCR 导出模型（paddle2onnx）。
+    模型目录包含 det.onnx、rec.onnx（int8为 det_int8.onnx、rec_int8.onnx）和字符表 ppocr_keys.txt。
+    """
+
+    name = "onnx"
+
+    # DB检测参数，与PaddleOCR默认值一致
+    DET_LIMIT_SIDE = 960
+    DET_THRESH = 0.3
+    DET_BOX_THRESH = 0.6
+    DET_UNCLIP_RATIO = 1.5
+    DET_MIN_SIZE = 3
+    DET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+    DET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+    REC_HEIGHT = 48
+    REC_MAX_WIDTH = 1280
+    REC_BATCH_SIZE = 8
+
+    def __init__(self, model_dir: str, int8: bool = False, threads: int = 0):
+        import onnxruntime as ort
+
+        root = Path(model_dir)
+        suffix = "_int8" if int8 else ""
+        det_path = root / f"det{suffix}.onnx"
+        rec_path = root / f"rec{suffix}.onnx"
+        for path in (det_path, rec_path):
+            if not path.exists():
+                raise FileNotFoundError(f"ONNX模型不存在: {path}")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        providers = ["CPUExecutionProvider"]
+        self._det = ort.InferenceSession(str(det_path), options, providers=providers)
+        self._rec = ort.InferenceSession(str(rec_path), options, providers=providers)
+        self._det_input = self._det.get_inputs()[0].name
+        self._rec_input = self._rec.get_inputs()[0].name
+        self.name = f"onnx{suffix}"
+
+        # CTC字符表：0号为空白符，末尾追加空格
+        keys = (root / "ppocr_keys.txt").read_text(encoding="utf-8").splitlines()
+        self._characters = ["blank"] + keys + [" "]
+        logger.info(f"[OCR] ONNX引擎已加载: {det_path.name} / {rec_path.name}, 字符数 {len(keys)}")
+
+    def predict(self, input):
+        images = input if isinstance(input, list) else [input]
+        results = []
+        for image in images:
+            if isinstance(image, str):
+                path, image = image, cv2.imread(image, cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError(f"无法读取图像文件: {Path(path).name}")
+            if image.ndim == 2:
+                image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+            boxes = self._detect(image)
+            crops = [self._crop(image, box) for box in boxes]
+            lines = self.recognize(crops) if crops else []
+            keep = [i for i, (text, _) in enumerate(lines) if text]
+            results.append({
+                "rec_texts": [lines[i][0] for i in keep],
+                "rec_scores": [lines[i][1] for i in keep],
+                "rec_polys": [boxes[i].astype(int).tolist() for i in keep]
+            })
+        return results
+
+    # ---------- 检测 ----------
+    def _detect(self, image: np.ndarray) -> List[np.ndarray]:
+        height, width = image.shape[:2]
+        ratio = min(1.0, self.DET_LIMIT_SIDE / max(height, width))
+        resize_h = max(32, int(round(height * ratio / 32)) * 32)
+        resize_w = max(32, int(round(width * ratio / 32)) * 32)
+        resized = cv2.resize(image, (resize_w, resize_h))
+
+        tensor = (resized.astype(np.float32) / 255.0 - self.DET_MEAN) / self.DET_STD
+        tensor = tensor.transpose(2, 0, 1)[np.newaxis]
+        prob = self._det.run(None, {self._det_input: tensor})[0][0, 0]
+
+        bitmap = (prob > self.DET_THRESH).astype(np.uint8)
+        contours, _ = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        scale_x, scale_y = width / resize_w, height / resize_h
+
+        boxes = []
+        for contour in contours[:1000]:
+            rect = cv2.minAreaRect(contour)
+            if min(rect[1]) < self.DET_MIN_SIZE:
+                continue
+            if self._box_score(prob, contour) < self.DET_BOX_THRESH:
+                continue
+
+            # 按DB算法的 unclip 距离外扩（矩形近似，省去pyclipper依赖）
+            (cx, cy), (w, h), angle = rect
+            distance = w * h * self.DET_UNCLIP_RATIO / (2 * (w + h))
+            expanded = ((cx, cy), (w + 2 * distance, h + 2 * distance), angle)
+            if min(expanded[1]) < self.DET_MIN_SIZE + 2:
+                continue
+
+            box = self._order_points(cv2.boxPoints(expanded))
+            box[:, 0] = np.clip(box[:, 0] * scale_x, 0, width - 1)
+            box[:, 1] = np.clip(box[:, 1] * scale_y, 0, height - 1)
+            boxes.append(box)
+
+        # 从上到下、从左到右
+        boxes.sort(key=lambda b: (round(b[0][1] / 10), b[0][0]))
+        return boxes
+
+    @staticmethod
+    def _box_score(prob: np.ndarray, contour: np.ndarray) -> float:
+        """轮廓区域内的平均概率"""
+        x, y, w, h = cv2.boundingRect(contour)
+        mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(mask, [contour.reshape(-1, 2) - [x, y]], 1)
+        return float(cv2.mean(prob[y:y + h, x:x + w], mask)[0])
+
+    @staticmethod
+    def _order_points(points: np.ndarray) -> np.ndarray:
+        """排列为 左上、右上、右下、左下"""
+        s = points.sum(axis=1)
+        d = np.diff(points, axis=1).ravel()
+        return np.array([points[np.argmin(s)], points[np.argmin(d)],
+                         points[np.argmax(s)], points[np.argmax(d)]], dtype=np.float32)
+
+    @staticmethod
+    def _crop(image: np.ndarray, box: np.ndarray) -> np.ndarray:
+        """透视变换裁出文字行，竖排文字旋转为横排"""
+        crop_w = int(max(np.linalg.norm(box[0] - box[1]), np.linalg.norm(box[2] - box[3])))
+        crop_h = int(max(np.linalg.norm(box[0] - box[3]), np.linalg.norm(box[1] - box[2])))
+        target = np.array([[0, 0], [crop_w, 0], [crop_w, crop_h], [0, crop_h]], dtype=np.float32)
+        matrix = cv2.getPerspectiveTransform(box, target)
+        crop = cv2.warpPerspective(image, matrix, (max(1, crop_w), max(1, crop_h)),
+                                   borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+        if crop.shape[0] / max(1, crop.shape[1]) >= 1.5:
+            crop = np.rot90(crop)
+        return crop
+
+    # ---------- 识别 ----------
+    def recognize(self, crops):
+        # 按宽高比排序后分批，同批填充宽度接近
+        order = sorted(range(len(crops)), key=lambda i: crops[i].shape[1] / max(1, crops[i].shape[0]))
+        results: List[Optional[Tuple[str, float]]] = [None] * len(crops)
+        for start in range(0, len(order), self.REC_BATCH_SIZE):
+            indexes = order[start:start + self.REC_BATCH_SIZE]
+            batch = self._rec_batch([crops[i] for i in indexes])
+            probs = self._rec.run(None, {self._rec_input: batch})[0]
+            for i, line_probs in zip(indexes, probs):
+                results[i] = self._ctc_decode(line_probs)
+        return results
+
+    def _rec_batch(self, crops: Sequence[np.ndarray]) -> np.ndarray:
+        widths = [
+            min(self.REC_MAX_WIDTH, max(8, math.ceil(self.REC_HEIGHT * c.shape[1] / max(1, c.shape[0]))))
+            for c in crops
+        ]
+        batch = np.zeros((len(crops), 3, self.REC_HEIGHT, max(widths)), dtype=np.float32)
+        for i, (crop, width) in enumerate(zip(crops, widths)):
+            if crop.ndim == 2:
+                crop = cv2.cvtColor(crop, cv2.COLOR_GRAY2BGR)
+            resized = cv2.resize(crop, (width, self.REC_HEIGHT)).astype(np.float32)
+            batch[i, :, :, :width] = ((resized / 255.0 - 0.5) / 0.5).transpose(2, 0, 1)
+        return batch
+
+    def _ctc_decode(self, probs: np.ndarray) -> Tuple[str, float]:
+        """CTC贪心解码：去重复、去空白"""
+        indexes = probs.argmax(axis=1)
+        confidences = probs.max(axis=1)
+        keep = indexes != 0
+        keep[1:] &= indexes[1:] != indexes[:-1]
+        chars = [self._characters[i] for i in indexes[keep] if i < len(self._characters)]
+        score = float(confidences[keep].mean()) if keep.any() else 0.0
+        return "".join(chars), score
+
+# ========== 工厂 ==========
+def create_ocr_engine(backend: Optional[str] = None, int8: Optional[bool] = None, **options) -> OCREngine:
+    """按配置创建OCR引擎；backend 为 onnx-int8 等价于 onnx + int8"""
+    backend = (backend or settings.OCR_BACKEND).lower()
+    if backend == "onnx-int8":
+        backend, int8 = "onnx", True
+    if backend == "paddle":
+        return PaddleEngine(**options)
+    if backend == "onnx":
+        return OnnxEngine(
+            settings.OCR_ONNX_MODEL_DIR,
+            int8=settings.OCR_ONNX_INT8 if int8 is None else int8,
+            threads=settings.OCR_ONNX_THREADS or options.get("cpu_threads", 0)
+        )
+    raise ValueError(f"不支持的OCR后端: {backend}")
+
+def quantize_models(model_dir: str):
+    """把 det.onnx / rec.onnx 动态量化为 det_int8.onnx / rec_int8.onnx"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    root = Path(model_dir)
+    for name in ("det", "rec"):
+        source, target = root / f"{name}.onnx", root / f"{name}_int8.onnx"
+        quantize_dynamic(str(source), str(target), weight_type=QuantType.QUInt8)
+        print(f"✅ {source.name} -> {target.name} ({target.stat().st_size / 1024 ** 2:.1f}MB)")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="OCR引擎工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    quantize = subparsers.add_parser("quantize", help="生成int8量化的ONNX模型")
+    quantize.add_argument("--model-dir", default=settings.OCR_ONNX_MODEL_DIR)
+    args = parser.parse_args()
+    quantize_models(args.model_dir)
@@ -0,0 +1,176 @@
+# app/services/ocr_fields.py - 从OCR文字行提取 参数名->值
+"""
+按阅读顺序和几何位置把标签行与数值行配对，输出结构化参数：
+    同一行写成 "吸气压力:0.1±0.01MPa"   -> 直接拆分
+    标签与数值分成两个文字框             -> 取同一行右侧或正下方最近的数值框
+每个字段给出置信度 = 识别置信度 × 配对方式系数，供工况识别决定是否跳过LLM参数提取：
+只看工况解析实际使用的参数（PARAMETER_LABELS），全部不低于 TRUST_THRESHOLD 即可信。
+纯Python实现，主进程与OCR工作进程都可使用。
+"""
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 工况解析使用的参数（与参数提取提示词一致），长标签在前以便优先匹配
+PARAMETER_LABELS = (
+    "温度变化速率", "低温停留时间", "吸气压力", "排气压力", "工作模式",
+    "过热度", "过冷度", "电压", "转速", "环温", "低温", "高温"
+)
+# 参数单上常见的标签（命中时不降低置信度）
+KNOWN_LABELS = PARAMETER_LABELS + ("高温停留时间",)
+
+# 配对方式系数：与 TRUST_THRESHOLD 一起标定。
+# 识别置信度通常在0.95以上，同一行或正下方的数值配对基本不会出错，只做轻微折减，
+# 使识别置信度约0.93以上的右侧配对、约0.94以上的下方配对仍可跳过LLM
+INLINE_FACTOR = 1.0  # 标签与数值在同一文字框
+SAME_ROW_FACTOR = 0.97  # 数值在标签右侧
+BELOW_FACTOR = 0.96  # 数值在标签正下方
+UNKNOWN_LABEL_FACTOR = 0.9  # 不在常见标签表中（这类参数不参与可信判断）
+TRUST_THRESHOLD = 0.9  # 默认可信阈值
+
+Box = Tuple[float, float, float, float]
+Line = Tuple[str, float, Optional[Box]]
+
+_TOLERANCE_PATTERN = re.compile(r"\s*(?:土|\+\s*/\s*-|\+\s*-|±)\s*")
+_VALUE_PATTERN = re.compile(r"\d")
+
+def normalize_tolerance(text: str) -> str:
+    """统一公差符号：土 / +- / +/- / ± -> ±，全角冒号 -> 半角"""
+    text = text.replace("：", ":")
+    return _TOLERANCE_PATTERN.sub("±", text).strip()
+
+def poly_to_box(points: Sequence[Sequence[float]]) -> Box:
+    """多边形顶点 -> 外接矩形 (x1, y1, x2, y2)"""
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def _is_label(text: str) -> bool:
+    stripped = text.rstrip(":").strip()
+    return bool(stripped) and not _VALUE_PATTERN.search(stripped) and len(stripped) <= 12
+
+def _is_value(text: str) -> bool:
+    return bool(_VALUE_PATTERN.search(text))
+
+def _label_factor(label: str) -> float:
+    return 1.0 if any(known in label for known in KNOWN_LABELS) else UNKNOWN_LABEL_FACTOR
+
+def _vertical_overlap(a: Box, b: Box) -> float:
+    overlap = min(a[3], b[3]) - max(a[1], b[1])
+    return overlap / max(1e-6, min(a[3] - a[1], b[3] - b[1]))
+
+def _horizontal_overlap(a: Box, b: Box) -> float:
+    overlap = min(a[2], b[2]) - max(a[0], b[0])
+    return overlap / max(1e-6, min(a[2] - a[0], b[2] - b[0]))
+
+def reading_order(lines: List[Line]) -> List[Line]:
+    """按行分组（纵向重叠过半视为同一行），行内从左到右"""
+    if any(box is None for _, _, box in lines):
+        return list(lines)
+
+    rows: List[List[Line]] = []
+    for line in sorted(lines, key=lambda l: (l[2][1] + l[2][3]) / 2):
+        if rows and _vertical_overlap(rows[-1][0][2], line[2]) > 0.5:
+            rows[-1].append(line)
+        else:
+            rows.append([line])
+    return [line for row in rows for line in sorted(row, key=lambda l: l[2][0])]
+
+def _find_value(index: int, lines: List[Line], used: set) -> Tuple[Optional[int], float]:
+    """为标签行寻找数值行：优先同一行右侧最近，其次正下方最近"""
+    _, _, label_box = lines[index]
+    if label_box is None:
+        # 没有几何信息时按阅读顺序取下一行
+        nxt = index + 1
+        if nxt < len(lines) and nxt not in used and _is_value(lines[nxt][0]):
+            return nxt, SAME_ROW_FACTOR
+        return None, 0.0
+
+    height = label_box[3] - label_box[1]
+    best, best_gap, factor = None, float("inf"), 0.0
+    for j, (text, _, box) in enumerate(lines):
+        if j == index or j in used or not _is_value(text):
+            continue
+        if _vertical_overlap(label_box, box) > 0.5 and box[0] >= label_box[0]:
+            gap = box[0] - label_box[2]
+            if gap < best_gap:
+                best, best_gap, factor = j, gap, SAME_ROW_FACTOR
+    if best is not None:
+        return best, factor
+
+    for j, (text, _, box) in enumerate(lines):
+        if j == index or j in used or not _is_value(text):
+            continue
+        gap = box[1] - label_box[3]
+        if 0 <= gap <= 1.5 * height and _horizontal_overlap(label_box, box) > 0.3 and gap < best_gap:
+            best, best_gap, factor = j, gap, BELOW_FACTOR
+    return best, factor
+
+def extract_key_values(lines: List[Line]) -> Dict[str, Any]:
+    """
+    lines: [(文字, 识别置信度, 外接矩形或None), ...]
+    返回 {"fields": {参数名: 值}, "confidence": {参数名: 0~1}}；重名参数依次编号（转速1、转速2）。
+    """
+    ordered = [(normalize_tolerance(text), score, box) for text, score, box in reading_order(lines) if text.strip()]
+    pairs: List[Tuple[str, str, float]] = []
+    used: set = set()
+
+    for i, (text, score, _) in enumerate(ordered):
+        if i in used:
+            continue
+        label, sep, value = text.partition(":")
+        label, value = label.strip(), value.strip()
+        if sep and label and value and not _VALUE_PATTERN.search(label):
+            used.add(i)
+            pairs.append((label, value, score * INLINE_FACTOR * _label_factor(label)))
+            continue
+        if not _is_label(text):
+            continue
+
+        j, factor = _find_value(i, ordered, used)
+        if j is None:
+            continue
+        used.update((i, j))
+        label = text.rstrip(":").strip()
+        pairs.append((label, ordered[j][0], min(score, ordered[j][1]) * factor * _label_factor(label)))
+
+    counts: Dict[str, int] = {}
+    for label, _, _ in pairs:
+        counts[label] = counts.get(label, 0) + 1
+
+    fields: Dict[str, str] = {}
+    confidence: Dict[str, float] = {}
+    seen: Dict[str, int] = {}
+    for label, value, conf in pairs:
+        key = label
+        if counts[label] > 1:
+            seen[label] = seen.get(label, 0) + 1
+            key = f"{label}{seen[label]}"
+        fields[key] = value
+        confidence[key] = round(conf, 4)
+    return {"fields": fields, "confidence": confidence}
+
+def parameter_label(key: str) -> Optional[str]:
+    """参数名（可能带编号，如 转速2）对应的工况参数标签，不是工况参数时返回None"""
+    base = key.rstrip("0123456789")
+    for label in PARAMETER_LABELS:
+        if base == label:
+            return label
+    return None
+
+def trusted_parameters(
+    fields: Dict[str, str],
+    confidence: Optional[Dict[str, float]],
+    threshold: float = TRUST_THRESHOLD
+) -> Optional[Dict[str, str]]:
+    """
+    工况解析使用的参数全部有置信度且不低于阈值时，返回这些参数（可直接代替LLM参数提取）；
+    否则返回None。其他字段（表头、编号等）不影响判断。
+    """
+    if not fields or not confidence:
+        return None
+    params = {key: value for key, value in fields.items() if parameter_label(key)}
+    if not params:
+        return None
+    if all(confidence.get(key, 0.0) >= threshold for key in params):
+        return params
+    return None
@@ -0,0 +1,233 @@
+# app/services/ocr_pool.py - OCR工作进程池
+"""
+OCR推理在独立进程中执行，事件循环只负责收发数据。
+每个工作进程在 initializer 中各自加载一次 PaddleOCR 引擎；
+启动时在后台预热，不阻塞人脸、审批等其他路由。
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.process_pool import BoundedProcessPool
+from app.services.ocr_cache import ocr_cache
+from app.services.ocr_batcher import OCRMicroBatcher
+from app.services.ocr_templates import template_registry
+from app.services.single_flight import SingleFlight
+from app.services.ocr_tuning import resolve_engine_settings
+
+logger = logging.getLogger(__name__)
+
+# ========== 工作进程侧函数（在子进程中执行） ==========
+def _init_ocr_worker(engine_options: Optional[Dict[str, Any]] = None):
+    """工作进程初始化：按调优参数加载OCR引擎"""
+    from app.services.ocr_service import configure_ocr_engine, get_ocr_engine
+
+    configure_ocr_engine(engine_options)
+    get_ocr_engine()
+    logging.getLogger(__name__).info(f"[OCR] 工作进程 {os.getpid()} 引擎已加载")
+
+def _ocr_worker_extract(content: bytes, suffix: str, structured: bool = False) -> Dict[str, Any]:
+    """在工作进程中识别单张图片（内存解码，不落盘）"""
+    from app.services.ocr_service import recognize_bytes
+
+    return recognize_bytes(content, suffix, structured)
+
+def _ocr_worker_extract_batch(contents: List[bytes]) -> List[Dict[str, Any]]:
+    """在工作进程中批量识别多张图片"""
+    from app.services.ocr_service import extract_batch_from_bytes
+
+    return extract_batch_from_bytes(contents)
+
+def _ocr_worker_extract_template(content: bytes, templates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """在工作进程中按版式模板识别"""
+    from app.services.ocr_service import recognize_with_templates
+
+    return recognize_with_templates(content, templates)
+
+# ========== 主进程侧 ==========
+class OCRNotReadyError(RuntimeError):
+    """OCR引擎尚未完成预热"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"OCR引擎正在加载，请 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+class OCRWorkerPool:
+    """OCR进程池封装"""
+
+    def __init__(self):
+        # 工作进程数与引擎线程参数：显式配置 > 调优结果 > 按核心数估算
+        self.engine_settings = resolve_engine_settings()
+        self.pool = BoundedProcessPool(
+            name="OCR引擎",
+            workers=self.engine_settings["workers"],
+            queue_size=settings.OCR_QUEUE_SIZE,
+            initializer=_init_ocr_worker,
+            initargs=(self.engine_settings["engine_options"],),
+            retry_after=settings.OCR_RETRY_AFTER_SECONDS
+        )
+        self.batcher = OCRMicroBatcher(
+            run_batch=self._run_batch,
+            max_concurrent_batches=self.pool.workers,
+            window_ms=settings.OCR_BATCH_WINDOW_MS,
+            max_batch_size=settings.OCR_BATCH_MAX_SIZE,
+            max_queue_depth=settings.OCR_BATCH_QUEUE_DEPTH,
+            retry_after=settings.OCR_RETRY_AFTER_SECONDS
+        ) if settings.OCR_MICRO_BATCH_ENABLED else None
+        # 相同图片并发上传时只推理一次
+        self.single_flight = SingleFlight("OCR")
+
+        # 预热状态: not_started / warming / ready / failed
+        self.state = "not_started"
+        self.warmup_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._ready_event: Optional[asyncio.Event] = None
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def start_background(self):
+        """在后台预热进程池，立即返回"""
+        if self._warmup_task is not None and self.state in ("warming", "ready"):
+            return
+        if self._ready_event is None:
+            self._ready_event = asyncio.Event()
+        self.state = "warming"
+        self._warmup_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        start_time = time.perf_counter()
+        try:
+            warm = await self.pool.warm_up()
+            self.warmup_seconds = round(time.perf_counter() - start_time, 2)
+            self.state = "ready"
+            self.last_error = None
+            logger.info(f"[OCR] 进程池预热完成，就绪工作进程: {warm}/{self.pool.workers}，耗时 {self.warmup_seconds}s")
+        except Exception as e:
+            self.state = "failed"
+            self.last_error = str(e)
+            self.pool.shutdown()
+            logger.error(f"[OCR] 进程池预热失败: {e}")
+        finally:
+            self._ready_event.set()
+
+    async def wait_ready(self):
+        """等待预热完成；超时或预热失败时抛出 OCRNotReadyError"""
+        if self.state == "ready":
+            return
+        if self.state in ("not_started", "failed"):
+            # 未在启动时预热（或上次失败）的情况下由首个请求触发
+            if self._ready_event is not None:
+                self._ready_event.clear()
+            self.start_background()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._ready_event.wait()), settings.OCR_READY_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise OCRNotReadyError(settings.OCR_RETRY_AFTER_SECONDS)
+        if self.state != "ready":
+            raise OCRNotReadyError(settings.OCR_RETRY_AFTER_SECONDS)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    def get_readiness(self) -> Dict[str, Any]:
+        """预热状态（供 /ocr/ready 与 /health 使用）"""
+        return {
+            "ready": self.is_ready,
+            "state": self.state,
+            "workers": self.pool.workers,
+            "warm_workers": self.pool.get_stats()["warm_workers"],
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.last_error
+        }
+
+    async def extract(self, content: bytes, suffix: str, structured: bool = False) -> Dict[str, Any]:
+        """
+        识别图片文字，返回 {"text": ...}；相同图片优先命中缓存。
+        structured 为True时另含按几何配对的 "fields" / "confidence"。
+        """
+        key = ocr_cache.make_key(content, variant="structured" if structured else "")
+        cached = await ocr_cache.get(key)
+        if cached is not None:
+            return cached
+        return await self.single_flight.do(key, lambda: self._extract_uncached(key, content, suffix, structured))
+
+    async def _extract_uncached(self, key: str, content: bytes, suffix: str, structured: bool) -> Dict[str, Any]:
+        await self.wait_ready()
+        if structured:
+            # 结构化结果需要逐行坐标，不走微批路径
+            result = await self.pool.run(_ocr_worker_extract, content, suffix, True)
+            ocr_cache.put(key, result)
+            return result
+
+        result = None
+        if self.batcher is not None:
+            result = await self.batcher.submit(content)
+        if result is None or result.get("error"):
+            # 未启用微批，或批量路径无法解码时走单图路径（含临时文件兜底）
+            result = await self.pool.run(_ocr_worker_extract, content, suffix)
+        ocr_cache.put(key, result)
+        return result
+
+    async def extract_batch(self, contents: List[bytes]) -> List[Dict[str, Any]]:
+        """批量识别，未命中缓存的图片作为一个任务提交，按顺序返回 [{"text", "error"}, ...]"""
+        keys = [ocr_cache.make_key(content) for content in contents]
+        results = [await ocr_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing:
+            await self.wait_ready()
+            fresh = await self._run_batch([contents[i] for i in missing])
+            for i, result in zip(missing, fresh):
+                results[i] = result
+                ocr_cache.put(keys[i], result)
+        return results
+
+    async def extract_with_template(self, content: bytes, template_name: Optional[str] = None) -> Dict[str, Any]:
+        """按版式模板识别；template_name 指定时只尝试该模板"""
+        if template_name:
+            template = template_registry.get(template_name)
+            if template is None:
+                raise LookupError(f"模板不存在: {template_name}")
+            templates = [template]
+        else:
+            templates = template_registry.list()
+
+        key = ocr_cache.make_key(content, variant=f"template:{template_registry.version}:{template_name or ''}")
+        cached = await ocr_cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def run() -> Dict[str, Any]:
+            await self.wait_ready()
+            result = await self.pool.run(_ocr_worker_extract_template, content, templates)
+            ocr_cache.put(key, result)
+            return result
+
+        return await self.single_flight.do(key, run)
+
+    async def _run_batch(self, contents: List[bytes]) -> List[Dict[str, Any]]:
+        return await self.pool.run(_ocr_worker_extract_batch, contents)
+
+    def shutdown(self):
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        if self.batcher is not None:
+            self.batcher.shutdown()
+        self.pool.shutdown()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.pool.get_stats()
+
+    def get_single_flight_stats(self) -> Dict[str, Any]:
+        return self.single_flight.get_stats()
+
+    def get_batcher_stats(self) -> Dict[str, Any]:
+        if self.batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.batcher.get_stats()}
+
+# 全局OCR进程池实例
+ocr_pool = OCRWorkerPool()
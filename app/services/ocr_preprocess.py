@@ -0,0 +1,107 @@
+# app/services/ocr_preprocess.py - OCR检测前的图像预处理
+"""
+手机拍摄的参数单常见 12~48MP，原尺寸送检测既慢又占内存。
+预处理顺序：裁掉空白边框 -> 按长边/DPI缩放 -> 可选灰度化。
+返回的 scale/offset 用于把处理后图像上的坐标映射回原图：
+    原图坐标 = 处理后坐标 / scale + offset
+"""
+import io
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+def read_image_dpi(content: bytes) -> Optional[float]:
+    """读取图片元数据中的DPI（只解析文件头），没有则返回None"""
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(content)) as img:
+            dpi = img.info.get("dpi")
+        if dpi and float(dpi[0]) > 1:
+            return float(dpi[0])
+    except Exception:
+        pass
+    return None
+
+def _find_content_box(image: np.ndarray, threshold: int, margin: int) -> Optional[Tuple[int, int, int, int]]:
+    """找到非空白区域的外接矩形 (x, y, w, h)"""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    # 在缩小的图上找边界，避免对全尺寸图做逐像素运算
+    factor = max(1, max(gray.shape) // 1000)
+    small = gray[::factor, ::factor]
+    mask = (small < threshold).astype(np.uint8)
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return None
+
+    x, y, w, h = cv2.boundingRect(points)
+    height, width = gray.shape[:2]
+    x0 = max(0, x * factor - margin)
+    y0 = max(0, y * factor - margin)
+    x1 = min(width, (x + w) * factor + margin)
+    y1 = min(height, (y + h) * factor + margin)
+    return x0, y0, x1 - x0, y1 - y0
+
+def preprocess_image(
+    image: np.ndarray,
+    max_long_edge: int = 0,
+    target_dpi: int = 0,
+    source_dpi: Optional[float] = None,
+    grayscale: bool = False,
+    crop_borders: bool = False,
+    border_threshold: int = 245,
+    border_margin: int = 16
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    预处理BGR图像，返回 (处理后的图像, 处理信息)。
+    max_long_edge / target_dpi 为0表示不按该条件缩放；只缩小不放大。
+    """
+    height, width = image.shape[:2]
+    offset_x, offset_y = 0, 0
+    cropped = False
+
+    if crop_borders:
+        box = _find_content_box(image, border_threshold, border_margin)
+        if box is not None and box != (0, 0, width, height):
+            offset_x, offset_y, crop_w, crop_h = box
+            image = image[offset_y:offset_y + crop_h, offset_x:offset_x + crop_w]
+            cropped = True
+
+    scale = 1.0
+    long_edge = max(image.shape[:2])
+    if max_long_edge > 0 and long_edge > max_long_edge:
+        scale = max_long_edge / long_edge
+    if target_dpi > 0 and source_dpi and source_dpi > target_dpi:
+        scale = min(scale, target_dpi / source_dpi)
+    if scale < 1.0:
+        new_size = (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale)))
+        image = cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+
+    if grayscale and image.ndim == 3:
+        # 检测模型需要三通道输入，灰度化后再复制回三通道
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+    info = {
+        "scale": round(scale, 6),
+        "offset": [offset_x, offset_y],
+        "original_size": [width, height],
+        "processed_size": [image.shape[1], image.shape[0]],
+        "grayscale": grayscale,
+        "cropped": cropped
+    }
+    return image, info
+
+def map_points_to_original(points: Sequence[Sequence[float]], info: Optional[Dict[str, Any]]) -> List[List[float]]:
+    """把处理后图像上的点坐标映射回原图；info 为None（未预处理）时原样返回"""
+    info = info or {}
+    scale = info.get("scale", 1.0) or 1.0
+    offset_x, offset_y = info.get("offset", (0, 0))
+    return [[round(x / scale + offset_x, 1), round(y / scale + offset_y, 1)] for x, y in points]
+
+def map_box_to_original(box: Optional[Sequence[float]], info: Optional[Dict[str, Any]]) -> Optional[List[float]]:
+    """外接矩形 (x1, y1, x2, y2) 映射回原图，没有坐标时返回None"""
+    if box is None:
+        return None
+    (x1, y1), (x2, y2) = map_points_to_original([box[:2], box[2:4]], info)
+    return [x1, y1, x2, y2]
@@ -4,33 +4,258 @@ import logging
 import json
 import tempfile
 import os
-from paddleocr import PaddleOCR
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
-# 全局加载PP-OCRv5模型
-_ocr_engine = PaddleOCR(
-    use_doc_orientation_classify=False,
-    use_doc_unwarping=False,
-    use_textline_orientation=False
-)
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.ocr_engines import OCREngine, create_ocr_engine
+from app.services.ocr_preprocess import preprocess_image, read_image_dpi, map_box_to_original
+from app.services.ocr_templates import template_scale, scale_box, normalize_anchor_text
+from app.services.ocr_fields import extract_key_values, poly_to_box
+
+# OCR模型延迟到首次使用时加载，导入本模块不再阻塞
+_ocr_engine = None
+_engine_lock = threading.Lock()
+_engine_options: Dict[str, Any] = {}
+
+def configure_ocr_engine(options: Optional[Dict[str, Any]]):
+    """设置引擎参数（线程数、MKL-DNN等），须在首次加载引擎前调用"""
+    global _engine_options
+    _engine_options = dict(options or {})
+
+def get_ocr_engine() -> OCREngine:
+    """获取OCR引擎（后端由 OCR_BACKEND 决定），首次调用时加载模型"""
+    global _ocr_engine
+    if _ocr_engine is None:
+        with _engine_lock:
+            if _ocr_engine is None:
+                logging.info(f"[OCR] 正在加载OCR引擎，后端: {settings.OCR_BACKEND}，参数: {_engine_options}...")
+                _ocr_engine = create_ocr_engine(**_engine_options)
+    return _ocr_engine
 
 def extract_parameters(image_path: str) -> str:
     """
     使用 PP-OCRv5 提取图片中的所有文字，返回用分号连接的文本。
     """
+    return _recognize(image_path)
+
+def recognize_bytes(content: bytes, suffix: str = ".png", structured: bool = False) -> Dict[str, Any]:
+    """
+    内存识别：直接解码上传的字节，预处理后送入引擎，不落盘。
+    仅当OpenCV无法解码时才回退到临时文件方式，交由PaddleOCR自行读取。
+    返回 {"text": 文字, "preprocess": 预处理信息（缩放比例、裁剪偏移）}；
+    structured 为True时另含 "fields" / "confidence" / "lines"（见 recognize_structured）
+    """
+    image = decode_image_bytes(content)
+    if image is not None:
+        image, info = preprocess_for_ocr(image, content)
+        if structured:
+            return {**recognize_structured(image, info), "preprocess": info}
+        return {"text": _recognize(image), "preprocess": info}
+
+    if structured:
+        logging.warning(f"[OCR] 内存解码失败，结构化识别不可用")
+        return {"text": "", "fields": {}, "confidence": {}, "lines": [], "preprocess": None, "error": "无法解码图像"}
+
+    logging.warning(f"[OCR] 内存解码失败，回退到临时文件识别")
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(content)
+        tmp_path = tmp.name
+    try:
+        return {"text": extract_parameters(tmp_path), "preprocess": None}
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def preprocess_for_ocr(image: np.ndarray, content: Optional[bytes] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """按配置执行检测前预处理（缩放/灰度/裁边）"""
+    source_dpi = None
+    if settings.OCR_PREPROCESS_TARGET_DPI > 0 and content is not None:
+        source_dpi = read_image_dpi(content)
+    return preprocess_image(
+        image,
+        max_long_edge=settings.OCR_PREPROCESS_MAX_LONG_EDGE,
+        target_dpi=settings.OCR_PREPROCESS_TARGET_DPI,
+        source_dpi=source_dpi,
+        grayscale=settings.OCR_PREPROCESS_GRAYSCALE,
+        crop_borders=settings.OCR_PREPROCESS_CROP_BORDERS
+    )
+
+def extract_batch_from_bytes(contents: List[bytes]) -> List[Dict[str, Any]]:
+    """
+    批量识别：所有可解码的图片作为一次 predict 输入，识别器可跨图片合批文本行。
+    按输入顺序返回每张图片的结果，单张失败不影响其他图片。
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(contents)
+    images = []
+    infos = []
+    positions = []
+    for i, content in enumerate(contents):
+        image = decode_image_bytes(content)
+        if image is None:
+            results[i] = {"text": "", "error": "无法解码图像"}
+        else:
+            image, info = preprocess_for_ocr(image, content)
+            images.append(image)
+            infos.append(info)
+            positions.append(i)
+
+    if images:
+        try:
+            predictions = list(get_ocr_engine().predict(input=images))
+            for pos, info, res in zip(positions, infos, predictions):
+                text_parts = _extract_from_predict_result([res])
+                results[pos] = {"text": '；'.join(text_parts), "preprocess": info, "error": None}
+            logging.info(f"[OCR] 批量Predict成功，图片数: {len(images)}")
+        except Exception as e:
+            logging.warning(f"[OCR] 批量Predict失败，改为逐张识别: {e}")
+
+        # 批量失败或结果数量不符时，逐张补齐；单张失败只记录该张的错误
+        for pos, info, image in zip(positions, infos, images):
+            if results[pos] is None:
+                try:
+                    results[pos] = {"text": _recognize(image), "preprocess": info, "error": None}
+                except Exception as e:
+                    logging.error(f"[OCR] 第 {pos + 1} 张图片识别失败: {e}")
+                    results[pos] = {"text": "", "preprocess": info, "error": str(e)}
+
+    return results
+
+def recognize_crops(crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+    """只对裁剪区域做文字识别（跳过检测），返回 [(文字, 置信度), ...]"""
+    try:
+        results = [(_clean_text(text), score) for text, score in get_ocr_engine().recognize(crops)]
+        if len(results) == len(crops):
+            return results
+    except Exception as e:
+        logging.warning(f"[OCR] 区域识别失败，改用完整流水线: {e}")
+
+    results = []
+    for crop in crops:
+        lines = []
+        for res in get_ocr_engine().predict(input=crop):
+            lines.extend(_read_rec_lines(res) or [])
+        text = " ".join(_clean_text(t) for t, _ in lines).strip()
+        results.append((text, min((score for _, score in lines), default=0.0)))
+    return results
+
+def recognize_with_templates(content: bytes, templates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    按版式模板识别：尺寸、宽高比和锚点文字都匹配时只识别登记的字段区域。
+    没有模板匹配时回退到整页识别，template 为 None。
+    """
+    image = decode_image_bytes(content)
+    if image is None:
+        return {"template": None, "fields": {}, "confidence": {}, "text": "", "error": "无法解码图像"}
+    height, width = image.shape[:2]
+
+    def crop(box):
+        x1, y1, x2, y2 = scale_box(box, scale, width, height)
+        return image[y1:y2, x1:x2] if x2 > x1 and y2 > y1 else None
+
+    for template in templates:
+        scale = template_scale(template, width, height)
+        if scale is None:
+            continue
+
+        anchors = template.get("anchors", [])
+        if anchors:
+            anchor_crops = [crop(anchor["box"]) for anchor in anchors]
+            if any(c is None for c in anchor_crops):
+                continue
+            anchor_texts = recognize_crops(anchor_crops)
+            if not all(
+                normalize_anchor_text(anchor["text"]) in normalize_anchor_text(text)
+                for anchor, (text, _) in zip(anchors, anchor_texts)
+            ):
+                continue
+
+        names = list(template["fields"].keys())
+        field_crops = [crop(template["fields"][name]) for name in names]
+        valid = [(name, c) for name, c in zip(names, field_crops) if c is not None]
+        recognized = recognize_crops([c for _, c in valid]) if valid else []
+
+        fields = {}
+        confidence = {}
+        for (name, _), (text, score) in zip(valid, recognized):
+            # 字段框可能连标签一起框进来，去掉"标签:"前缀
+            if text.startswith(name):
+                text = text[len(name):].lstrip(":： ")
+            fields[name] = text
+            confidence[name] = round(score, 4)
+
+        logging.info(f"[OCR] 匹配版式模板 {template['name']}，识别字段 {len(fields)} 个")
+        return {
+            "template": template["name"],
+            "fields": fields,
+            "confidence": confidence,
+            "text": '；'.join(f"{name}:{value}" for name, value in fields.items() if value)
+        }
+
+    # 未匹配任何模板：整页识别，字段按几何位置配对
+    result = recognize_bytes(content, structured=True)
+    return {"template": None, **result}
+
+def recognize_structured(image: np.ndarray, info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    整页识别，并按几何位置把标签与数值配对：{"text", "fields", "confidence", "lines"}。
+    lines 为逐行 {"text", "confidence", "box"}，box 按预处理信息 info 映射回原图坐标 [x1, y1, x2, y2]。
+    """
+    try:
+        result = get_ocr_engine().predict(input=image)
+        entries = []
+        for res in result:
+            entries.extend(_read_rec_entries(res) or [])
+        text = '；'.join(_extract_from_predict_result(result))
+        lines = [(_clean_text(t), score, box) for t, score, box in entries]
+    except Exception as e:
+        # 拿不到逐行结果时退回纯文字，置信度记为0，下游不会据此跳过LLM
+        logging.warning(f"[OCR] 结构化识别失败，按文字行解析: {e}")
+        text = _recognize(image)
+        lines = [(line, 0.0, None) for line in text.split('；')]
+    return {
+        "text": text,
+        **extract_key_values(lines),
+        "lines": [
+            {"text": t, "confidence": round(score, 4), "box": map_box_to_original(box, info)}
+            for t, score, box in lines if t
+        ]
+    }
+
+def decode_image_bytes(content: bytes) -> Optional[np.ndarray]:
+    """将图片字节解码为BGR数组，失败返回None"""
+    try:
+        nparr = np.frombuffer(content, np.uint8)
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    except Exception:
+        return None
+
+def _recognize(image_input) -> str:
+    """对文件路径或BGR数组执行识别"""
     try:
         # 尝试predict方法
         try:
-            result = _ocr_engine.predict(input=image_path)
+            result = get_ocr_engine().predict(input=image_input)
             text_parts = _extract_from_predict_result(result)
             if text_parts:
                 final_result = '；'.join(text_parts)
                 logging.info(f"[OCR] Predict方法成功，提取到 {len(text_parts)} 个文本片段")
                 return final_result
+        except ValueError:
+            # 图像无法读取，交由调用方返回400
+            raise
         except:
             pass
         
-        # 备用：传统OCR方法
-        results = _ocr_engine.ocr(image_path, cls=True)
+        # 备用：传统OCR方法（仅Paddle后端提供）
+        engine = get_ocr_engine()
+        if not hasattr(engine, "ocr"):
+            logging.warning(f"[OCR] 未识别到文字内容")
+            return ""
+        results = engine.ocr(image_input, cls=True)
         if not results or not results[0]:
             logging.warning(f"[OCR] 未识别到文字内容")
             return ""
@@ -48,42 +273,66 @@ def extract_parameters(image_path: str) -> str:
         logging.info(f"[OCR] 传统方法成功，提取到 {len(text_parts)} 个文本片段")
         return final_result
         
+    except ValueError:
+        raise
     except Exception as e:
         logging.error(f"[OCR] 处理失败: {e}")
         return ""
 
+def _result_payload(res) -> Optional[Dict[str, Any]]:
+    """
+    predict结果对象中的字段字典。
+    OCRResult 本身是dict子类；较旧版本则包在 res.json["res"] 中。
+    """
+    data = res if isinstance(res, dict) else None
+    if data is None or "rec_texts" not in data:
+        payload = getattr(res, "json", None)
+        if isinstance(payload, dict):
+            data = payload.get("res", payload)
+    if not isinstance(data, dict) or data.get("rec_texts") is None:
+        return None
+    return data
+
+def _read_rec_entries(res) -> Optional[List[Tuple[str, float, Optional[Tuple[float, float, float, float]]]]]:
+    """读取 (文字, 置信度, 外接矩形)；结果中没有坐标时矩形为None"""
+    data = _result_payload(res)
+    if data is None:
+        return None
+    lines = _read_rec_lines(res)
+    boxes = data.get("rec_boxes")
+    polys = data.get("rec_polys")
+    if boxes is not None and len(boxes) == len(lines):
+        geometry = [tuple(float(v) for v in box[:4]) for box in boxes]
+    elif polys is not None and len(polys) == len(lines):
+        geometry = [poly_to_box(poly) for poly in polys]
+    else:
+        geometry = [None] * len(lines)
+    return [(text, score, box) for (text, score), box in zip(lines, geometry)]
+
+def _read_rec_lines(res) -> Optional[List[Tuple[str, float]]]:
+    """
+    直接从predict结果对象读取 rec_texts / rec_scores。
+    无法读取时返回None，由调用方走兼容路径。
+    """
+    data = _result_payload(res)
+    if data is None:
+        return None
+
+    texts = list(data["rec_texts"])
+    scores = data.get("rec_scores")
+    scores = list(scores) if scores is not None else [1.0] * len(texts)
+    return [(str(text), float(score)) for text, score in zip(texts, scores)]
+
 def _extract_from_predict_result(result) -> list:
     """从predict结果中提取文本"""
     text_parts = []
     
-    try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            for i, res in enumerate(result):
-                # 方法1: JSON提取
-                try:
-                    json_file = os.path.join(temp_dir, f"result_{i}.json")
-                    res.save_to_json(json_file)
-                    
-                    if os.path.exists(json_file):
-                        with open(json_file, 'r', encoding='utf-8') as f:
-                            ocr_data = json.load(f)
-                        text_parts.extend(_extract_texts_from_json(ocr_data))
-                except:
-                    pass
-                
-                # 方法2: 属性提取
-                try:
-                    if hasattr(res, '__dict__'):
-                        for attr_name, attr_value in res.__dict__.items():
-                            if 'text' in attr_name.lower() and isinstance(attr_value, (str, list)):
-                                if isinstance(attr_value, str) and attr_value.strip():
-                                    text_parts.append(attr_value.strip())
-                                elif isinstance(attr_value, list):
-                                    text_parts.extend([str(item).strip() for item in attr_value if str(item).strip()])
-                except:
-                    pass
-    except:
-        pass
+    for i, res in enumerate(result):
+        lines = _read_rec_lines(res)
+        if lines is not None:
+            text_parts.extend(text for text, _ in lines)
+        else:
+            text_parts.extend(_extract_via_saved_json(res, i))
     
     # 清理和去重
     cleaned_texts = []
@@ -96,6 +345,40 @@ def _extract_from_predict_result(result) -> list:
     
     return cleaned_texts
 
+def _extract_via_saved_json(res, index: int) -> list:
+    """兼容路径：结果对象不支持直接读取时，保存为JSON再解析"""
+    text_parts = []
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 方法1: JSON提取
+            try:
+                json_file = os.path.join(temp_dir, f"result_{index}.json")
+                res.save_to_json(json_file)
+                
+                if os.path.exists(json_file):
+                    with open(json_file, 'r', encoding='utf-8') as f:
+                        ocr_data = json.load(f)
+                    text_parts.extend(_extract_texts_from_json(ocr_data))
+            except:
+                pass
+            
+            # 方法2: 属性提取
+            try:
+                if hasattr(res, '__dict__'):
+                    for attr_name, attr_value in res.__dict__.items():
+                        if 'text' in attr_name.lower() and isinstance(attr_value, (str, list)):
+                            if isinstance(attr_value, str) and attr_value.strip():
+                                text_parts.append(attr_value.strip())
+                            elif isinstance(attr_value, list):
+                                text_parts.extend([str(item).strip() for item in attr_value if str(item).strip()])
+            except:
+                pass
+    except:
+        pass
+    
+    return text_parts
+
 def _extract_texts_from_json(ocr_data) -> list:
     """从JSON数据中提取文本"""
     texts = []
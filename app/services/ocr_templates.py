@@ -0,0 +1,113 @@
+# app/services/ocr_templates.py - 已知表单版式模板
+"""
+大多数上传都是固定的几种参数单版式。为这些版式登记字段框后，
+匹配成功的图片跳过整页文字检测，只对登记区域做文字识别。
+
+模板坐标以登记时的图片尺寸为基准，匹配时按实际尺寸等比缩放。
+注册表保存在 Data/ocr_templates.json，主进程维护，识别时随任务传给工作进程。
+"""
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.schemas.ocr import OCRTemplate
+
+logger = logging.getLogger(__name__)
+
+# ========== 纯函数（工作进程中也会调用） ==========
+def template_scale(template: Dict[str, Any], width: int, height: int) -> Optional[Tuple[float, float]]:
+    """尺寸与宽高比在容差内时返回 (x缩放, y缩放)，否则返回None"""
+    base_w, base_h = template["width"], template["height"]
+    if base_w <= 0 or base_h <= 0 or width <= 0 or height <= 0:
+        return None
+
+    aspect_diff = abs((width / height) / (base_w / base_h) - 1)
+    if aspect_diff > template.get("aspect_tolerance", 0.03):
+        return None
+
+    size_diff = abs(width / base_w - 1)
+    if size_diff > template.get("size_tolerance", 0.25):
+        return None
+    return width / base_w, height / base_h
+
+def scale_box(box: Sequence[int], scale: Tuple[float, float], width: int, height: int, padding: int = 2) -> Tuple[int, int, int, int]:
+    """把模板坐标框缩放到实际图片上，并限制在图片范围内"""
+    sx, sy = scale
+    x1 = max(0, int(box[0] * sx) - padding)
+    y1 = max(0, int(box[1] * sy) - padding)
+    x2 = min(width, int(box[2] * sx) + padding)
+    y2 = min(height, int(box[3] * sy) + padding)
+    return x1, y1, x2, y2
+
+def normalize_anchor_text(text: str) -> str:
+    """锚点文字比较前去掉空白与冒号差异"""
+    return "".join(text.split()).replace("：", ":")
+
+# ========== 注册表（主进程） ==========
+class OCRTemplateRegistry:
+    """模板注册表"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self.version = ""
+        self._load()
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for item in data.get("templates", []):
+                    template = OCRTemplate(**item)
+                    self._templates[template.name] = template.model_dump()
+                logger.info(f"[OCR-TEMPLATE] 加载了 {len(self._templates)} 个版式模板")
+        except Exception as e:
+            logger.error(f"[OCR-TEMPLATE] 加载模板失败: {e}")
+        self._update_version()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"templates": list(self._templates.values())}, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.path)
+        self._update_version()
+
+    def _update_version(self):
+        """模板内容摘要，作为模板识别结果缓存键的一部分"""
+        raw = json.dumps(self._templates, ensure_ascii=False, sort_keys=True)
+        self.version = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._templates.values())
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._templates.get(name)
+
+    def register(self, template: OCRTemplate) -> Dict[str, Any]:
+        """新增或覆盖模板"""
+        with self._lock:
+            self._templates[template.name] = template.model_dump()
+            self._save()
+        logger.info(f"[OCR-TEMPLATE] 已登记模板: {template.name}，字段 {len(template.fields)} 个")
+        return self._templates[template.name]
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            if name not in self._templates:
+                return False
+            del self._templates[name]
+            self._save()
+        logger.info(f"[OCR-TEMPLATE] 已删除模板: {name}")
+        return True
+
+# 全局模板注册表
+template_registry = OCRTemplateRegistry(settings.OCR_TEMPLATE_PATH)
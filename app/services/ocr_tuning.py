@@ -0,0 +1,262 @@
+# app/services/ocr_tuning.py - OCR推理CPU调优
+"""
+在样本图片上实测 每进程线程数 × 工作进程数 × MKL-DNN开关 的组合，
+把吞吐最高的配置写入 Data/ocr_tuning.json，OCR进程池下次启动时读取。
+
+调优应离线运行（停服或低峰期，在部署机器上执行命令行）：
+    python -m app.services.ocr_tuning [--samples WorkCondition1.png] [--rounds 3]
+管理后台 POST /admin/api/ocr-tuning 只在后台任务中启动调优并立即返回，
+进度与结果通过 GET /admin/api/ocr-tuning/status 查询；调优期间候选进程池与线上OCR争用CPU，
+同一时间只允许一个调优任务。
+
+显式配置的 OCR_WORKERS / OCR_CPU_THREADS / OCR_ENABLE_MKLDNN 优先于调优结果；
+CPU核心数或推理后端与调优时不同的配置文件会被忽略。
+"""
+import os
+import json
+import time
+import asyncio
+import difflib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 准确率低于基准配置该比例的组合不参与选择
+MIN_RELATIVE_ACCURACY = 0.98
+
+# ========== 配置读取（主进程启动时） ==========
+def load_tuning_profile() -> Optional[Dict[str, Any]]:
+    """读取调优结果；文件不存在或与当前机器不匹配时返回None"""
+    path = Path(settings.OCR_TUNING_PROFILE_PATH)
+    if not path.exists():
+        return None
+    try:
+        profile = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.warning(f"[OCR-TUNING] 调优配置读取失败: {e}")
+        return None
+
+    if profile.get("cpu_count") != os.cpu_count() or profile.get("backend") != settings.OCR_BACKEND:
+        logger.warning(
+            f"[OCR-TUNING] 调优配置与当前环境不符（核心数 {profile.get('cpu_count')}/{os.cpu_count()}，"
+            f"后端 {profile.get('backend')}/{settings.OCR_BACKEND}），忽略，请重新调优"
+        )
+        return None
+    return profile
+
+def resolve_engine_settings() -> Dict[str, Any]:
+    """合并显式配置、调优结果与默认值：{"workers", "engine_options", "source"}"""
+    profile = load_tuning_profile() or {}
+    best = profile.get("best", {})
+
+    workers = settings.OCR_WORKERS or best.get("workers") or max(1, (os.cpu_count() or 1) // 4)
+    engine_options: Dict[str, Any] = {}
+    threads = settings.OCR_CPU_THREADS or best.get("cpu_threads")
+    if threads:
+        engine_options["cpu_threads"] = threads
+    mkldnn = settings.OCR_ENABLE_MKLDNN if settings.OCR_ENABLE_MKLDNN is not None else best.get("enable_mkldnn")
+    if mkldnn is not None and settings.OCR_BACKEND == "paddle":
+        engine_options["enable_mkldnn"] = mkldnn
+
+    return {
+        "workers": workers,
+        "engine_options": engine_options,
+        "source": "profile" if best else "default"
+    }
+
+# ========== 调优 ==========
+def build_candidates(cpu_count: int, backend: str) -> List[Dict[str, Any]]:
+    """生成候选组合：总线程数不超过核心数"""
+    thread_options = sorted({t for t in (1, 2, 4, 8) if t <= cpu_count} | {min(cpu_count, 16)})
+    worker_options = sorted({w for w in (1, 2, cpu_count // 4, cpu_count // 2) if w >= 1})
+    mkldnn_options = [True, False] if backend == "paddle" else [None]
+
+    candidates = []
+    for workers in worker_options:
+        for threads in thread_options:
+            if workers * threads > cpu_count:
+                continue
+            for mkldnn in mkldnn_options:
+                candidates.append({"workers": workers, "cpu_threads": threads, "enable_mkldnn": mkldnn})
+    return candidates
+
+def load_samples(spec: str) -> List[bytes]:
+    """样本可以是逗号分隔的图片路径或目录"""
+    paths: List[Path] = []
+    for item in spec.split(","):
+        path = Path(item.strip())
+        if path.is_dir():
+            paths.extend(p for p in sorted(path.iterdir()) if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".bmp"))
+        elif path.exists():
+            paths.append(path)
+    if not paths:
+        raise FileNotFoundError(f"未找到调优样本: {spec}")
+    return [p.read_bytes() for p in paths]
+
+async def _measure(candidate: Dict[str, Any], samples: List[bytes], rounds: int) -> Dict[str, Any]:
+    """用候选配置启动独立进程池，测量稳态吞吐与单图延迟"""
+    from app.services.process_pool import BoundedProcessPool
+    from app.services.ocr_pool import _init_ocr_worker, _ocr_worker_extract
+
+    engine_options = {"cpu_threads": candidate["cpu_threads"]}
+    if candidate["enable_mkldnn"] is not None:
+        engine_options["enable_mkldnn"] = candidate["enable_mkldnn"]
+
+    workers = candidate["workers"]
+    jobs = [samples[i % len(samples)] for i in range(max(len(samples), workers) * rounds)]
+    pool = BoundedProcessPool(
+        name=f"OCR调优-{workers}x{candidate['cpu_threads']}",
+        workers=workers,
+        queue_size=len(jobs),
+        initializer=_init_ocr_worker,
+        initargs=(engine_options,)
+    )
+    try:
+        await pool.warm_up(timeout=600)
+        # 每个进程先跑一张，排除首次推理的初始化开销
+        await asyncio.gather(*(pool.run(_ocr_worker_extract, samples[0], ".png") for _ in range(workers)))
+
+        latencies: List[float] = []
+
+        async def timed(content: bytes) -> str:
+            start = time.perf_counter()
+            result = await pool.run(_ocr_worker_extract, content, ".png")
+            latencies.append(time.perf_counter() - start)
+            return result.get("text", "")
+
+        start = time.perf_counter()
+        texts = await asyncio.gather(*(timed(content) for content in jobs))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+    return {
+        **candidate,
+        "images_per_s": round(len(jobs) / elapsed, 3),
+        "mean_latency_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+        "texts": texts[:len(samples)]
+    }
+
+async def run_tuning(samples_spec: Optional[str] = None, rounds: int = 3, save: bool = True) -> Dict[str, Any]:
+    """实测全部候选组合，选出吞吐最高且准确率不下降的配置"""
+    samples = load_samples(samples_spec or settings.OCR_TUNING_SAMPLES)
+    cpu_count = os.cpu_count() or 1
+    candidates = build_candidates(cpu_count, settings.OCR_BACKEND)
+    logger.info(f"[OCR-TUNING] 开始调优: {cpu_count} 核, 后端 {settings.OCR_BACKEND}, 候选 {len(candidates)} 组, 样本 {len(samples)} 张")
+
+    results = []
+    reference: Optional[List[str]] = None
+    for candidate in candidates:
+        try:
+            measured = await _measure(candidate, samples, rounds)
+        except Exception as e:
+            logger.warning(f"[OCR-TUNING] 候选 {candidate} 失败: {e}")
+            results.append({**candidate, "error": str(e)})
+            continue
+
+        texts = measured.pop("texts")
+        if reference is None:
+            reference = texts
+        measured["accuracy"] = round(sum(
+            difflib.SequenceMatcher(None, text, ref).ratio() if (text or ref) else 1.0
+            for text, ref in zip(texts, reference)
+        ) / len(texts), 4)
+        results.append(measured)
+        logger.info(f"[OCR-TUNING] {candidate}: {measured['images_per_s']} 张/秒, 延迟 {measured['mean_latency_ms']}ms, 一致率 {measured['accuracy']:.2%}")
+
+    eligible = [r for r in results if "error" not in r and r["accuracy"] >= MIN_RELATIVE_ACCURACY]
+    if not eligible:
+        raise RuntimeError("没有可用的调优结果")
+    best = max(eligible, key=lambda r: (r["images_per_s"], -r["mean_latency_ms"]))
+
+    profile = {
+        "created_at": datetime.now().isoformat(),
+        "cpu_count": cpu_count,
+        "backend": settings.OCR_BACKEND,
+        "samples": len(samples),
+        "rounds": rounds,
+        "best": {key: best[key] for key in ("workers", "cpu_threads", "enable_mkldnn", "images_per_s", "mean_latency_ms")},
+        "candidates": results
+    }
+    if save:
+        path = Path(settings.OCR_TUNING_PROFILE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(profile, ensure_ascii=False, indent=2), encoding="utf-8")
+        logger.info(f"[OCR-TUNING] 最佳配置已保存到 {path}: {profile['best']}")
+    return profile
+
+# ========== 后台调优任务（管理后台触发） ==========
+class TuningJob:
+    """在事件循环中后台运行调优，请求只负责启动与查询状态"""
+
+    def __init__(self):
+        # 状态: idle / running / done / failed
+        self.state = "idle"
+        self.rounds: Optional[int] = None
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.profile: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, rounds: int = 3) -> bool:
+        """启动后台调优，已有任务在运行时返回False"""
+        if self.running:
+            return False
+        self.state = "running"
+        self.rounds = rounds
+        self.started_at = datetime.now().isoformat()
+        self.finished_at = None
+        self.error = None
+        self._task = asyncio.create_task(self._run(rounds))
+        return True
+
+    async def _run(self, rounds: int):
+        try:
+            self.profile = await run_tuning(rounds=rounds)
+            self.state = "done"
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"[OCR-TUNING] 后台调优失败: {e}")
+        finally:
+            self.finished_at = datetime.now().isoformat()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "rounds": self.rounds,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "best": self.profile["best"] if self.profile else None,
+            "candidates": self.profile["candidates"] if self.profile else None,
+            "error": self.error
+        }
+
+# 全局调优任务实例
+tuning_job = TuningJob()
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    parser = argparse.ArgumentParser(description="OCR推理CPU调优")
+    parser.add_argument("--samples", default=settings.OCR_TUNING_SAMPLES, help="样本图片（逗号分隔）或目录")
+    parser.add_argument("--rounds", type=int, default=3, help="每组配置的测量轮数")
+    parser.add_argument("--dry-run", action="store_true", help="只输出结果，不写入配置文件")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_tuning(args.samples, args.rounds, save=not args.dry_run))
+    print(json.dumps(result["best"], ensure_ascii=False, indent=2))
@@ -0,0 +1,162 @@
+# app/services/process_pool.py - 有界进程池，CPU密集任务不占用事件循环
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class PoolBusyError(RuntimeError):
+    """进程池排队已满"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name}繁忙，请 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+# 工作进程内由 initializer 填写的信息（如预热耗时），随预热探针返回主进程
+_worker_info: Dict[str, Any] = {}
+
+def set_worker_info(**info):
+    """在工作进程的 initializer 中调用，记录该进程的初始化信息"""
+    _worker_info.update(info)
+
+def _worker_ping(hold_seconds: float) -> Tuple[int, Dict[str, Any]]:
+    """预热探针：占用工作进程片刻，返回 (进程号, 初始化信息)"""
+    time.sleep(hold_seconds)
+    return os.getpid(), dict(_worker_info)
+
+class BoundedProcessPool:
+    """
+    带排队上限的进程池。
+
+    每个工作进程通过 initializer 各自加载一次模型；
+    正在执行与排队的任务总数超过 workers + queue_size 时直接拒绝，
+    由调用方转换为带 Retry-After 的 503 响应。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int,
+        queue_size: int,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+        retry_after: int = 2
+    ):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.retry_after = retry_after
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        # 统计信息（仅在事件循环线程中修改，无需加锁）
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_time = 0.0
+        self._warm_workers = 0
+        self._worker_info: Dict[int, Dict[str, Any]] = {}
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    @property
+    def warm_workers(self) -> int:
+        """最近一次预热确认就绪的工作进程数，进程池重建后归零"""
+        return self._warm_workers
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 统一使用spawn，避免fork继承主进程中的线程与推理库状态
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self._initializer,
+                initargs=self._initargs
+            )
+            logger.info(f"[POOL] {self.name} 进程池已创建，工作进程: {self.workers}，排队上限: {self.queue_size}")
+        return self._executor
+
+    def _reset_executor(self):
+        """工作进程异常退出后重建进程池"""
+        executor, self._executor = self._executor, None
+        self._warm_workers = 0
+        self._worker_info = {}
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """在工作进程中执行任务，排队已满时抛出 PoolBusyError"""
+        if self._pending >= self.capacity:
+            self._rejected += 1
+            logger.warning(f"[POOL] {self.name} 排队已满 ({self._pending}/{self.capacity})，拒绝请求")
+            raise PoolBusyError(self.name, self.retry_after)
+
+        self._pending += 1
+        start_time = time.perf_counter()
+        try:
+            future = self._ensure_executor().submit(fn, *args)
+            result = await asyncio.wrap_future(future)
+            self._completed += 1
+            return result
+        except BrokenProcessPool:
+            self._failed += 1
+            logger.error(f"[POOL] {self.name} 工作进程异常退出，重建进程池")
+            self._reset_executor()
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._pending -= 1
+            self._total_time += time.perf_counter() - start_time
+
+    async def warm_up(self, timeout: float = 120.0) -> int:
+        """
+        启动全部工作进程并等待其完成 initializer。
+
+        spawn 模式下进程按需创建，同时提交 workers 个探针即可拉起全部进程；
+        探针会短暂占用进程，迫使后续探针分配给尚未就绪的进程。
+        """
+        executor = self._ensure_executor()
+        deadline = time.monotonic() + timeout
+        while len(self._worker_info) < self.workers and time.monotonic() < deadline:
+            futures = [executor.submit(_worker_ping, 0.2) for _ in range(self.workers)]
+            results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+            self._worker_info.update(results)
+        self._warm_workers = len(self._worker_info)
+        return self._warm_workers
+
+    def get_worker_info(self) -> Dict[int, Dict[str, Any]]:
+        """各工作进程 initializer 记录的信息（进程号 -> 信息）"""
+        return dict(self._worker_info)
+
+    def shutdown(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info(f"[POOL] {self.name} 进程池已关闭")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """进程池运行统计"""
+        finished = self._completed + self._failed
+        return {
+            "workers": self.workers,
+            "warm_workers": self._warm_workers,
+            "queue_size": self.queue_size,
+            "in_flight": self._pending,
+            "queue_depth": max(0, self._pending - self.workers),
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_time": round(self._total_time / finished, 4) if finished else 0.0
+        }
@@ -0,0 +1,47 @@
+# app/services/single_flight.py - 相同请求的在途合并
+"""
+同一内容的请求在第一次处理尚未完成时到达，直接等待同一个任务的结果，
+不再重复推理。与结果缓存互补：缓存只能命中已经完成的结果。
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """按键合并在途任务"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """同一键只执行一次 fn，期间到达的调用共享结果（或异常）"""
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.debug(f"[{self.name}] 合并在途请求: {key[:12]}")
+        else:
+            self.leaders += 1
+            # 独立任务执行：首个调用方断开不会取消其他等待者的结果
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # 所有等待者都已离开时也要取走异常，避免未处理异常告警
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
@@ -1,6 +1,6 @@
 # app/services/usage_tracker.py - 完整修复版本
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from pydantic import BaseModel
 from enum import Enum
 import json
@@ -18,6 +18,9 @@ class ServiceType(str, Enum):
     FACE_REGISTER = "face_register" 
     FACE_VERIFY = "face_verify"
     FACE_DETECT = "face_detect"
+    FACE_IDENTIFY = "face_identify"
+    FACE_REGISTER_BATCH = "face_register_batch"
+    FACE_VERIFY_STREAM = "face_verify_stream"
     AGI_CHAT = "agi_chat"  # 为未来的AGI功能预留
     MCP_TOOL = "mcp_tool"  # 为未来的MCP功能预留
     HOST_DATA = "host_data"  # 上位机数据
@@ -51,6 +54,7 @@ class UsageTracker:
         self.max_records = 10000  # 最大保存记录数
         self._lock = None  # 延迟初始化
         self._initialized = False
+        self.rejections: List[Tuple[datetime, str, str]] = []  # (时间, 服务类型, 原因)，人脸质量拒绝，仅保存在内存
         
         # 确保数据目录存在
         self.data_file.parent.mkdir(exist_ok=True)
@@ -148,6 +152,12 @@ class UsageTracker:
         except Exception as e:
             logger.error(f"记录使用情况失败: {e}")
     
+    def record_rejection(self, service_type: str, reason: str):
+        """记录一次人脸质量拒绝（按原因计数）"""
+        self.rejections.append((datetime.now(), str(service_type), reason))
+        if len(self.rejections) > self.max_records:
+            self.rejections = self.rejections[-self.max_records:]
+
     async def get_records(
         self, 
         service_type: Optional[str] = None,
@@ -227,6 +237,12 @@ class UsageTracker:
                     by_hour[hour_key] = 0
                 by_hour[hour_key] += 1
             
+            # 人脸质量拒绝按原因统计
+            rejections = {}
+            for timestamp, _, reason in self.rejections:
+                if timestamp >= start_time:
+                    rejections[reason] = rejections.get(reason, 0) + 1
+            
             # 平均处理时间和文件大小
             avg_processing_time = 0.0
             total_file_size = 0
@@ -242,7 +258,8 @@ class UsageTracker:
                 "by_service": by_service,
                 "by_hour": by_hour,
                 "avg_processing_time": avg_processing_time,
-                "total_file_size": total_file_size
+                "total_file_size": total_file_size,
+                "face_quality_rejections": rejections
             }
             
             logger.debug(f"生成统计数据: 总请求{total_requests}, 成功{success_requests}, 失败{failed_requests}")
@@ -257,7 +274,8 @@ class UsageTracker:
                 "by_service": {},
                 "by_hour": {},
                 "avg_processing_time": 0.0,
-                "total_file_size": 0
+                "total_file_size": 0,
+                "face_quality_rejections": {}
             }
     
     async def create_record(
@@ -8,7 +8,7 @@ import json
 import logging
 import asyncio
 import httpx
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Union, Callable, Awaitable
 from datetime import datetime
 from pydantic import BaseModel, Field
 from enum import Enum
@@ -18,8 +18,13 @@ from langchain.chains import TransformChain, SequentialChain
 from langchain.schema import BaseMessage, HumanMessage, SystemMessage
 from langchain.callbacks.base import BaseCallbackHandler
 
+from app.services.ocr_fields import trusted_parameters, TRUST_THRESHOLD
+
 logger = logging.getLogger(__name__)
 
+# 阶段进度回调：(阶段名, 阶段结果) -> 协程
+ProgressCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
 class TestType(Enum):
     """测试类型枚举"""
     ENDURANCE = "耐久测试"
@@ -782,8 +787,17 @@ class WorkloadRecognitionService:
             self.processing_chain = self._build_processing_chain()
             raise RuntimeError(f"LLM切换失败: {str(e)}")
     
-    async def recognize_from_text(self, input_text: str, language: str = "zh") -> WorkloadResult:
-        """从文本识别工况 - 使用LangChain多阶段处理"""
+    async def recognize_from_text(
+        self,
+        input_text: str,
+        language: str = "zh",
+        progress_callback: Optional[ProgressCallback] = None,
+        known_params: Optional[Dict[str, Any]] = None
+    ) -> WorkloadResult:
+        """
+        从文本识别工况 - 使用LangChain多阶段处理，progress_callback 在每个阶段完成后调用。
+        known_params 已给出（OCR结构化结果可信）时跳过LLM参数提取。
+        """
         logger.info(f"开始工况识别，输入长度: {len(input_text)}, LLM: {self.preferred_llm.value}")
         start_time = datetime.now()
         
@@ -798,29 +812,37 @@ class WorkloadRecognitionService:
                 test_type_response = await self.llm.ainvoke([HumanMessage(content=test_type_prompt)])
                 test_type = self._parse_test_type(test_type_response)
                 logger.info(f"✅ 测试类型: {test_type}")
+                await self._report_progress(progress_callback, "test_type", {"test_type": test_type})
                 
                 # 第二步：提取基础参数
-                params_prompt = self._build_params_extraction_prompt(input_text)
-                params_response = await self.llm.ainvoke([HumanMessage(content=params_prompt)])
-                extracted_params = self._parse_json_response(params_response)
-                logger.info(f"✅ 提取参数: {len(extracted_params)} 个")
+                if known_params:
+                    extracted_params = dict(known_params)
+                    logger.info(f"✅ 使用OCR结构化参数: {len(extracted_params)} 个，跳过LLM参数提取")
+                else:
+                    params_prompt = self._build_params_extraction_prompt(input_text)
+                    params_response = await self.llm.ainvoke([HumanMessage(content=params_prompt)])
+                    extracted_params = self._parse_json_response(params_response)
+                    logger.info(f"✅ 提取参数: {len(extracted_params)} 个")
+                await self._report_progress(progress_callback, "parameters", {"parameters": extracted_params})
                 
                 # 第三步：分解阶段
                 phases_prompt = self._build_phases_analysis_prompt(input_text, test_type)
                 phases_response = await self.llm.ainvoke([HumanMessage(content=phases_prompt)])
                 phases_data = self._parse_json_response(phases_response)
                 logger.info(f"✅ 分解阶段: {len(phases_data.get('phases', {}))} 个")
+                await self._report_progress(progress_callback, "phases", {"phases": phases_data.get("phases", {})})
                 
                 # 第四步：构建流程
                 flow_prompt = self._build_flow_construction_prompt(input_text, json.dumps(phases_data, ensure_ascii=False))
                 flow_response = await self.llm.ainvoke([HumanMessage(content=flow_prompt)])
                 flow_data = self._parse_json_response(flow_response)
                 logger.info(f"✅ 构建流程完成")
+                await self._report_progress(progress_callback, "flow", {"flow": flow_data.get("flow", flow_data)})
                 
             else:
                 logger.warning("⚠️ LangChain处理链或LLM不可用，使用默认处理")
                 test_type = "耐久测试"
-                extracted_params = {}
+                extracted_params = dict(known_params or {})
                 phases_data = {"phases": {"1": self._get_default_phase()}}
                 flow_data = {"flow": {"type": "phase", "phase_id": "1"}}
             
@@ -844,7 +866,8 @@ class WorkloadRecognitionService:
                     "llm_used": self.preferred_llm.value,
                     "processing_time": processing_time,
                     "language": language,
-                    "langchain_used": bool(self.processing_chain and self.llm)
+                    "langchain_used": bool(self.processing_chain and self.llm),
+                    "params_from_ocr": bool(known_params)
                 }
             )
             
@@ -872,15 +895,32 @@ class WorkloadRecognitionService:
             "temp_duration": 3600
         }
     
-    async def recognize_from_ocr(self, ocr_params: Dict[str, str], language: str = "zh") -> WorkloadResult:
-        """从OCR结果识别工况"""
+    async def recognize_from_ocr(
+        self,
+        ocr_params: Dict[str, str],
+        language: str = "zh",
+        progress_callback: Optional[ProgressCallback] = None,
+        param_confidence: Optional[Dict[str, float]] = None
+    ) -> WorkloadResult:
+        """从OCR结果识别工况；工况参数的置信度全部达到阈值时直接采用OCR参数"""
         logger.info(f"从OCR结果识别工况，参数: {len(ocr_params)} 个")
         
         # 将OCR参数转换为文本描述
         text_description = self._ocr_params_to_text(ocr_params)
         logger.info(f"转换为文本描述: {text_description[:200]}...")
         
-        return await self.recognize_from_text(text_description, language)
+        threshold = self.config.get('features', {}).get('ocr_param_confidence', TRUST_THRESHOLD)
+        known_params = trusted_parameters(ocr_params, param_confidence, threshold)
+        return await self.recognize_from_text(text_description, language, progress_callback, known_params)
+    
+    async def _report_progress(self, callback: Optional[ProgressCallback], stage: str, data: Dict[str, Any]):
+        """通知阶段进度；回调异常不影响识别流程"""
+        if callback is None:
+            return
+        try:
+            await callback(stage, data)
+        except Exception as e:
+            logger.warning(f"⚠️ 进度回调失败({stage}): {e}")
     
     def _parse_test_type(self, response: str) -> str:
         """解析测试类型"""
@@ -1128,6 +1168,26 @@ class WorkloadRecognitionService:
             # 回退到默认序列化
             return node.dict()
     
+    def parse_ocr_text(self, ocr_text: str) -> Dict[str, str]:
+        """把OCR输出（分号分隔的文字行）整理为 参数名->值，标签与数值分行时合并"""
+        params: Dict[str, str] = {}
+        pending_key = None
+        for line in ocr_text.replace(";", "；").split("；"):
+            line = line.strip()
+            if not line:
+                continue
+            key, sep, value = line.replace("：", ":").partition(":")
+            if sep and key.strip():
+                key, value = key.strip(), value.strip()
+                params[key] = value
+                pending_key = key if not value else None
+            elif pending_key:
+                params[pending_key] = line
+                pending_key = None
+            else:
+                params[f"文本{len(params) + 1}"] = line
+        return params
+    
     def _ocr_params_to_text(self, ocr_params: Dict[str, str]) -> str:
         """将OCR参数转换为文本描述"""
         lines = []
@@ -0,0 +1,91 @@
+# app/utils/face_codec.py - 人脸编码的统一序列化格式
+"""
+二进制格式：1字节头 + 128个小端浮点数
+    头字节高4位为格式版本，低4位为数据类型（1=float16, 2=float32）
+    float16: 257 字节（base64 后 344 字符），float32: 513 字节（684 字符）
+解码直接 np.frombuffer，不复制数据。
+
+兼容旧格式（自动识别）：
+    base64 的 float64 原始字节（1024 字节，路由旧版注册接口返回）
+    JSON 浮点数列表（face_utils 旧版）
+"""
+import json
+import base64
+import binascii
+from typing import Optional, Union
+
+import numpy as np
+
+CODEC_VERSION = 1
+ENCODING_DIM = 128
+
+# 数据类型编码 <-> numpy 类型
+DTYPE_CODES = {1: np.dtype("<f2"), 2: np.dtype("<f4")}
+DTYPE_NAMES = {"float16": 1, "float32": 2}
+
+LEGACY_FLOAT64_BYTES = ENCODING_DIM * 8
+
+class FaceCodecError(ValueError):
+    """无法识别的人脸编码"""
+
+def encode_encoding(encoding: np.ndarray, dtype: str = "float16") -> bytes:
+    """编码为带版本头的二进制"""
+    if dtype not in DTYPE_NAMES:
+        raise FaceCodecError(f"不支持的存储类型: {dtype}")
+    code = DTYPE_NAMES[dtype]
+    values = np.asarray(encoding, dtype=DTYPE_CODES[code]).reshape(-1)
+    if values.size != ENCODING_DIM:
+        raise FaceCodecError(f"人脸编码维度应为 {ENCODING_DIM}，实际 {values.size}")
+    return bytes([(CODEC_VERSION << 4) | code]) + values.tobytes()
+
+def decode_encoding(data: Union[bytes, bytearray, memoryview]) -> np.ndarray:
+    """
+    二进制 -> 只读数组（存储时的数据类型，零拷贝）。
+    长度为1024字节时按旧版 float64 原始字节解析。
+    """
+    if len(data) == LEGACY_FLOAT64_BYTES:
+        return np.frombuffer(data, dtype="<f8")
+    if not data:
+        raise FaceCodecError("人脸编码为空")
+
+    header = data[0]
+    version, code = header >> 4, header & 0x0F
+    if version != CODEC_VERSION or code not in DTYPE_CODES:
+        raise FaceCodecError(f"未知的人脸编码格式: 版本 {version}, 类型 {code}")
+    dtype = DTYPE_CODES[code]
+    if len(data) != 1 + ENCODING_DIM * dtype.itemsize:
+        raise FaceCodecError(f"人脸编码长度不正确: {len(data)} 字节")
+    return np.frombuffer(data, dtype=dtype, offset=1)
+
+def encoding_to_str(encoding: np.ndarray, dtype: Optional[str] = None) -> str:
+    """编码为base64字符串（接口传输、客户端保存）；dtype默认取 FACE_ENCODING_DTYPE"""
+    if dtype is None:
+        from app.core.config import settings
+        dtype = settings.FACE_ENCODING_DTYPE
+    return base64.b64encode(encode_encoding(encoding, dtype)).decode("ascii")
+
+def encoding_from_str(text: str) -> np.ndarray:
+    """base64字符串或旧版JSON列表 -> 数组"""
+    text = text.strip()
+    if text.startswith("["):
+        try:
+            values = np.asarray(json.loads(text), dtype=np.float64)
+        except (ValueError, TypeError) as e:
+            raise FaceCodecError(f"无效的人脸编码JSON: {e}")
+        if values.shape != (ENCODING_DIM,):
+            raise FaceCodecError(f"人脸编码维度应为 {ENCODING_DIM}，实际 {values.size}")
+        return values
+
+    try:
+        data = base64.b64decode(text, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise FaceCodecError(f"无效的人脸编码base64: {e}")
+    return decode_encoding(data)
+
+def to_array(value: Union[np.ndarray, bytes, bytearray, str], dtype=np.float32) -> np.ndarray:
+    """数组、二进制或字符串格式的编码统一转换为指定类型的一维数组"""
+    if isinstance(value, str):
+        value = encoding_from_str(value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        value = decode_encoding(value)
+    return np.asarray(value, dtype=dtype).reshape(-1)
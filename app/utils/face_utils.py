@@ -4,8 +4,8 @@ import cv2
 import base64
 from io import BytesIO
 from PIL import Image
-import json
 import logging
+from app.utils.face_codec import encoding_to_str, encoding_from_str
 
 logger = logging.getLogger(__name__)
 
@@ -57,11 +57,8 @@ class FaceRecognitionService:
             if not face_encodings:
                 raise ValueError("无法提取人脸特征")
             
-            # 将numpy数组转换为列表，然后转为JSON字符串
-            encoding_list = face_encodings[0].tolist()
-            encoding_str = json.dumps(encoding_list)
-            
-            return encoding_str
+            # 统一的带版本头二进制格式（base64）
+            return encoding_to_str(face_encodings[0])
         except Exception as e:
             logger.error(f"人脸编码失败: {e}")
             raise
@@ -81,9 +78,8 @@ class FaceRecognitionService:
             if not face_encodings:
                 return False, 0.0
             
-            # 解析存储的编码
-            stored_encoding_list = json.loads(stored_encoding_str)
-            stored_encoding = np.array(stored_encoding_list)
+            # 解析存储的编码（兼容旧版JSON列表）
+            stored_encoding = encoding_from_str(stored_encoding_str)
             
             # 计算人脸距离
             face_distances = face_recognition.face_distance([stored_encoding], face_encodings[0])
@@ -0,0 +1,128 @@
+# app/utils/upload.py - 上传文件读取（分块、限大小、按文件头识别格式）
+"""
+OCR与人脸接口共用的上传读取层。
+
+- 分块读取，累计超过接口上限立即返回413，不再继续读取；
+- 按文件头魔数判断格式，不信任扩展名和Content-Type；
+- 只保留一份缓冲区，后续直接交给 np.frombuffer / 进程池，不再复制；
+- 需要在流式响应中按需读取的文件先 detach_upload 接管，只校验大小与格式、不读入内存（inspect_upload）。
+"""
+import io
+import logging
+from typing import Iterable, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# 格式 -> 临时文件后缀（兜底识别路径使用）
+FORMAT_SUFFIXES = {
+    "png": ".png",
+    "jpeg": ".jpg",
+    "bmp": ".bmp",
+    "tiff": ".tif",
+    "webp": ".webp",
+    "gif": ".gif",
+    "pdf": ".pdf",
+    "zip": ".zip",
+}
+
+IMAGE_FORMATS = frozenset({"png", "jpeg", "bmp"})
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """根据文件头魔数判断格式，无法识别返回None"""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"BM"):
+        return "bmp"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "zip"
+    return None
+
+async def read_upload(
+    file: UploadFile,
+    max_mb: float,
+    allowed_formats: Optional[Iterable[str]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> Tuple[bytearray, Optional[str]]:
+    """
+    分块读取上传文件，返回 (内容缓冲区, 识别出的格式)。
+    超过 max_mb 返回413；指定 allowed_formats 时格式不符返回400。
+    """
+    max_bytes = int(max_mb * 1024 * 1024)
+    filename = file.filename or "upload"
+
+    # 多部分解析阶段已得知大小时，不读取直接拒绝
+    if file.size is not None and file.size > max_bytes:
+        logger.warning(f"[UPLOAD] {filename} 超过大小上限: {file.size} > {max_bytes}")
+        raise HTTPException(413, f"文件过大，上限 {max_mb:g}MB")
+
+    buffer = bytearray()
+    fmt = None
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        if len(buffer) + len(chunk) > max_bytes:
+            logger.warning(f"[UPLOAD] {filename} 超过大小上限: >{max_bytes}")
+            raise HTTPException(413, f"文件过大，上限 {max_mb:g}MB")
+        if not buffer:
+            fmt = sniff_format(chunk[:16])
+            if allowed_formats is not None and fmt not in allowed_formats:
+                logger.warning(f"[UPLOAD] {filename} 格式不支持: {fmt or '未知'}")
+                raise HTTPException(400, f"不支持的文件格式: {fmt or '未知'}")
+        buffer += chunk
+        del chunk
+
+    if not buffer:
+        raise HTTPException(400, "上传文件为空")
+    return buffer, fmt
+
+async def inspect_upload(
+    file: UploadFile,
+    max_mb: float,
+    allowed_formats: Optional[Iterable[str]] = None
+) -> Optional[str]:
+    """只校验大小（超过返回413）与文件头格式（不符返回400），不读入内容，读取位置复位到开头"""
+    max_bytes = int(max_mb * 1024 * 1024)
+    filename = file.filename or "upload"
+
+    size = file.size
+    if size is None:
+        file.file.seek(0, io.SEEK_END)
+        size = file.file.tell()
+    if size > max_bytes:
+        logger.warning(f"[UPLOAD] {filename} 超过大小上限: {size} > {max_bytes}")
+        raise HTTPException(413, f"文件过大，上限 {max_mb:g}MB")
+
+    await file.seek(0)
+    head = await file.read(16)
+    await file.seek(0)
+    if not head:
+        raise HTTPException(400, "上传文件为空")
+    fmt = sniff_format(head)
+    if allowed_formats is not None and fmt not in allowed_formats:
+        logger.warning(f"[UPLOAD] {filename} 格式不支持: {fmt or '未知'}")
+        raise HTTPException(400, f"不支持的文件格式: {fmt or '未知'}")
+    return fmt
+
+def detach_upload(file: UploadFile) -> UploadFile:
+    """
+    接管上传文件的底层文件对象，返回由调用方负责关闭的新 UploadFile。
+    FastAPI 在端点返回后、流式响应发送前就关闭表单文件，流式响应中仍要读取的文件需先接管。
+    """
+    detached = UploadFile(file.file, size=file.size, filename=file.filename, headers=file.headers)
+    file.file = io.BytesIO()
+    return detached
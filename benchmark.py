@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# benchmark.py - TianMu性能基准测试工具
+"""
+在同一批样本图片上比较不同配置的耗时与识别准确率。
+
+用法:
+    python benchmark.py ocr-preprocess --images 样本目录 [--repeat 3] [--json 结果.json]
+    python benchmark.py ocr-backends --images 样本目录 [--backends paddle,onnx,onnx-int8] [--repeat 3]
+    python benchmark.py face-cascade --images 人脸样本目录 [--scales 1,2,4] [--min-face 80] [--repeat 3]
+
+样本目录中的图片可附带同名 .txt 文件作为标注文本；
+没有标注时以第一种配置（原图）的识别结果作为参考。
+"""
+import sys
+import json
+import time
+import argparse
+import difflib
+import statistics
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".bmp"}
+
+Sample = Tuple[Path, bytes, Optional[str]]
+
+# ========== 通用工具 ==========
+def load_image_set(directory: str) -> List[Sample]:
+    """读取样本目录：(路径, 图片字节, 标注文本或None)"""
+    root = Path(directory)
+    if not root.is_dir():
+        print(f"❌ 样本目录不存在: {root}")
+        sys.exit(1)
+
+    samples = []
+    for path in sorted(root.iterdir()):
+        if path.suffix.lower() not in IMAGE_EXTS:
+            continue
+        truth_file = path.with_suffix(".txt")
+        truth = truth_file.read_text(encoding="utf-8").strip() if truth_file.exists() else None
+        samples.append((path, path.read_bytes(), truth))
+
+    if not samples:
+        print(f"❌ 样本目录中没有图片: {root}")
+        sys.exit(1)
+    return samples
+
+def text_similarity(text: str, reference: str) -> float:
+    """字符级相似度（0~1）"""
+    if not text and not reference:
+        return 1.0
+    return difflib.SequenceMatcher(None, text, reference).ratio()
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    p95_index = min(len(ordered) - 1, int(len(ordered) * 0.95))
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 1),
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[p95_index] * 1000, 1)
+    }
+
+def current_rss_mb() -> float:
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / 1024 ** 2, 1)
+    except ImportError:
+        return 0.0
+
+def print_table(rows: List[Dict[str, Any]], columns: List[Tuple[str, str]]):
+    """按列打印结果表"""
+    widths = [max(len(title), *(len(str(row.get(key, ""))) for row in rows)) for key, title in columns]
+    print("  ".join(title.ljust(width) for (_, title), width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(key, "")).ljust(width) for (key, _), width in zip(columns, widths)))
+
+def write_json(path: Optional[str], payload: Any):
+    if path:
+        Path(path).write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n📄 结果已保存: {path}")
+
+# ========== OCR预处理基准 ==========
+PREPROCESS_PROFILES = [
+    ("原图", {}),
+    ("长边3200", {"max_long_edge": 3200}),
+    ("长边2560", {"max_long_edge": 2560}),
+    ("长边1920", {"max_long_edge": 1920}),
+    ("长边1280", {"max_long_edge": 1280}),
+    ("长边1920+灰度", {"max_long_edge": 1920, "grayscale": True}),
+    ("长边1920+裁边", {"max_long_edge": 1920, "crop_borders": True}),
+]
+
+def bench_ocr_preprocess(args):
+    """比较各预处理配置的识别耗时与准确率"""
+    from app.services.ocr_service import get_ocr_engine, decode_image_bytes, _recognize
+    from app.services.ocr_preprocess import preprocess_image
+
+    samples = load_image_set(args.images)
+    print(f"🔧 加载OCR引擎（不计入耗时）...")
+    get_ocr_engine()
+    print(f"📊 样本数: {len(samples)}，每张重复 {args.repeat} 次\n")
+
+    references: Dict[str, str] = {}
+    rows = []
+    for name, options in PREPROCESS_PROFILES:
+        latencies = []
+        scores = []
+        peak_rss = 0.0
+        for path, content, truth in samples:
+            image = decode_image_bytes(content)
+            text = ""
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                processed, _ = preprocess_image(image, **options)
+                text = _recognize(processed)
+                latencies.append(time.perf_counter() - start)
+                peak_rss = max(peak_rss, current_rss_mb())
+            reference = truth if truth is not None else references.setdefault(path.name, text)
+            scores.append(text_similarity(text, reference))
+
+        row = {"profile": name, **summarize_latencies(latencies),
+               "accuracy": round(statistics.mean(scores), 4), "rss_mb": peak_rss}
+        rows.append(row)
+        print(f"  ✅ {name}: 平均 {row['mean_ms']}ms, 准确率 {row['accuracy']:.2%}")
+
+    print()
+    print_table(rows, [("profile", "配置"), ("mean_ms", "平均ms"), ("p50_ms", "P50ms"),
+                       ("p95_ms", "P95ms"), ("accuracy", "准确率"), ("rss_mb", "RSS(MB)")])
+    write_json(args.json, rows)
+
+# ========== OCR推理后端基准 ==========
+def bench_ocr_backends(args):
+    """比较各推理后端的延迟、吞吐、内存与准确率（预处理与线上配置一致）"""
+    from app.services.ocr_engines import create_ocr_engine
+    from app.services.ocr_service import decode_image_bytes, preprocess_for_ocr, _extract_from_predict_result
+
+    samples = load_image_set(args.images)
+    images = [(path, preprocess_for_ocr(decode_image_bytes(content), content)[0], truth)
+              for path, content, truth in samples]
+    print(f"📊 样本数: {len(images)}，每张重复 {args.repeat} 次\n")
+
+    references: Dict[str, str] = {}
+    rows = []
+    for backend in [name.strip() for name in args.backends.split(",") if name.strip()]:
+        rss_before = current_rss_mb()
+        try:
+            load_start = time.perf_counter()
+            engine = create_ocr_engine(backend)
+            load_seconds = round(time.perf_counter() - load_start, 2)
+        except Exception as e:
+            print(f"  ❌ {backend}: 引擎加载失败: {e}")
+            continue
+
+        # 首张图片预跑一次，排除首次推理的初始化开销
+        engine.predict(input=images[0][1])
+
+        latencies = []
+        scores = []
+        peak_rss = current_rss_mb()
+        total_start = time.perf_counter()
+        for path, image, truth in images:
+            text = ""
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                text = "；".join(_extract_from_predict_result(engine.predict(input=image)))
+                latencies.append(time.perf_counter() - start)
+                peak_rss = max(peak_rss, current_rss_mb())
+            reference = truth if truth is not None else references.setdefault(path.name, text)
+            scores.append(text_similarity(text, reference))
+        total_seconds = time.perf_counter() - total_start
+
+        row = {"backend": backend, "load_s": load_seconds, **summarize_latencies(latencies),
+               "images_per_s": round(len(latencies) / total_seconds, 2),
+               "accuracy": round(statistics.mean(scores), 4),
+               "rss_mb": peak_rss, "rss_delta_mb": round(peak_rss - rss_before, 1)}
+        rows.append(row)
+        print(f"  ✅ {backend}: 平均 {row['mean_ms']}ms, {row['images_per_s']} 张/秒, 准确率 {row['accuracy']:.2%}")
+        del engine
+
+    print()
+    print_table(rows, [("backend", "后端"), ("load_s", "加载s"), ("mean_ms", "平均ms"), ("p95_ms", "P95ms"),
+                       ("images_per_s", "张/秒"), ("accuracy", "准确率"), ("rss_mb", "RSS(MB)"),
+                       ("rss_delta_mb", "RSS增量")])
+    write_json(args.json, rows)
+
+# ========== 人脸级联检测基准 ==========
+def baseline_face_analysis(content: bytes):
+    """改造前的检测方式：原图解码、face_locations 默认参数（上采样1次）、不过滤小人脸"""
+    import cv2
+    import numpy as np
+    import face_recognition
+
+    image = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return {"locations": [], "encoding": None}
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    locations = face_recognition.face_locations(image)
+    encoding = None
+    if len(locations) == 1:
+        encodings = face_recognition.face_encodings(image, locations)
+        encoding = encodings[0] if encodings else None
+    return {"locations": locations, "encoding": encoding}
+
+def bench_face_cascade(args):
+    """
+    以改造前的检测方式为参考，比较各缩小倍数下 analyze_face 的耗时与匹配一致性。
+    scale=1 行仍按 --min-face 选择上采样并过滤小人脸，与改造前的方式不同。
+    """
+    import numpy as np
+    from app.services.face_worker import init_face_worker, analyze_face
+
+    samples = load_image_set(args.images)
+    scales = [int(scale) for scale in args.scales.split(",") if scale.strip()]
+    init_face_worker()
+    print(f"📊 样本数: {len(samples)}，每张重复 {args.repeat} 次\n")
+
+    def run_config(label, analyze, references=None):
+        latencies = []
+        results = {}
+        for path, content, _ in samples:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results[path.name] = analyze(content)
+                latencies.append(time.perf_counter() - start)
+        row = {"config": label, **summarize_latencies(latencies)}
+        if references is None:
+            return row, results
+
+        same_count = 0
+        matched = 0
+        distances = []
+        for name, reference in references.items():
+            result = results[name]
+            same_count += len(result["locations"]) == len(reference["locations"])
+            if reference["encoding"] is not None and result["encoding"] is not None:
+                distance = float(np.linalg.norm(reference["encoding"] - result["encoding"]))
+                distances.append(distance)
+                matched += distance < args.threshold
+        with_face = sum(1 for ref in references.values() if ref["encoding"] is not None)
+        row.update({
+            "same_faces": round(same_count / len(samples), 4),
+            "match_rate": round(matched / with_face, 4) if with_face else 0.0,
+            "mean_distance": round(statistics.mean(distances), 4) if distances else 0.0
+        })
+        return row, results
+
+    # 参考：直接调用 face_recognition（改造前的方式）
+    baseline_row, references = run_config("baseline", baseline_face_analysis)
+    baseline_row.update({"same_faces": 1.0, "match_rate": 1.0, "mean_distance": 0.0})
+    rows = [baseline_row]
+    print(f"  ✅ 改造前原图检测: 平均 {baseline_row['mean_ms']}ms")
+
+    for scale in scales:
+        row, _ = run_config(
+            f"scale={scale}, min_face={args.min_face}",
+            lambda content: analyze_face(content, True, scale, args.min_face),
+            references
+        )
+        rows.append(row)
+        print(f"  ✅ 缩小{scale}倍: 平均 {row['mean_ms']}ms, 人脸数一致 {row['same_faces']:.2%}, "
+              f"编码匹配 {row['match_rate']:.2%}")
+
+    print()
+    print_table(rows, [("config", "配置"), ("mean_ms", "平均ms"), ("p50_ms", "P50ms"), ("p95_ms", "P95ms"),
+                       ("same_faces", "人脸数一致"), ("match_rate", "编码匹配"), ("mean_distance", "平均编码距离")])
+    write_json(args.json, rows)
+
+# ========== 命令行入口 ==========
+def main():
+    parser = argparse.ArgumentParser(description="TianMu性能基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ocr_preprocess = subparsers.add_parser("ocr-preprocess", help="OCR预处理配置的耗时/准确率对比")
+    ocr_preprocess.add_argument("--images", required=True, help="样本图片目录")
+    ocr_preprocess.add_argument("--repeat", type=int, default=3, help="每张图片重复次数")
+    ocr_preprocess.add_argument("--json", help="结果另存为JSON")
+    ocr_preprocess.set_defaults(handler=bench_ocr_preprocess)
+
+    ocr_backends = subparsers.add_parser("ocr-backends", help="OCR推理后端的延迟/吞吐/内存/准确率对比")
+    ocr_backends.add_argument("--images", required=True, help="样本图片目录")
+    ocr_backends.add_argument("--backends", default="paddle,onnx,onnx-int8", help="逗号分隔的后端列表")
+    ocr_backends.add_argument("--repeat", type=int, default=3, help="每张图片重复次数")
+    ocr_backends.add_argument("--json", help="结果另存为JSON")
+    ocr_backends.set_defaults(handler=bench_ocr_backends)
+
+    face_cascade = subparsers.add_parser("face-cascade", help="人脸原图检测与级联检测的耗时/准确率对比")
+    face_cascade.add_argument("--images", required=True, help="人脸样本图片目录")
+    face_cascade.add_argument("--scales", default="1,2,4", help="逗号分隔的缩小倍数（1为不缩小解码，仍按 --min-face 过滤）")
+    face_cascade.add_argument("--min-face", type=int, default=80, help="最小人脸边长（原图像素）")
+    face_cascade.add_argument("--threshold", type=float, default=0.6, help="编码距离低于该值视为匹配")
+    face_cascade.add_argument("--repeat", type=int, default=3, help="每张图片重复次数")
+    face_cascade.add_argument("--json", help="结果另存为JSON")
+    face_cascade.set_defaults(handler=bench_face_cascade)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
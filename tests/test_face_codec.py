@@ -0,0 +1,103 @@
+# tests/test_face_codec.py - 人脸编码序列化格式
+import json
+import base64
+
+import numpy as np
+import pytest
+
+from app.utils.face_codec import (
+    CODEC_VERSION,
+    ENCODING_DIM,
+    FaceCodecError,
+    decode_encoding,
+    encode_encoding,
+    encoding_from_str,
+    encoding_to_str,
+    to_array,
+)
+
+@pytest.fixture
+def encoding():
+    rng = np.random.default_rng(7)
+    return rng.uniform(-0.3, 0.3, ENCODING_DIM)
+
+@pytest.mark.parametrize("dtype, size, tolerance", [("float16", 257, 1e-3), ("float32", 513, 1e-7)])
+def test_binary_round_trip(encoding, dtype, size, tolerance):
+    data = encode_encoding(encoding, dtype)
+    assert len(data) == size
+    assert data[0] >> 4 == CODEC_VERSION
+
+    decoded = decode_encoding(data)
+    assert decoded.dtype == np.dtype(dtype)
+    assert decoded.shape == (ENCODING_DIM,)
+    np.testing.assert_allclose(decoded, encoding, atol=tolerance)
+
+@pytest.mark.parametrize("dtype, length", [("float16", 344), ("float32", 684)])
+def test_string_round_trip(encoding, dtype, length):
+    text = encoding_to_str(encoding, dtype)
+    assert len(text) == length
+    np.testing.assert_allclose(encoding_from_str(text), encoding, atol=1e-3)
+
+def test_decoded_array_is_zero_copy_view(encoding):
+    data = encode_encoding(encoding, "float32")
+    decoded = decode_encoding(data)
+    assert not decoded.flags.writeable
+
+def test_legacy_float64_base64(encoding):
+    legacy = base64.b64encode(encoding.astype(np.float64).tobytes()).decode("ascii")
+    decoded = encoding_from_str(legacy)
+    assert decoded.dtype == np.float64
+    np.testing.assert_array_equal(decoded, encoding)
+
+def test_legacy_json_list(encoding):
+    decoded = encoding_from_str(" " + json.dumps(encoding.tolist()) + "\n")
+    assert decoded.dtype == np.float64
+    np.testing.assert_array_equal(decoded, encoding)
+
+@pytest.mark.parametrize("value_type", ["array", "bytes", "str"])
+def test_to_array_accepts_all_forms(encoding, value_type):
+    value = {
+        "array": encoding,
+        "bytes": encode_encoding(encoding, "float32"),
+        "str": encoding_to_str(encoding, "float16"),
+    }[value_type]
+    result = to_array(value)
+    assert result.dtype == np.float32
+    assert result.shape == (ENCODING_DIM,)
+    np.testing.assert_allclose(result, encoding, atol=1e-3)
+
+def test_unknown_version_is_rejected(encoding):
+    data = bytearray(encode_encoding(encoding, "float16"))
+    data[0] = ((CODEC_VERSION + 1) << 4) | (data[0] & 0x0F)
+    with pytest.raises(FaceCodecError, match="未知的人脸编码格式"):
+        decode_encoding(bytes(data))
+
+def test_unknown_dtype_code_is_rejected(encoding):
+    data = bytearray(encode_encoding(encoding, "float16"))
+    data[0] = (CODEC_VERSION << 4) | 0x0F
+    with pytest.raises(FaceCodecError, match="未知的人脸编码格式"):
+        decode_encoding(bytes(data))
+
+def test_length_mismatch_is_rejected(encoding):
+    data = encode_encoding(encoding, "float32")
+    with pytest.raises(FaceCodecError, match="长度不正确"):
+        decode_encoding(data[:-4])
+
+@pytest.mark.parametrize("text, message", [
+    ("", "为空"),
+    ("not base64!", "base64"),
+    ("[1, 2,", "JSON"),
+    ("[1, 2, 3]", "维度"),
+])
+def test_invalid_strings(text, message):
+    with pytest.raises(FaceCodecError, match=message):
+        encoding_from_str(text)
+
+def test_encode_rejects_bad_input(encoding):
+    with pytest.raises(FaceCodecError, match="维度"):
+        encode_encoding(encoding[:64])
+    with pytest.raises(FaceCodecError, match="不支持的存储类型"):
+        encode_encoding(encoding, "float64")
+
+def test_codec_error_is_value_error():
+    assert issubclass(FaceCodecError, ValueError)
@@ -0,0 +1,123 @@
+# tests/test_face_gallery.py - 多模板人脸库与距离汇总
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.face_gallery import FaceGallery, aggregate_distances
+
+def vector(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).normal(0, 0.1, 128).astype(np.float32)
+
+@pytest.fixture
+def gallery(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FACE_MAX_TEMPLATES", 3)
+    monkeypatch.setattr(settings, "FACE_TEMPLATE_EVICTION", "oldest")
+    return FaceGallery(str(tmp_path / "gallery"))
+
+@pytest.mark.parametrize("method, k, expected", [
+    ("min", 2, 0.2),
+    ("mean", 2, 0.45),
+    ("topk", 2, 0.25),
+    ("topk", 10, 0.45),
+    ("topk", 0, 0.2),
+    ("unknown", 2, 0.2),
+])
+def test_aggregate_distances(method, k, expected):
+    distances = np.array([0.5, 0.2, 0.3, 0.8])
+    assert aggregate_distances(distances, method, k) == pytest.approx(expected)
+
+def test_aggregate_single_template():
+    for method in ("min", "mean", "topk"):
+        assert aggregate_distances([0.4], method, 2) == pytest.approx(0.4)
+
+def test_add_template_evicts_oldest_but_keeps_first(gallery):
+    for seed in range(5):
+        gallery.add_template("alice", vector(seed))
+    stored = gallery.get("alice")
+    assert len(stored) == 3
+    np.testing.assert_allclose(stored[0], vector(0))
+    np.testing.assert_allclose(stored[1:], [vector(3), vector(4)])
+
+def test_add_replaces_all_templates(gallery):
+    gallery.add_template("alice", vector(0))
+    gallery.add_template("alice", vector(1))
+    gallery.add("alice", vector(2))
+    np.testing.assert_allclose(gallery.get("alice"), [vector(2)])
+
+def test_add_many_appends_by_default(gallery):
+    gallery.add_template("alice", vector(0))
+    gallery.add_template("alice", vector(1))
+    gallery.add_many([("alice", vector(2)), ("bob", vector(3))])
+    assert gallery.template_count("alice") == 3
+    assert gallery.template_count("bob") == 1
+
+    gallery.add_many([("alice", vector(4))], replace=True)
+    np.testing.assert_allclose(gallery.get("alice"), [vector(4)])
+
+def test_distances_match_exact_norm(gallery):
+    for seed in range(3):
+        gallery.add_template("alice", vector(seed))
+    query = vector(10)
+    expected = np.linalg.norm(gallery.get("alice") - query, axis=1)
+    np.testing.assert_allclose(gallery.distances("alice", query), expected, rtol=1e-4)
+    assert gallery.distances("nobody", query) is None
+
+def test_search_returns_nearest_users(gallery):
+    for seed in range(10):
+        gallery.add(f"user{seed}", vector(seed))
+    gallery.add_template("user3", vector(42))
+    matches = gallery.search(vector(42) + 0.001, k=3)
+    assert matches[0]["username"] == "user3"
+    assert len({m["username"] for m in matches}) == 3
+
+def test_remove_frees_rows_for_reuse(gallery):
+    gallery.add("alice", vector(0))
+    gallery.add("bob", vector(1))
+    assert gallery.remove("alice")
+    assert not gallery.remove("alice")
+    gallery.add("carol", vector(2))
+    assert gallery.get_stats()["rows"] == 2
+    assert gallery.usernames() == ["bob", "carol"]
+
+def test_other_process_writes_are_visible(tmp_path, monkeypatch):
+    """两个实例共用同一目录（模拟多个 uvicorn worker），一方的写入另一方可见且不互相覆盖"""
+    monkeypatch.setattr(settings, "FACE_MAX_TEMPLATES", 3)
+    first = FaceGallery(str(tmp_path / "gallery"))
+    second = FaceGallery(str(tmp_path / "gallery"))
+
+    first.add("alice", vector(0))
+    assert "alice" in second
+    np.testing.assert_allclose(second.get("alice"), [vector(0)])
+
+    second.add("bob", vector(1))
+    first.add("carol", vector(2))
+    assert first.usernames() == second.usernames() == ["alice", "bob", "carol"]
+    np.testing.assert_allclose(second.get("bob"), [vector(1)])
+    np.testing.assert_allclose(second.get("carol"), [vector(2)])
+
+    second.remove("alice")
+    assert "alice" not in first
+    assert first.search(vector(1), k=1)[0]["username"] == "bob"
+
+def test_other_process_writes_sync_incrementally(tmp_path, monkeypatch):
+    """其他实例的写入只同步变化的行，IVF 索引就地更新而不重建"""
+    monkeypatch.setattr(settings, "FACE_MAX_TEMPLATES", 3)
+    monkeypatch.setattr(settings, "FACE_ANN_MIN_GALLERY", 4)
+    monkeypatch.setattr(settings, "FACE_IVF_NPROBE", 100)
+    first = FaceGallery(str(tmp_path / "gallery"))
+    second = FaceGallery(str(tmp_path / "gallery"))
+    for seed in range(8):
+        first.add(f"user{seed}", vector(seed))
+    assert first.search(vector(3), k=1)[0]["username"] == "user3"
+    index = first._index
+    assert index is not None
+
+    second.add("dave", vector(20))
+    second.add("user0", vector(21))  # 覆盖登记复用同一行
+    second.remove("user5")
+
+    assert first.search(vector(20), k=1)[0]["username"] == "dave"
+    assert first.search(vector(21), k=1)[0]["username"] == "user0"
+    assert all(m["username"] != "user5" for m in first.search(vector(5), k=8))
+    np.testing.assert_allclose(first.distances("user0", vector(21)), [0.0], atol=1e-3)
+    assert first._index is index and index.size == 8
@@ -0,0 +1,71 @@
+# tests/test_face_index.py - IVF近似最近邻索引
+import numpy as np
+import pytest
+
+from app.services.face_index import IVFIndex
+
+@pytest.fixture
+def clustered():
+    """16个簇、每簇64条的128维数据，行号从1000开始（与人脸库行号不必连续）"""
+    rng = np.random.default_rng(3)
+    centers = rng.normal(0, 1.0, (16, 128))
+    vectors = np.repeat(centers, 64, axis=0) + rng.normal(0, 0.05, (16 * 64, 128))
+    rows = np.arange(1000, 1000 + len(vectors), dtype=np.int64)
+    return vectors.astype(np.float32), rows
+
+def test_train_builds_sqrt_n_lists(clustered):
+    vectors, rows = clustered
+    index = IVFIndex(nprobe=4)
+    index.train(vectors, rows)
+    assert len(index.centroids) == int(np.sqrt(len(rows)))
+    assert index.size == len(rows)
+    assert not index.needs_retrain()
+
+def test_candidates_contain_exact_nearest_neighbour(clustered):
+    vectors, rows = clustered
+    index = IVFIndex(nprobe=4)
+    index.train(vectors, rows)
+
+    rng = np.random.default_rng(11)
+    for i in rng.choice(len(rows), 50, replace=False):
+        query = vectors[i] + rng.normal(0, 0.01, 128).astype(np.float32)
+        candidates = index.candidates(query)
+        nearest = rows[np.linalg.norm(vectors - query, axis=1).argmin()]
+        assert nearest in candidates
+        # 只检索一部分行
+        assert len(candidates) < len(rows)
+
+def test_add_and_remove_update_lists(clustered):
+    vectors, rows = clustered
+    index = IVFIndex(nprobe=1)
+    index.train(vectors[:-1], rows[:-1])
+
+    index.add(int(rows[-1]), vectors[-1])
+    assert index.size == len(rows)
+    assert rows[-1] in index.candidates(vectors[-1])
+
+    # 重复添加同一行不会产生重复条目
+    index.add(int(rows[-1]), vectors[-1])
+    assert list(index.candidates(vectors[-1])).count(rows[-1]) == 1
+
+    index.remove(int(rows[-1]))
+    assert index.size == len(rows) - 1
+    assert rows[-1] not in index.candidates(vectors[-1])
+    index.remove(int(rows[-1]))  # 已删除的行再次删除不报错
+
+def test_add_before_training_is_ignored():
+    index = IVFIndex()
+    index.add(0, np.zeros(128, dtype=np.float32))
+    assert index.size == 0
+    assert index.needs_retrain()
+
+def test_needs_retrain_after_growth(clustered):
+    vectors, rows = clustered
+    index = IVFIndex()
+    index.train(vectors[:200], rows[:200])
+    for row, vector in zip(rows[200:800], vectors[200:800]):
+        index.add(int(row), vector)
+    assert index.size == 800
+    assert not index.needs_retrain()
+    index.add(int(rows[800]), vectors[800])
+    assert index.needs_retrain()
@@ -0,0 +1,27 @@
+# tests/test_face_pool.py - 人脸进程池就绪状态
+import asyncio
+
+from app.services.face_pool import FaceWorkerPool
+
+def test_ready_state_follows_warm_workers():
+    pool = FaceWorkerPool()
+    assert pool.state == "not_started"
+    pool._state = "ready"
+    pool.pool._warm_workers = pool.pool.workers
+    assert pool.is_ready and pool.get_readiness()["warm_workers"] == pool.pool.workers
+
+    # 工作进程异常退出后进程池重建，不再报告就绪
+    pool.pool._reset_executor()
+    assert pool.state == "not_started" and not pool.get_readiness()["ready"]
+
+def test_lazy_start_warms_up_in_background(monkeypatch):
+    pool = FaceWorkerPool()
+    started = []
+
+    async def run(fn, *args):
+        return {"error": None}
+
+    monkeypatch.setattr(pool.pool, "run", run)
+    monkeypatch.setattr(pool, "start_background", lambda: started.append(True))
+    asyncio.run(pool.analyze(b"frame"))
+    assert started == [True]
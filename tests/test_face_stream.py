@@ -0,0 +1,51 @@
+# tests/test_face_stream.py - 视频流验证的连续帧计数
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from app.services import face_stream
+from app.services.face_stream import FaceStreamSession
+
+def make_session(monkeypatch, analyses, required_frames=3):
+    queue = list(analyses)
+
+    async def analyze(content, quality, track):
+        return queue.pop(0)
+
+    monkeypatch.setattr(face_stream.face_pool, "analyze", analyze)
+    return FaceStreamSession("alice", np.zeros((1, 128)), required_frames, lambda d: d < 0.5, 2.0)
+
+def face(distance):
+    encoding = np.zeros(128)
+    encoding[0] = distance
+    return {"error": None, "rejected": None, "locations": [(0, 10, 10, 0)], "encoding": encoding}
+
+def test_unchanged_frames_repeat_last_outcome_until_decision(monkeypatch):
+    session = make_session(monkeypatch, [face(0.3)])
+    thumbnail = np.zeros((24, 32), np.int16)
+
+    first = asyncio.run(session.process(b"frame", thumbnail))
+    assert first["status"] == "match" and first["streak"] == 1
+    assert session.is_unchanged(thumbnail.copy())
+
+    second = session.repeat_last()
+    assert second["repeated"] and second["streak"] == 2
+    assert session.decision() is None
+
+    session.repeat_last()
+    decision = session.decision()
+    assert decision["success"] and decision["frames"] == 3
+    # 给出结果后画面不变时不再重复计数
+    assert session.repeat_last() is None
+    assert session.stats["skipped_unchanged"] == 3 and session.stats["repeated"] == 2
+
+def test_unchanged_frame_without_face_is_dropped(monkeypatch):
+    no_face = {"error": None, "rejected": None, "locations": [], "encoding": None}
+    session = make_session(monkeypatch, [no_face])
+
+    result = asyncio.run(session.process(b"frame", np.zeros((24, 32), np.int16)))
+    assert result["status"] == "no_face" and result["streak"] == 0
+    assert session.repeat_last() is None
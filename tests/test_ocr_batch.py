@@ -0,0 +1,27 @@
+# tests/test_ocr_batch.py - 批量识别的逐张回退
+import cv2
+import numpy as np
+
+from app.services import ocr_service
+
+def png(value: int) -> bytes:
+    return cv2.imencode(".png", np.full((40, 40, 3), value, np.uint8))[1].tobytes()
+
+def test_fallback_failure_only_affects_that_image(monkeypatch):
+    class BrokenBatchEngine:
+        def predict(self, input):
+            raise RuntimeError("batch failed")
+
+    def recognize(image):
+        if int(image.mean()) == 0:
+            raise RuntimeError("boom")
+        return "ok"
+
+    monkeypatch.setattr(ocr_service, "get_ocr_engine", lambda: BrokenBatchEngine())
+    monkeypatch.setattr(ocr_service, "preprocess_for_ocr", lambda image, content=None: (image, {}))
+    monkeypatch.setattr(ocr_service, "_recognize", recognize)
+
+    results = ocr_service.extract_batch_from_bytes([png(255), png(0), b"not an image"])
+    assert results[0] == {"text": "ok", "preprocess": {}, "error": None}
+    assert results[1]["text"] == "" and results[1]["error"] == "boom"
+    assert results[2]["error"] == "无法解码图像"
@@ -0,0 +1,83 @@
+# tests/test_ocr_batcher.py - OCR微批调度
+import asyncio
+
+import pytest
+
+from app.services.ocr_batcher import OCRMicroBatcher
+from app.services.process_pool import PoolBusyError
+
+def make_runner(batches, delay=0.0, fail=None, drop_last=False):
+    async def run_batch(contents):
+        batches.append(list(contents))
+        await asyncio.sleep(delay)
+        if fail is not None:
+            raise fail
+        results = [{"text": content.decode()} for content in contents]
+        return results[:-1] if drop_last else results
+    return run_batch
+
+def test_requests_within_window_share_one_batch():
+    async def scenario():
+        batches = []
+        batcher = OCRMicroBatcher(make_runner(batches), 1, window_ms=50, max_batch_size=8, max_queue_depth=16)
+        results = await asyncio.gather(*(batcher.submit(f"img{i}".encode()) for i in range(5)))
+        batcher.shutdown()
+        return batches, results, batcher.get_stats()
+
+    batches, results, stats = asyncio.run(scenario())
+    assert batches == [[b"img0", b"img1", b"img2", b"img3", b"img4"]]
+    assert [r["text"] for r in results] == [f"img{i}" for i in range(5)]
+    assert stats["batches"] == 1 and stats["largest_batch"] == 5
+
+def test_batches_are_capped_at_max_size():
+    async def scenario():
+        batches = []
+        batcher = OCRMicroBatcher(make_runner(batches), 2, window_ms=50, max_batch_size=3, max_queue_depth=16)
+        await asyncio.gather(*(batcher.submit(b"x") for _ in range(7)))
+        batcher.shutdown()
+        return batches
+
+    batches = asyncio.run(scenario())
+    assert sorted(len(batch) for batch in batches) == [1, 3, 3]
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        batches = []
+        batcher = OCRMicroBatcher(make_runner(batches, delay=0.05), 1, window_ms=0, max_batch_size=1,
+                                  max_queue_depth=2, retry_after=3)
+        tasks = [asyncio.create_task(batcher.submit(b"x"))]
+        await asyncio.sleep(0.01)  # 第一张已发出，唯一的批次名额被占用
+        tasks += [asyncio.create_task(batcher.submit(b"x")) for _ in range(2)]
+        await asyncio.sleep(0)  # 这两张留在队列中
+        with pytest.raises(PoolBusyError) as exc:
+            await batcher.submit(b"overflow")
+        await asyncio.gather(*tasks)
+        batcher.shutdown()
+        return exc.value, batcher.get_stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.retry_after == 3
+    assert stats["rejected"] == 1
+
+def test_batch_failure_reaches_every_caller():
+    async def scenario():
+        batcher = OCRMicroBatcher(make_runner([], fail=RuntimeError("predict failed")), 1,
+                                  window_ms=20, max_batch_size=4, max_queue_depth=8)
+        results = await asyncio.gather(*(batcher.submit(b"x") for _ in range(3)), return_exceptions=True)
+        batcher.shutdown()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) and str(r) == "predict failed" for r in results)
+
+def test_missing_results_fail_only_the_unmatched_callers():
+    async def scenario():
+        batcher = OCRMicroBatcher(make_runner([], drop_last=True), 1,
+                                  window_ms=20, max_batch_size=4, max_queue_depth=8)
+        results = await asyncio.gather(batcher.submit(b"a"), batcher.submit(b"b"), return_exceptions=True)
+        batcher.shutdown()
+        return results
+
+    first, second = asyncio.run(scenario())
+    assert first == {"text": "a"}
+    assert isinstance(second, RuntimeError)
@@ -0,0 +1,53 @@
+# tests/test_ocr_document.py - 文档按页栅格化
+import io
+import json
+import asyncio
+import tempfile
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.services import ocr_document
+from app.services.ocr_document import DocumentRasterizer, detect_document_kind
+
+def test_tiff_pages_render_from_spooled_file_and_close_it():
+    buffer = io.BytesIO()
+    frames = [Image.new("RGB", (20, 20), color) for color in ("red", "blue")]
+    frames[0].save(buffer, format="TIFF", save_all=True, append_images=frames[1:])
+    source = tempfile.SpooledTemporaryFile(max_size=16)
+    source.write(buffer.getvalue())
+
+    assert detect_document_kind(buffer.getvalue()[:16]) == "tiff"
+    rasterizer = DocumentRasterizer(source, "tiff", 150)
+    assert rasterizer.page_count == 2
+    assert rasterizer.render(1).startswith(b"\x89PNG")
+    rasterizer.close()
+    assert source.closed
+
+def test_page_error_from_worker_is_reported(monkeypatch):
+    class FakeRasterizer:
+        kind = "tiff"
+        page_count = 2
+
+        def render(self, index):
+            return b"page%d" % index
+
+        def close(self):
+            pass
+
+    async def extract_page(image):
+        if image == b"page1":
+            return {"text": "", "error": "无法解码图像"}
+        return {"text": "ok", "error": None}
+
+    async def collect():
+        return [json.loads(line) async for line in ocr_document.stream_document_ocr(FakeRasterizer(), "doc.tif")]
+
+    monkeypatch.setattr(ocr_document, "_extract_page", extract_page)
+    monkeypatch.setattr(ocr_document.settings, "OCR_DOCUMENT_PAGES_IN_FLIGHT", 2)
+    events = asyncio.run(collect())
+    pages = {event["page"]: event for event in events if event["event"] == "page"}
+    assert pages[1]["error"] is None and pages[1]["text"] == "ok"
+    assert pages[2]["error"] == "无法解码图像"
+    assert events[-1]["failed"] == 1
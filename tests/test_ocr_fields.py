@@ -0,0 +1,78 @@
+# tests/test_ocr_fields.py - OCR参数配对与LLM跳过判断
+from app.services.ocr_fields import (
+    extract_key_values,
+    normalize_tolerance,
+    parameter_label,
+    trusted_parameters,
+    TRUST_THRESHOLD,
+)
+
+def sheet_lines(voltage_score=0.97):
+    """典型参数单：标题、非工况字段、同一文字框、右侧数值、正下方数值混排"""
+    return [
+        ("压缩机耐久试验参数单", 0.99, (10, 20, 300, 50)),
+        ("试验编号:", 0.98, (10, 100, 110, 130)),
+        ("TM-2024-031", 0.97, (130, 100, 260, 130)),
+        ("转速", 0.99, (300, 100, 360, 130)),
+        ("800土50rpm", 0.96, (380, 100, 500, 130)),
+        ("吸气压力：0.1+/-0.01MPa", 0.98, (10, 140, 260, 170)),
+        ("排气压力", 0.97, (10, 180, 110, 210)),
+        ("1.0±0.02MPa", 0.95, (130, 180, 260, 210)),
+        ("电压", 0.99, (10, 220, 60, 250)),
+        ("650±5V", voltage_score, (10, 255, 90, 285)),
+    ]
+
+def test_normalize_tolerance():
+    assert normalize_tolerance("0.1 土 0.01MPa") == "0.1±0.01MPa"
+    assert normalize_tolerance("1.0+/-0.02") == "1.0±0.02"
+    assert normalize_tolerance("环温：20") == "环温:20"
+
+def test_extract_pairs_by_geometry():
+    result = extract_key_values(sheet_lines())
+    assert result["fields"] == {
+        "试验编号": "TM-2024-031",
+        "转速": "800±50rpm",
+        "吸气压力": "0.1±0.01MPa",
+        "排气压力": "1.0±0.02MPa",
+        "电压": "650±5V",
+    }
+    assert "压缩机耐久试验参数单" not in result["fields"]
+
+def test_duplicate_labels_are_numbered():
+    lines = [
+        ("转速", 0.99, (10, 10, 60, 40)),
+        ("800rpm", 0.99, (80, 10, 160, 40)),
+        ("转速", 0.99, (10, 60, 60, 90)),
+        ("11000rpm", 0.99, (80, 60, 180, 90)),
+    ]
+    fields = extract_key_values(lines)["fields"]
+    assert fields == {"转速1": "800rpm", "转速2": "11000rpm"}
+
+def test_lines_without_boxes_pair_in_reading_order():
+    lines = [("电压", 0.99, None), ("650V", 0.99, None), ("环温:20℃", 0.99, None)]
+    assert extract_key_values(lines)["fields"] == {"电压": "650V", "环温": "20℃"}
+
+def test_parameter_label():
+    assert parameter_label("转速2") == "转速"
+    assert parameter_label("低温停留时间") == "低温停留时间"
+    assert parameter_label("试验编号") is None
+
+def test_realistic_sheet_skips_llm():
+    """含非工况字段与上下排列数值的参数单，工况参数全部可信，可跳过LLM"""
+    result = extract_key_values(sheet_lines())
+    params = trusted_parameters(result["fields"], result["confidence"])
+    assert params == {
+        "转速": "800±50rpm",
+        "吸气压力": "0.1±0.01MPa",
+        "排气压力": "1.0±0.02MPa",
+        "电压": "650±5V",
+    }
+    assert result["confidence"]["试验编号"] < TRUST_THRESHOLD
+
+def test_low_confidence_parameter_falls_back_to_llm():
+    result = extract_key_values(sheet_lines(voltage_score=0.8))
+    assert trusted_parameters(result["fields"], result["confidence"]) is None
+
+def test_no_parameters_or_confidence():
+    assert trusted_parameters({"试验编号": "TM-1"}, {"试验编号": 1.0}) is None
+    assert trusted_parameters({"电压": "650V"}, None) is None
@@ -0,0 +1,41 @@
+# tests/test_ocr_tuning.py - 后台调优任务
+import asyncio
+
+from app.services import ocr_tuning
+from app.services.ocr_tuning import TuningJob
+
+def test_tuning_runs_in_background_and_rejects_second_start(monkeypatch):
+    release = None
+
+    async def run_tuning(rounds=3):
+        await release.wait()
+        return {"best": {"workers": 2}, "candidates": []}
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        job = TuningJob()
+        assert job.start(rounds=1)
+        assert job.get_status()["state"] == "running"
+        assert not job.start(rounds=1)
+        release.set()
+        await job._task
+        return job.get_status()
+
+    monkeypatch.setattr(ocr_tuning, "run_tuning", run_tuning)
+    status = asyncio.run(scenario())
+    assert status["state"] == "done" and status["best"] == {"workers": 2}
+
+def test_tuning_failure_is_reported(monkeypatch):
+    async def run_tuning(rounds=3):
+        raise RuntimeError("没有可用的调优结果")
+
+    async def scenario():
+        job = TuningJob()
+        job.start()
+        await job._task
+        return job.get_status()
+
+    monkeypatch.setattr(ocr_tuning, "run_tuning", run_tuning)
+    status = asyncio.run(scenario())
+    assert status["state"] == "failed" and status["error"] == "没有可用的调优结果"
@@ -0,0 +1,74 @@
+# tests/test_single_flight.py - 在途请求合并
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight("TEST")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"text": "ok"}
+
+        results = await asyncio.gather(*(flight.do("same", work) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert all(result == {"text": "ok"} for result in results)
+    assert flight.get_stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flight = SingleFlight("TEST")
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        return await asyncio.gather(flight.do("a", lambda: work(1)), flight.do("b", lambda: work(2)))
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+def test_exception_is_shared_and_key_released():
+    async def scenario():
+        flight = SingleFlight("TEST")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        # 失败后同一键可以重新执行
+        retry = await flight.do("k", lambda: asyncio.sleep(0, result="again"))
+        return flight, results, retry
+
+    flight, results, retry = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert retry == "again"
+    assert flight.get_stats()["in_flight"] == 0
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight("TEST")
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
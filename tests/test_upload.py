@@ -0,0 +1,64 @@
+# tests/test_upload.py - 上传读取与文件头格式识别
+import io
+import asyncio
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.utils.upload import sniff_format, read_upload, inspect_upload
+
+@pytest.mark.parametrize("head, expected", [
+    (b"\x89PNG\r\n\x1a\n\x00\x00", "png"),
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF", "jpeg"),
+    (b"BM6\x00\x00\x00", "bmp"),
+    (b"II*\x00\x08\x00", "tiff"),
+    (b"MM\x00*\x00\x00", "tiff"),
+    (b"RIFF\x24\x00\x00\x00WEBPVP8 ", "webp"),
+    (b"GIF89a\x01\x00", "gif"),
+    (b"GIF87a\x01\x00", "gif"),
+    (b"%PDF-1.7\n", "pdf"),
+    (b"PK\x03\x04\x14\x00", "zip"),
+])
+def test_sniff_known_formats(head, expected):
+    assert sniff_format(head) == expected
+
+@pytest.mark.parametrize("head", [b"", b"hello world", b"RIFF\x24\x00\x00\x00WAVEfmt ", b"\xff\xd8"])
+def test_sniff_unknown(head):
+    assert sniff_format(head) is None
+
+def make_upload(content: bytes, size=None) -> UploadFile:
+    return UploadFile(io.BytesIO(content), size=size, filename="sample")
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+def test_read_upload_in_chunks():
+    content, fmt = asyncio.run(read_upload(make_upload(PNG), 1, {"png"}, chunk_size=16))
+    assert fmt == "png"
+    assert bytes(content) == PNG
+
+@pytest.mark.parametrize("size", [None, 2 * 1024 * 1024])
+def test_read_upload_too_large(size):
+    upload = make_upload(PNG + b"\x00" * 2 * 1024 * 1024, size=size)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(read_upload(upload, 1))
+    assert exc.value.status_code == 413
+
+def test_read_upload_rejects_format_and_empty():
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(read_upload(make_upload(b"%PDF-1.4" + b"\x00" * 10), 1, {"png", "jpeg"}))
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(read_upload(make_upload(b""), 1))
+    assert exc.value.status_code == 400
+
+def test_inspect_upload_does_not_consume():
+    upload = make_upload(b"PK\x03\x04" + b"\x00" * 64)
+    assert asyncio.run(inspect_upload(upload, 1, {"zip"})) == "zip"
+    assert upload.file.tell() == 0
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(inspect_upload(make_upload(PNG), 1, {"zip"}))
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(inspect_upload(make_upload(b"PK\x03\x04" + b"\x00" * 2 * 1024 * 1024), 1))
+    assert exc.value.status_code == 413